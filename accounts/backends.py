@@ -1,20 +1,56 @@
+from django.conf import settings
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth.models import User
+from django.core.cache import caches
 from .models import Profile
 
+AUTH_CACHE_ALIAS = 'auth'
+USER_CACHE_VERSION = 1  # bump when what load_user() caches changes shape
+
+
+def user_cache_key(user_id):
+    return f'auth-user:v{USER_CACHE_VERSION}:{user_id}'
+
+
+def user_cache_enabled():
+    """Only a cache shared by every process can be invalidated reliably (see the 'auth' cache in settings)."""
+    return AUTH_CACHE_ALIAS in settings.CACHES
+
+
+def invalidate_user_cache(user_id):
+    """Drops a user from the cache; accounts.signals calls this whenever the user, profile or groups change."""
+    if user_cache_enabled(): caches[AUTH_CACHE_ALIAS].delete(user_cache_key(user_id))
+
+
+def load_user(user_id):
+    """The user with their profile and its locations in one joined query, and their groups in another."""
+    return (User.objects.select_related('profile__district', 'profile__local_municipality', 'profile__facility')
+            .prefetch_related('groups').filter(pk=user_id).first())
+
+
 class PersalAuthBackend(ModelBackend):
     def authenticate(self, request, username=None, password=None, **kwargs):
         try:
             # The 'username' from the login form is treated as a persal number
-            profile = Profile.objects.get(persal_number=username)
-            user = profile.user
-            if user.check_password(password):
-                return user
+            profile = Profile.objects.select_related('user').get(persal_number=username)
         except Profile.DoesNotExist:
             return None
-    
+        user = profile.user
+        if user.check_password(password):
+            return user
+
     def get_user(self, user_id):
-        try:
-            return User.objects.get(pk=user_id)
-        except User.DoesNotExist:
-            return None
\ No newline at end of file
+        """
+        The signed-in user of a request with their profile and groups, from
+        which request.scope is built without further queries. With a shared
+        'auth' cache it is kept there for AUTH_USER_CACHE_TTL seconds (until it
+        changes, see accounts.signals), so most requests load it without a query.
+        """
+        if not user_cache_enabled(): return load_user(user_id)
+        cache = caches[AUTH_CACHE_ALIAS]
+        user = cache.get(user_cache_key(user_id))
+        if user is None:
+            user = load_user(user_id)
+            if user is None: return None
+            cache.set(user_cache_key(user_id), user, settings.AUTH_USER_CACHE_TTL)
+        return user
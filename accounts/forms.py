@@ -4,13 +4,15 @@ from django import forms
 from django.contrib.auth.models import User, Group
 from .models import Profile
 from births.data import DISTRICT_CHOICES, LOCATION_DATA
+from births.forms import resolve_location_fields
+from births.models import location_names
 
 DEFAULT_PASSWORD = "Password1"
 
 class UserFormMixin(forms.Form):
     """A single mixin to handle all shared form logic."""
     def __init__(self, *args, **kwargs):
-        self.user = kwargs.pop('user', None)
+        self.scope = kwargs.pop('scope', None)
         super().__init__(*args, **kwargs)
         
         # --- Make location fields optional by default ---
@@ -29,20 +31,20 @@ class UserFormMixin(forms.Form):
                 if municipality: self.fields['facility'].choices = [(f, f) for f in LOCATION_DATA['facilities'].get(municipality, [])]
             except (ValueError, TypeError, KeyError): pass
         elif instance and instance.pk and hasattr(instance, 'profile'):
-            profile = instance.profile
-            if profile.district: self.fields['local_municipality'].choices = [(m, m) for m in LOCATION_DATA['municipalities'].get(profile.district, [])]
-            if profile.local_municipality: self.fields['facility'].choices = [(f, f) for f in LOCATION_DATA['facilities'].get(profile.local_municipality, [])]
+            district, municipality, _ = location_names(instance.profile)
+            if district: self.fields['local_municipality'].choices = [(m, m) for m in LOCATION_DATA['municipalities'].get(district, [])]
+            if municipality: self.fields['facility'].choices = [(f, f) for f in LOCATION_DATA['facilities'].get(municipality, [])]
         
-        if self.user and not self.user.is_superuser:
-            if self.user.groups.filter(name='Admin').exists():
-                admin_district = self.user.profile.district
+        if self.scope and not self.scope.is_superuser:
+            if self.scope.is_admin:
+                admin_district = self.scope.location_names[0]
                 self.fields['district'].choices = [(admin_district, admin_district)]
                 self.fields['district'].initial = admin_district
                 self.fields['district'].widget.attrs['readonly'] = True
                 self.fields['role'].queryset = Group.objects.filter(name='User')
 
     def clean(self):
-        cleaned_data = super().clean()
+        cleaned_data = resolve_location_fields(self, super().clean())
         role = cleaned_data.get('role')
 
         if role:
@@ -101,7 +103,8 @@ class UserCreateForm(UserFormMixin, forms.ModelForm):
                 mobile_number=self.cleaned_data.get('mobile_number'),
                 district=self.cleaned_data.get('district'),
                 local_municipality=self.cleaned_data.get('local_municipality'),
-                facility=self.cleaned_data.get('facility')
+                facility=self.cleaned_data.get('facility'),
+                must_change_password=True,
             )
         return user
 
@@ -132,9 +135,10 @@ class UserUpdateForm(UserFormMixin, forms.ModelForm):
             self.fields['designation'].initial = profile.designation
             self.fields['persal_number'].initial = profile.persal_number
             self.fields['mobile_number'].initial = profile.mobile_number
-            self.fields['district'].initial = profile.district
-            self.fields['local_municipality'].initial = profile.local_municipality
-            self.fields['facility'].initial = profile.facility
+            district, municipality, facility = location_names(profile)
+            self.fields['district'].initial = district
+            self.fields['local_municipality'].initial = municipality
+            self.fields['facility'].initial = facility
         if self.instance.groups.exists():
             self.fields['role'].initial = self.instance.groups.first()
 
@@ -155,13 +159,17 @@ class UserUpdateForm(UserFormMixin, forms.ModelForm):
         if password: user.set_password(password)
         user.username = self.cleaned_data['persal_number']; user.save()
         user.groups.clear(); user.groups.add(self.cleaned_data['role'])
-        Profile.objects.update_or_create(
-            user=user,
-            defaults={
-                'title': self.cleaned_data['title'], 'persal_number': self.cleaned_data['persal_number'],
-                'designation': self.cleaned_data.get('designation'), 'mobile_number': self.cleaned_data.get('mobile_number'),
-                'district': self.cleaned_data.get('district'), 'local_municipality': self.cleaned_data.get('local_municipality'),
-                'facility': self.cleaned_data.get('facility'),
-            }
-        )
-        return user
\ No newline at end of file
+        defaults = {
+            'title': self.cleaned_data['title'], 'persal_number': self.cleaned_data['persal_number'],
+            'designation': self.cleaned_data.get('designation'), 'mobile_number': self.cleaned_data.get('mobile_number'),
+            'district': self.cleaned_data.get('district'), 'local_municipality': self.cleaned_data.get('local_municipality'),
+            'facility': self.cleaned_data.get('facility'),
+        }
+        # A password set by an admin is only temporary if it is the default one.
+        if password: defaults['must_change_password'] = password == DEFAULT_PASSWORD
+        Profile.objects.update_or_create(user=user, defaults=defaults)
+        return user
+
+
+class UserImportForm(forms.Form):
+    file = forms.FileField(label="CSV File", help_text="One user per row, with a header row naming the columns.")
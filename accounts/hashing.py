@@ -0,0 +1,10 @@
+# accounts/hashing.py
+#
+# Password hashing for accounts.provisioning, run inline or in a process pool.
+# Pool processes are spawned fresh without Django set up, so this module must
+# not import models, and the hasher is passed in rather than read from settings.
+
+
+def hash_passwords(hasher, password, count):
+    """`count` hashes of one password, each with its own salt, as make_password() would encode them."""
+    return [hasher.encode(password, hasher.salt()) for _ in range(count)]
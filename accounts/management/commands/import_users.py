@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.provisioning import COLUMNS, provision_users, read_user_rows
+
+
+class Command(BaseCommand):
+    help = ("Creates users from a CSV file with a header row naming the columns "
+            f"{', '.join(COLUMNS)}. Nothing is imported unless every row is valid.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', help="Path of the CSV file to import.")
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Processes hashing passwords (default USER_IMPORT_HASH_WORKERS; 0 hashes inline).")
+        parser.add_argument('--batch-size', type=int, default=500, help="Rows per INSERT batch (default 500).")
+        parser.add_argument('--dry-run', action='store_true', help="Only validate the file.")
+
+    def handle(self, *args, **options):
+        with open(options['csv_file'], 'rb') as file:
+            rows, errors = read_user_rows(file)
+        if errors:
+            raise CommandError("No users were imported:\n" + "\n".join(f"  line {line}: {message}" for line, message in errors))
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"{len(rows)} users are ready to import."))
+            return
+        users = provision_users(rows, workers=options['workers'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Imported {len(users)} users."))
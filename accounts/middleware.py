@@ -3,31 +3,38 @@
 from django.urls import reverse
 from django.shortcuts import redirect
 from django.contrib import messages
-from django.core.cache import cache
-from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+
+from .scope import request_scope
+
+
+class RoleScopeMiddleware:
+    """Attaches the user's RoleScope as request.scope, resolved on first use."""
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.scope = SimpleLazyObject(lambda: request_scope(request))
+        return self.get_response(request)
 
-# The default password for new users
-DEFAULT_PASSWORD = "Password1"
 
 class ForcePasswordChangeMiddleware:
     """
-    Redirects users to the password change page if they are still using
-    the default temporary password.
+    Redirects users to the password change page while their profile is flagged
+    must_change_password (they still have the default temporary password).
+    The flag comes with request.scope and is checked before the view runs.
     """
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
-        response = self.get_response(request)
-        
+        user = request.user
         # Only check for authenticated, non-superuser users
-        if request.user.is_authenticated and not request.user.is_superuser:
+        if user.is_authenticated and not user.is_superuser:
             # Avoid a redirect loop by excluding the password change and logout pages
-            if request.path not in [reverse('password_change'), reverse('logout')]:
-                
-                # Check if the user's current password is the default one
-                if request.user.check_password(DEFAULT_PASSWORD):
+            if request.path not in (reverse('password_change'), reverse('logout')):
+                if request.scope.must_change_password:
                     messages.warning(request, 'For security, you must change your temporary password before proceeding.')
                     return redirect('password_change')
-        
-        return response
+
+        return self.get_response(request)
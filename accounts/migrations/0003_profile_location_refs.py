@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-17 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_create_superuser'),
+        ('births', '0006_location_dimensions'),
+    ]
+
+    # Filled by 0004 and swapped in for the string columns by 0005.
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='district_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='births.district'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='local_municipality_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='births.municipality'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='facility_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='births.facility'),
+        ),
+    ]
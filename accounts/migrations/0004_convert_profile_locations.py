@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-17 09:12
+
+from django.db import migrations, transaction
+
+from births.locations import LocationResolver
+
+BATCH_SIZE = 1000
+
+
+def convert_profiles(apps, schema_editor):
+    """Fills the new foreign keys from the string columns, one committed batch at a time."""
+    Profile = apps.get_model('accounts', 'Profile')
+    resolve = LocationResolver(apps.get_model('births', 'District'), apps.get_model('births', 'Municipality'),
+                               apps.get_model('births', 'Facility'))
+    profiles = Profile.objects.order_by('pk').only('pk', 'district', 'local_municipality', 'facility')
+    last_pk = 0
+    while True:
+        batch = list(profiles.filter(pk__gt=last_pk)[:BATCH_SIZE])
+        if not batch: break
+        for profile in batch:
+            profile.district_ref, profile.local_municipality_ref, profile.facility_ref = resolve(
+                profile.district, profile.local_municipality, profile.facility)
+        with transaction.atomic():
+            Profile.objects.bulk_update(batch, ['district_ref', 'local_municipality_ref', 'facility_ref'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('accounts', '0003_profile_location_refs'),
+    ]
+
+    operations = [
+        migrations.RunPython(convert_profiles, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-17 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_convert_profile_locations'),
+    ]
+
+    operations = [
+        migrations.RemoveField(model_name='profile', name='district'),
+        migrations.RemoveField(model_name='profile', name='local_municipality'),
+        migrations.RemoveField(model_name='profile', name='facility'),
+        migrations.RenameField(model_name='profile', old_name='district_ref', new_name='district'),
+        migrations.RenameField(model_name='profile', old_name='local_municipality_ref', new_name='local_municipality'),
+        migrations.RenameField(model_name='profile', old_name='facility_ref', new_name='facility'),
+        migrations.AlterField(
+            model_name='profile',
+            name='district',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='profiles', to='births.district'),
+        ),
+        migrations.AlterField(
+            model_name='profile',
+            name='local_municipality',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='profiles', to='births.municipality'),
+        ),
+        migrations.AlterField(
+            model_name='profile',
+            name='facility',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='profiles', to='births.facility'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:12
+
+from django.contrib.auth.hashers import check_password
+from django.db import migrations, models
+
+# accounts.forms.DEFAULT_PASSWORD when this migration was written.
+DEFAULT_PASSWORD = "Password1"
+
+
+def flag_default_passwords(apps, schema_editor):
+    """One password hash check per user, once, instead of one per request."""
+    Profile = apps.get_model('accounts', 'Profile')
+    flagged = [
+        pk for pk, password in Profile.objects.filter(user__is_superuser=False).values_list('pk', 'user__password')
+        if check_password(DEFAULT_PASSWORD, password)
+    ]
+    Profile.objects.filter(pk__in=flagged).update(must_change_password=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_profile_location_fks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='must_change_password',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(flag_default_passwords, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_profile_must_change_password'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoginLockout',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('persal', 'Persal Number'), ('ip', 'IP Address')], max_length=10)),
+                ('identifier', models.CharField(max_length=64)),
+                ('locked_until', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'ordering': ['-locked_until'],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'identifier'), name='unique_login_lockout')],
+            },
+        ),
+    ]
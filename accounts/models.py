@@ -3,6 +3,7 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from births.models import District, Municipality, Facility
 
 class Profile(models.Model):
     TITLE_CHOICES = [('Mr', 'Mr'), ('Ms', 'Ms'), ('Mrs', 'Mrs'), ('Miss', 'Miss'), ('Dr', 'Dr'), ('Prof', 'Prof')]
@@ -12,9 +13,26 @@ class Profile(models.Model):
     designation = models.CharField(max_length=100, null=True, blank=True)
     persal_number = models.CharField(max_length=8, unique=True)
     mobile_number = models.CharField(max_length=10, null=True, blank=True)
-    district = models.CharField(max_length=100)
-    local_municipality = models.CharField(max_length=100, null=True, blank=True)
-    facility = models.CharField(max_length=100, null=True, blank=True)
+    district = models.ForeignKey(District, related_name='profiles', on_delete=models.PROTECT, null=True, blank=True)
+    local_municipality = models.ForeignKey(Municipality, related_name='profiles', on_delete=models.PROTECT, null=True, blank=True)
+    facility = models.ForeignKey(Facility, related_name='profiles', on_delete=models.PROTECT, null=True, blank=True)
+    # Set while the user still has the default temporary password; see ForcePasswordChangeMiddleware.
+    must_change_password = models.BooleanField(default=False)
 
     def __str__(self):
-        return f'{self.user.first_name} {self.user.last_name} ({self.persal_number})'
\ No newline at end of file
+        return f'{self.user.first_name} {self.user.last_name} ({self.persal_number})'
+
+class LoginLockout(models.Model):
+    """A login throttle bucket that ran empty (accounts.throttle), kept for the admins' lockout list."""
+    KIND_CHOICES = [('persal', 'Persal Number'), ('ip', 'IP Address')]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    identifier = models.CharField(max_length=64)
+    locked_until = models.DateTimeField(db_index=True)
+
+    class Meta:
+        ordering = ['-locked_until']
+        constraints = [models.UniqueConstraint(fields=['kind', 'identifier'], name='unique_login_lockout')]
+
+    def __str__(self):
+        return f'{self.get_kind_display()} {self.identifier} until {self.locked_until:%Y-%m-%d %H:%M}'
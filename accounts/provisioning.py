@@ -0,0 +1,156 @@
+# accounts/provisioning.py
+#
+# Bulk user import from a CSV file (`manage.py import_users` and UserImportView).
+# The file is validated in one pass, then the users, profiles and roles are
+# inserted with bulk_create. Everyone gets DEFAULT_PASSWORD with their own salt,
+# hashed across a process pool, and must change it at first login.
+
+import csv
+import io
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import multiprocessing
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher
+from django.contrib.auth.models import Group, User
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+
+from births.data import DISTRICT_CHOICES, LOCATION_DATA
+from births.models import District, Facility, Municipality
+
+from .forms import DEFAULT_PASSWORD
+from .hashing import hash_passwords
+from .models import Profile
+
+COLUMNS = ['persal_number', 'first_name', 'last_name', 'role', 'district', 'local_municipality', 'facility',
+           'title', 'designation', 'email', 'mobile_number']
+REQUIRED_COLUMNS = COLUMNS[:4]
+LOCATION_LABELS = ['District', 'Local Municipality', 'Facility']
+ROLE_LOCATION_LEVELS = {'Admin': 1, 'User': 3}  # location levels each role needs, as UserFormMixin.clean
+DISTRICTS = {value for value, _ in DISTRICT_CHOICES if value}
+TITLES = {value for value, _ in Profile.TITLE_CHOICES}
+
+
+class _Locations:
+    """District/Municipality/Facility rows by name, loaded in three queries."""
+    def __init__(self):
+        self.districts = {district.name: district for district in District.objects.all()}
+        self.municipalities = {(m.district.name, m.name): m for m in Municipality.objects.select_related('district')}
+        self.facilities = {(f.municipality.district.name, f.municipality.name, f.name): f
+                           for f in Facility.objects.select_related('municipality__district')}
+
+    def resolve(self, district, municipality, facility, problems):
+        """The rows for the given names, checked against births/data.py; None where blank."""
+        if district and district not in DISTRICTS:
+            problems.append(f'"{district}" is not a known district.')
+        elif municipality and municipality not in LOCATION_DATA['municipalities'].get(district, []):
+            problems.append(f'"{municipality}" is not a municipality of "{district}".')
+        elif facility and facility not in LOCATION_DATA['facilities'].get(municipality, []):
+            problems.append(f'"{facility}" is not a facility of "{municipality}".')
+        else:
+            rows = (self.districts.get(district) if district else None,
+                    self.municipalities.get((district, municipality)) if municipality else None,
+                    self.facilities.get((district, municipality, facility)) if facility else None)
+            if any(name and row is None for name, row in zip((district, municipality, facility), rows)):
+                problems.append('The location is not in the database yet; run `manage.py seed_locations`.')
+            return rows
+        return None, None, None
+
+
+def read_user_rows(file, scope=None):
+    """
+    Validates a user CSV (a header row naming COLUMNS, in any order; the first
+    four are required) read from the binary `file`. Returns (rows, errors):
+    the cleaned rows, and (line number, message) for every problem found.
+    With an Admin's RoleScope, only facility users of their district pass.
+    """
+    reader = csv.DictReader(io.TextIOWrapper(file, encoding='utf-8-sig', newline=''))
+    try:
+        reader.fieldnames = [name.strip().lower().replace(' ', '_') for name in reader.fieldnames or []]
+        records = list(reader)
+    except (UnicodeDecodeError, csv.Error):
+        # e.g. Excel's default ANSI "CSV" encoding, or a workbook uploaded as is
+        return [], [(1, 'The file is not a UTF-8 CSV file. In Excel, save it as "CSV UTF-8 (Comma delimited)".')]
+    missing = [column for column in REQUIRED_COLUMNS if column not in reader.fieldnames]
+    if missing: return [], [(1, f"Missing column(s): {', '.join(missing)}.")]
+
+    roles = {group.name: group for group in Group.objects.all()}
+    locations = _Locations()
+    rows, errors, lines = [], [], {}
+    for line, raw in enumerate(records, start=2):
+        row = {column: (raw.get(column) or '').strip() for column in COLUMNS}
+        problems = []
+        persal = row['persal_number']
+        if not (persal.isdigit() and len(persal) == 8):
+            problems.append('Persal Number must be an 8-digit number.')
+        elif persal in lines:
+            problems.append(f'Persal Number {persal} is already on line {lines[persal]}.')
+        else:
+            lines[persal] = line
+        if len(row['first_name']) < 3: problems.append('Name must be at least 3 characters.')
+        if not row['last_name']: problems.append('Surname is required.')
+
+        role = row['role'] = roles.get(row['role'])
+        if role is None:
+            problems.append(f"Role must be one of: {', '.join(sorted(roles))}.")
+        elif scope and not scope.is_superuser and (role.name != 'User' or row['district'] != scope.location_names[0]):
+            problems.append('Admins can only import users with the User role in their own district.')
+        names = [row['district'], row['local_municipality'], row['facility']]
+        for label, name in zip(LOCATION_LABELS[:ROLE_LOCATION_LEVELS.get(role.name if role else None, 0)], names):
+            if not name: problems.append(f'{label} is required for the {role.name} role.')
+        row['district'], row['local_municipality'], row['facility'] = locations.resolve(*names, problems)
+
+        if row['title'] and row['title'] not in TITLES: problems.append(f"Title must be one of: {', '.join(sorted(TITLES))}.")
+        if row['email']:
+            try:
+                validate_email(row['email'])
+            except ValidationError:
+                problems.append('Enter a valid email address.')
+        if row['mobile_number'] and not (row['mobile_number'].isdigit() and len(row['mobile_number']) == 10):
+            problems.append('Mobile Number must be a 10-digit number.')
+        errors.extend((line, problem) for problem in problems)
+        rows.append(row)
+
+    taken = set(Profile.objects.filter(persal_number__in=lines).values_list('persal_number', flat=True))
+    taken.update(User.objects.filter(username__in=lines).values_list('username', flat=True))
+    errors.extend((lines[persal], f'A user with Persal Number {persal} already exists.') for persal in taken)
+    return rows, sorted(errors)
+
+
+def hash_default_passwords(count, workers=None):
+    """`count` hashes of DEFAULT_PASSWORD across `workers` processes (USER_IMPORT_HASH_WORKERS; 0 hashes inline)."""
+    workers = min(settings.USER_IMPORT_HASH_WORKERS if workers is None else workers, count)
+    hasher = get_hasher()
+    if workers < 2: return hash_passwords(hasher, DEFAULT_PASSWORD, count)
+    sizes = [count // workers + (i < count % workers) for i in range(workers)]
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return [password for chunk in pool.map(hash_passwords, repeat(hasher), repeat(DEFAULT_PASSWORD), sizes)
+                for password in chunk]
+
+
+def provision_users(rows, workers=None, batch_size=500):
+    """Creates the users of read_user_rows() with their profiles and roles, in one transaction."""
+    passwords = hash_default_passwords(len(rows), workers)
+    with transaction.atomic():
+        users = User.objects.bulk_create([
+            User(username=row['persal_number'], first_name=row['first_name'], last_name=row['last_name'],
+                 email=row['email'], password=password)
+            for row, password in zip(rows, passwords)
+        ], batch_size=batch_size)
+        if users and users[0].pk is None:  # backends that cannot return ids from bulk inserts
+            ids = dict(User.objects.filter(username__in=[user.username for user in users]).values_list('username', 'pk'))
+            for user in users: user.pk = ids[user.username]
+        Profile.objects.bulk_create([
+            Profile(user=user, persal_number=row['persal_number'], title=row['title'] or None,
+                    designation=row['designation'] or None, mobile_number=row['mobile_number'] or None,
+                    district=row['district'], local_municipality=row['local_municipality'], facility=row['facility'],
+                    must_change_password=True)
+            for user, row in zip(users, rows)
+        ], batch_size=batch_size)
+        User.groups.through.objects.bulk_create([
+            User.groups.through(user_id=user.pk, group_id=row['role'].pk) for user, row in zip(users, rows)
+        ], batch_size=batch_size)
+    return users
@@ -0,0 +1,96 @@
+# accounts/scope.py
+
+from django.contrib.auth.models import User
+
+LOCATION_ID_FIELDS = ('profile__district_id', 'profile__local_municipality_id', 'profile__facility_id')
+LOCATION_NAME_FIELDS = ('profile__district__name', 'profile__local_municipality__name', 'profile__facility__name')
+
+
+class RoleScope:
+    """
+    What one user may see and do: their roles and profile locations, read in a
+    single query. Requests carry theirs as `request.scope` (RoleScopeMiddleware);
+    background work builds one with RoleScope.for_user().
+    """
+    def __init__(self, user_id=None, is_superuser=False, roles=(), location_ids=(None, None, None),
+                 location_names=('', '', ''), must_change_password=False):
+        self.user_id, self.is_superuser, self.roles = user_id, is_superuser, frozenset(roles)
+        self.must_change_password = must_change_password  # see ForcePasswordChangeMiddleware
+        self.district_id, self.municipality_id, self.facility_id = location_ids
+        # (district, municipality, facility) names, '' where unset, as births.models.location_names()
+        self.location_names = tuple(location_names)
+
+    @classmethod
+    def for_user(cls, user):
+        """One query, or none for a user loaded with profile and groups (accounts.backends.load_user)."""
+        if not user.is_authenticated: return cls()
+        if 'groups' in getattr(user, '_prefetched_objects_cache', {}) and User.profile.is_cached(user):
+            return cls.from_loaded_user(user)
+        rows = list(User.objects.filter(pk=user.pk).values_list(
+            'groups__name', *LOCATION_ID_FIELDS, *LOCATION_NAME_FIELDS, 'profile__must_change_password'))
+        if not rows: return cls()
+        return cls(user.pk, user.is_superuser, roles=[row[0] for row in rows if row[0]], location_ids=rows[0][1:4],
+                   location_names=[name or '' for name in rows[0][4:7]], must_change_password=bool(rows[0][7]))
+
+    @classmethod
+    def from_loaded_user(cls, user):
+        roles = [group.name for group in user.groups.all()]
+        profile = getattr(user, 'profile', None)
+        if profile is None: return cls(user.pk, user.is_superuser, roles)
+        locations = (profile.district, profile.local_municipality, profile.facility)
+        return cls(user.pk, user.is_superuser, roles, location_ids=[loc.pk if loc else None for loc in locations],
+                   location_names=[loc.name if loc else '' for loc in locations],
+                   must_change_password=profile.must_change_password)
+
+    def __repr__(self):
+        return f"<RoleScope user={self.user_id} roles={sorted(self.roles)} superuser={self.is_superuser}>"
+
+    # --- Roles ---
+    @property
+    def is_authenticated(self):
+        return self.user_id is not None
+
+    @property
+    def is_admin(self):
+        return 'Admin' in self.roles
+
+    @property
+    def is_facility_user(self):
+        return 'User' in self.roles
+
+    @property
+    def is_province_user(self):
+        return 'ProvinceUser' in self.roles
+
+    @property
+    def sees_everything(self):
+        return self.is_superuser or self.is_province_user
+
+    @property
+    def can_modify_data(self):
+        """Who can create/edit/delete delivery records."""
+        return self.is_authenticated and not self.is_province_user
+
+    @property
+    def can_manage_users(self):
+        return self.is_superuser or self.is_admin
+
+    def delivery_filters(self, exports=False):
+        """
+        Delivery filters of what the user may see: everything for superusers and
+        ProvinceUsers, their district (Admin) or facility (User). None if nothing.
+        Exports are narrower: ProvinceUsers view all data but do not export it.
+        """
+        if self.is_superuser or (self.is_province_user and not exports): return {}
+        if self.is_admin: return {'district_id': self.district_id}
+        if self.is_facility_user: return {'facility_id': self.facility_id}
+        return None
+
+
+def request_scope(request):
+    """
+    The RoleScope of the request's user, read afresh on every request so an
+    admin's changes to a user's roles, locations or password apply at once.
+    PersalAuthBackend.get_user() loads the groups and profile it needs.
+    """
+    return RoleScope.for_user(request.user)
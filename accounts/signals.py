@@ -0,0 +1,38 @@
+# accounts/signals.py
+
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .backends import invalidate_user_cache
+from .models import Profile
+
+# ==========================================================
+# AUTHENTICATED USER CACHE (accounts.backends.PersalAuthBackend)
+# Any change to a user, their profile or their groups drops the cached user,
+# which covers UserUpdateForm.save, UserDeleteView and password changes.
+# Queryset update() sends no signals; callers of it invalidate themselves.
+# ==========================================================
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    invalidate_user_cache(instance.pk)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def profile_changed(sender, instance, **kwargs):
+    invalidate_user_cache(instance.user_id)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # group.user_set.clear() sends no pk_set, and the members are gone by post_clear.
+        instance._cleared_user_ids = list(User.objects.filter(groups=instance).values_list('pk', flat=True))
+    if not action.startswith('post_'): return
+    if not reverse:
+        invalidate_user_cache(instance.pk)
+    else:  # changed from the group's side (group.user_set)
+        for user_id in pk_set if pk_set is not None else instance.__dict__.pop('_cleared_user_ids', ()):
+            invalidate_user_cache(user_id)
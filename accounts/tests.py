@@ -1,3 +1,245 @@
-from django.test import TestCase
+from importlib import import_module
+from io import StringIO
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from births.models import Delivery, locations_from_names
+
+from .backends import PersalAuthBackend
+from .forms import DEFAULT_PASSWORD
+from .models import LoginLockout, Profile
+from .scope import RoleScope
+
+
+class ForcePasswordChangeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('00000010', password=DEFAULT_PASSWORD)
+        self.profile = Profile.objects.create(user=self.user, persal_number='00000010', must_change_password=True)
+        self.client.force_login(self.user)
+
+    def test_flagged_user_is_redirected_before_the_view_runs(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('delivery_list'))
+        self.assertFalse([query for query in queries if 'births_delivery' in query['sql']])
+        self.assertRedirects(response, reverse('password_change'), fetch_redirect_response=False)
+
+        response = self.client.post(reverse('password_change'), {
+            'old_password': DEFAULT_PASSWORD, 'new_password1': 'Sturdy-Pass-2026', 'new_password2': 'Sturdy-Pass-2026',
+        })
+        self.assertRedirects(response, reverse('password_change_done'))
+        self.profile.refresh_from_db()
+        self.assertFalse(self.profile.must_change_password)
+        self.assertEqual(self.client.get(reverse('delivery_list')).status_code, 200)
+
+    def test_backfill_flags_default_passwords_only(self):
+        Profile.objects.update(must_change_password=False)
+        changed = User.objects.create_user('00000011', password='Sturdy-Pass-2026')
+        Profile.objects.create(user=changed, persal_number='00000011')
+
+        import_module('accounts.migrations.0006_profile_must_change_password').flag_default_passwords(apps, None)
+        self.assertEqual(list(Profile.objects.filter(must_change_password=True).values_list('persal_number', flat=True)),
+                         ['00000010'])
+
+
+class RoleScopeTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('00000020', password='x')
+        self.admin.groups.add(Group.objects.get_or_create(name='Admin')[0])
+        district, _, _ = locations_from_names('Amathole DM', 'Mnquma LM', 'Butterworth Hospital')
+        Profile.objects.create(user=self.admin, persal_number='00000020', district=district)
+        self.district = district
+
+    def test_scope_is_read_in_one_query(self):
+        with self.assertNumQueries(1):
+            scope = RoleScope.for_user(self.admin)
+        self.assertEqual((scope.is_admin, scope.can_modify_data, scope.location_names), (True, True, ('Amathole DM', '', '')))
+        self.assertEqual(scope.delivery_filters(), {'district_id': self.district.pk})
+        self.assertIsNone(RoleScope.for_user(User.objects.create_user('00000021')).delivery_filters())
+        self.assertEqual(str(Delivery.objects.for_scope(scope).query), str(Delivery.objects.filter(district_id=self.district.pk).query))
+
+    def test_scope_comes_from_the_loaded_user(self):
+        self.client.force_login(self.admin)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('delivery_create'))
+        self.assertContains(response, 'Amathole DM')
+        # The user's load joins the profile and prefetches the groups; the scope adds nothing.
+        self.assertEqual(len([query for query in queries if 'FROM "auth_group"' in query['sql']]), 1)
+        self.assertFalse([query for query in queries if 'FROM "accounts_profile"' in query['sql']])
+
+    def test_role_changes_apply_to_the_next_request_of_the_user(self):
+        user = User.objects.create_user('00000022', first_name='Sipho', last_name='Dlamini', password='x')
+        user.groups.add(Group.objects.get(name='Admin'))
+        Profile.objects.create(user=user, persal_number='00000022', district=self.district)
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(reverse('user_list')).status_code, 200)
+
+        superuser = User.objects.create_superuser('00000023', password='x')
+        admin_client = self.client_class()
+        admin_client.force_login(superuser)
+        response = admin_client.post(reverse('user_update', args=[user.pk]), {
+            'first_name': 'Sipho', 'last_name': 'Dlamini', 'title': 'Mr',
+            'persal_number': '00000022', 'role': Group.objects.get_or_create(name='User')[0].pk,
+            'district': 'Amathole DM', 'local_municipality': 'Mnquma LM', 'facility': 'Butterworth Hospital',
+        })
+        self.assertRedirects(response, reverse('user_list'))
+        self.assertEqual(self.client.get(reverse('user_list')).status_code, 403)  # no longer an Admin
+
+
+@override_settings(CACHES=dict(settings.CACHES, auth={'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}))
+class CachedUserTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('00000030', password='Sturdy-Pass-2026')
+        self.user.groups.add(Group.objects.get_or_create(name='User')[0])
+        _, _, facility = locations_from_names('Amathole DM', 'Mnquma LM', 'Butterworth Hospital')
+        Profile.objects.create(user=self.user, persal_number='00000030', facility=facility)
+        self.backend = PersalAuthBackend()
+
+    def test_authenticate_reads_profile_and_user_together(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.backend.authenticate(None, '00000030', 'wrong'), None)
+        self.assertEqual(self.backend.authenticate(None, '00000030', 'Sturdy-Pass-2026'), self.user)
+
+    def test_user_is_cached_with_profile_and_groups_until_it_changes(self):
+        self.backend.get_user(self.user.pk)
+        with self.assertNumQueries(0):
+            user = self.backend.get_user(self.user.pk)
+            scope = RoleScope.for_user(user)
+        self.assertEqual((scope.is_facility_user, scope.location_names[2]), (True, 'Butterworth Hospital'))
+
+        self.user.groups.clear()
+        self.assertFalse(RoleScope.for_user(self.backend.get_user(self.user.pk)).is_facility_user)
+        group = Group.objects.get(name='User')
+        group.user_set.add(self.user)
+        self.assertTrue(RoleScope.for_user(self.backend.get_user(self.user.pk)).is_facility_user)
+        group.user_set.clear()
+        self.assertFalse(RoleScope.for_user(self.backend.get_user(self.user.pk)).is_facility_user)
+        self.user.profile.facility = None
+        self.user.profile.save()
+        self.assertIsNone(self.backend.get_user(self.user.pk).profile.facility)
+        self.user.delete()
+        self.assertIsNone(self.backend.get_user(self.user.pk))
+
+    def test_users_are_not_cached_without_a_shared_cache(self):
+        with self.settings(CACHES={key: value for key, value in settings.CACHES.items() if key != 'auth'}):
+            self.backend.get_user(self.user.pk)
+            with self.assertNumQueries(2):
+                user = self.backend.get_user(self.user.pk)
+                self.assertEqual(RoleScope.for_user(user).location_names[2], 'Butterworth Hospital')
+
+
+@override_settings(LOGIN_THROTTLE_RATES={'persal': (2, 60), 'ip': (100, 1)})
+class LoginThrottleTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('00000040', password='Sturdy-Pass-2026')
+        Profile.objects.create(user=self.user, persal_number='00000040')
+
+    def login(self, password):
+        return self.client.post(reverse('login'), {'username': '00000040', 'password': password})
+
+    def test_attempts_are_refused_before_the_password_is_checked(self):
+        self.assertEqual(self.login('wrong').status_code, 200)
+        self.assertEqual(self.login('wrong').status_code, 200)
+        with mock.patch.object(PersalAuthBackend, 'authenticate') as authenticate:
+            response = self.login('Sturdy-Pass-2026')
+        authenticate.assert_not_called()
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+
+        superuser = User.objects.create_superuser('admin', password='x')
+        self.client.force_login(superuser)
+        response = self.client.get(reverse('login_lockouts'))
+        lockout = LoginLockout.objects.get(kind='persal', identifier='00000040')
+        self.assertEqual(list(response.context['lockouts']), [lockout])
+        self.client.post(reverse('login_lockout_clear', args=[lockout.pk]))
+        self.assertFalse(LoginLockout.objects.exists())
+        self.client.logout()
+        self.assertRedirects(self.login('Sturdy-Pass-2026'), reverse('delivery_list'), fetch_redirect_response=False)
+
+    @override_settings(LOGIN_THROTTLE_RATES={'persal': (2, 60), 'ip': (3, 60)},
+                       CACHES=dict(settings.CACHES, default=dict(settings.CACHES['default'], OPTIONS={'MAX_ENTRIES': 10})))
+    def test_address_lockout_outlives_culls_of_the_default_cache(self):
+        for persal in ('00000041', '00000042', '00000043'):
+            self.client.post(reverse('login'), {'username': persal, 'password': 'wrong'})
+        keys = [f'metrics:{i}' for i in range(30)]  # sorting after the throttle's keys, which are culled first
+        cache.set_many(dict.fromkeys(keys, 1))
+        self.assertLess(len(cache.get_many(keys)), 30)  # the default cache was culled
+        self.assertEqual(self.login('Sturdy-Pass-2026').status_code, 429)
+
+    def test_successful_login_refills_the_persal_bucket(self):
+        self.login('wrong')
+        self.login('Sturdy-Pass-2026')
+        self.client.logout()
+        self.assertEqual(self.login('wrong').status_code, 200)
+        self.assertEqual(self.login('wrong').status_code, 200)
+        self.assertEqual(self.login('wrong').status_code, 429)
+
+
+class UserImportTests(TestCase):
+    CSV = ("Persal Number,First Name,Last Name,Role,District,Local Municipality,Facility,Title\n"
+           "00000050,Thandi,Mbeki,User,Amathole DM,Mnquma LM,Butterworth Hospital,Ms\n"
+           "00000051,Sipho,Ndlovu,Admin,Amathole DM,,,\n"
+           "00000052,Lerato,Khumalo,ProvinceUser,,,,Dr\n")
+
+    def setUp(self):
+        for name in ('Admin', 'User', 'ProvinceUser'): Group.objects.get_or_create(name=name)
+
+    def test_command_provisions_users_with_hashes_from_the_pool(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as file:
+            file.write(self.CSV)
+            file.flush()
+            call_command('import_users', file.name, workers=2, stdout=StringIO())
+
+        users = User.objects.filter(username__startswith='0000005').order_by('username').select_related('profile__facility')
+        self.assertEqual([(u.username, u.groups.get().name, u.profile.must_change_password) for u in users],
+                         [('00000050', 'User', True), ('00000051', 'Admin', True), ('00000052', 'ProvinceUser', True)])
+        self.assertEqual(users[0].profile.facility.name, 'Butterworth Hospital')
+        self.assertTrue(all(user.check_password(DEFAULT_PASSWORD) for user in users))
+        self.assertEqual(len({user.password for user in users}), 3)
+
+    def test_invalid_rows_import_nothing(self):
+        admin = User.objects.create_user('00000053', password='x')
+        admin.groups.add(Group.objects.get(name='Admin'))
+        Profile.objects.create(user=admin, persal_number='00000053', district=locations_from_names('Alfred Nzo DM')[0])
+        self.client.force_login(admin)
+        csv_file = SimpleUploadedFile('users.csv', (self.CSV + "0000005,Jo,,User,Amathole DM,Nowhere LM,,\n").encode())
+        response = self.client.post(reverse('user_import'), {'file': csv_file})
+
+        errors = response.context['errors']
+        self.assertIn((2, 'Admins can only import users with the User role in their own district.'), errors)
+        self.assertIn((5, '"Nowhere LM" is not a municipality of "Amathole DM".'), errors)
+        self.assertIn((5, 'Name must be at least 3 characters.'), errors)
+        self.assertFalse(User.objects.filter(username__startswith='0000005').exclude(pk=admin.pk).exists())
+
+    def test_unreadable_and_oversized_uploads_are_form_errors(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='x'))
+        cp1252 = SimpleUploadedFile('users.csv', self.CSV.replace('Thandi', 'Thandé').encode('cp1252'))
+        workbook = SimpleUploadedFile('users.xlsx', b'PK\x03\x04\x14\x00\x06\x00\x08\x00\x00\x00!\x00\xa0\xc4\x00\x00')
+        for upload in (cp1252, workbook):
+            response = self.client.post(reverse('user_import'), {'file': upload})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([line for line, _ in response.context['errors']], [1])
+
+        with self.settings(USER_IMPORT_MAX_UPLOAD_ROWS=2):
+            response = self.client.post(reverse('user_import'), {'file': SimpleUploadedFile('users.csv', self.CSV.encode())})
+        self.assertIn('manage.py import_users', response.context['form'].errors['file'][0])
+        self.assertFalse(User.objects.filter(username__startswith='0000005').exists())
+
+    @override_settings(USER_IMPORT_HASH_WORKERS=8, USER_IMPORT_UPLOAD_HASH_WORKERS=0)
+    def test_uploads_hash_with_the_web_pool_size(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='x'))
+        with mock.patch('accounts.provisioning.ProcessPoolExecutor') as pool:
+            response = self.client.post(reverse('user_import'), {'file': SimpleUploadedFile('users.csv', self.CSV.encode())})
+        self.assertRedirects(response, reverse('user_list'))
+        pool.assert_not_called()  # hashed inline, not across USER_IMPORT_HASH_WORKERS processes
+        self.assertEqual(User.objects.filter(username__startswith='0000005').count(), 3)
@@ -0,0 +1,89 @@
+# accounts/throttle.py
+
+import hashlib
+import logging
+import math
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from .models import LoginLockout
+
+logger = logging.getLogger(__name__)
+
+DATABASE_CACHE_ALIAS = 'login_throttle'  # see LOGIN_THROTTLE_CACHE in settings
+
+
+def client_ip(request):
+    """The client's address: with LOGIN_THROTTLE_PROXY_COUNT proxies in front, the one the outermost proxy saw."""
+    proxies = settings.LOGIN_THROTTLE_PROXY_COUNT
+    forwarded = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+    if proxies and len(forwarded) >= proxies: return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def bucket_key(kind, identifier):
+    return f"login-throttle:{kind}:{hashlib.sha256(identifier.encode()).hexdigest()[:32]}"
+
+
+def _cache(method, *args):
+    """Calls LOGIN_THROTTLE_CACHE, or the throttle's database cache while that cache server is unreachable."""
+    alias = settings.LOGIN_THROTTLE_CACHE
+    try:
+        return getattr(caches[alias], method)(*args)
+    except Exception:
+        if alias == DATABASE_CACHE_ALIAS: raise
+        logger.warning("Login throttle cache '%s' is unavailable, using the database cache", alias, exc_info=True)
+        return getattr(caches[DATABASE_CACHE_ALIAS], method)(*args)
+
+
+def take(request, persal_number):
+    """
+    Takes a token from the Persal number's and the client address's buckets
+    (LOGIN_THROTTLE_RATES) before a login attempt's password is checked.
+
+    Returns 0 if the attempt may go ahead, otherwise the seconds until it may be
+    retried; refused attempts take nothing. Buckets are read and written
+    without a lock, so simultaneous attempts can overdraw one slightly.
+    """
+    now = time.time()
+    identifiers = {'persal': persal_number.strip()[:64], 'ip': client_ip(request)}
+    buckets = {kind: (identifier, bucket_key(kind, identifier), *settings.LOGIN_THROTTLE_RATES[kind])
+               for kind, identifier in identifiers.items() if identifier}
+    stored = _cache('get_many', [key for _, key, _, _ in buckets.values()])
+
+    levels, wait = {}, 0
+    for kind, (_, key, capacity, interval) in buckets.items():
+        level, updated = stored.get(key, (capacity, now))
+        levels[kind] = min(capacity, level + (now - updated) / interval)
+        if levels[kind] < 1: wait = max(wait, (1 - levels[kind]) * interval)
+    if wait: return math.ceil(wait)
+
+    # Kept until the bucket would be full again, when a missing key means the same.
+    timeout = max(capacity * interval for _, _, capacity, interval in buckets.values())
+    _cache('set_many', {key: (levels[kind] - 1, now) for kind, (_, key, _, _) in buckets.items()}, timeout)
+    for kind, (identifier, _, _, interval) in buckets.items():
+        if levels[kind] - 1 < 1: _record_lockout(kind, identifier, (2 - levels[kind]) * interval)
+    return 0
+
+
+def _record_lockout(kind, identifier, seconds):
+    """Lists a bucket that just ran empty for admins; once per lockout, so floods add no writes."""
+    now = timezone.now()
+    LoginLockout.objects.filter(locked_until__lt=now).delete()
+    LoginLockout.objects.update_or_create(kind=kind, identifier=identifier,
+                                          defaults={'locked_until': now + timedelta(seconds=seconds)})
+
+
+def reset(persal_number):
+    """Refills a Persal number's bucket after a successful login, so earlier typos do not count against it."""
+    _cache('delete', bucket_key('persal', persal_number.strip()[:64]))
+
+
+def clear(lockout):
+    """Lifts a lockout early (LoginLockoutListView)."""
+    _cache('delete', bucket_key(lockout.kind, lockout.identifier))
+    lockout.delete()
@@ -4,6 +4,9 @@ from . import views
 urlpatterns = [
     path('', views.UserListView.as_view(), name='user_list'),
     path('new/', views.UserCreateView.as_view(), name='user_create'),
+    path('import/', views.UserImportView.as_view(), name='user_import'),
     path('<int:pk>/edit/', views.UserUpdateView.as_view(), name='user_update'),
     path('<int:pk>/delete/', views.UserDeleteView.as_view(), name='user_delete'),
+    path('lockouts/', views.LoginLockoutListView.as_view(), name='login_lockouts'),
+    path('lockouts/<int:pk>/clear/', views.LoginLockoutClearView.as_view(), name='login_lockout_clear'),
 ]
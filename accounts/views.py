@@ -1,17 +1,28 @@
 # accounts/views.py
 
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth import views as auth_views
 from django.contrib.auth.mixins import UserPassesTestMixin
-from django.views.generic import ListView, CreateView, UpdateView, DeleteView
+from django.views.generic import ListView, CreateView, FormView, UpdateView, DeleteView
 from django.contrib.auth.models import User
+from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse_lazy
-from django.db.models import Q
-from .forms import UserCreateForm, UserUpdateForm
+from django.db.models import OuterRef, Q, Subquery, Value
+from django.db.models.functions import Concat
+from django.utils import timezone
+from . import throttle
+from .forms import UserCreateForm, UserImportForm, UserUpdateForm
+from .models import LoginLockout, Profile
+from .backends import invalidate_user_cache
+from .provisioning import COLUMNS, provision_users, read_user_rows
+from births.models import location_names
 from django.core.cache import cache
 
 class AdminRequiredMixin(UserPassesTestMixin):
     """Ensures the logged-in user is a Superuser or in the 'Admin' group."""
     def test_func(self):
-        return self.request.user.is_superuser or self.request.user.groups.filter(name='Admin').exists()
+        return self.request.scope.can_manage_users
 
 class UserListView(AdminRequiredMixin, ListView):
     """Displays a paginated and searchable list of users, respecting permissions."""
@@ -21,14 +32,14 @@ class UserListView(AdminRequiredMixin, ListView):
     paginate_by = 15
 
     def get_queryset(self):
-        queryset = super().get_queryset().select_related('profile').order_by('first_name')
-        user = self.request.user
+        queryset = super().get_queryset().select_related('profile__district', 'profile__facility').order_by('first_name')
+        scope = self.request.scope
 
         # Superusers see all users. Admins see only users in their own district.
-        if user.is_superuser:
+        if scope.is_superuser:
             pass
-        elif user.groups.filter(name='Admin').exists():
-            queryset = queryset.filter(profile__district=user.profile.district)
+        elif scope.is_admin:
+            queryset = queryset.filter(profile__district_id=scope.district_id)
 
         # Apply search filtering after permission filtering
         query = self.request.GET.get('q')
@@ -37,8 +48,8 @@ class UserListView(AdminRequiredMixin, ListView):
                 Q(first_name__icontains=query) |
                 Q(last_name__icontains=query) |
                 Q(profile__persal_number__icontains=query) |
-                Q(profile__district__icontains=query) |
-                Q(profile__facility__icontains=query)
+                Q(profile__district__name__icontains=query) |
+                Q(profile__facility__name__icontains=query)
             )
         return queryset
 class UserCreateView(AdminRequiredMixin, CreateView):
@@ -57,9 +68,38 @@ class UserCreateView(AdminRequiredMixin, CreateView):
     def get_form_kwargs(self):
         """Passes the logged-in user to the form for permission checks."""
         kwargs = super().get_form_kwargs()
-        kwargs['user'] = self.request.user
+        kwargs['scope'] = self.request.scope
         return kwargs
 
+class UserImportView(AdminRequiredMixin, FormView):
+    """Creates many users at once from an uploaded CSV (accounts.provisioning)."""
+    form_class = UserImportForm
+    template_name = 'accounts/user_import.html'
+    max_errors = 50
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['columns'], context['max_rows'] = COLUMNS, settings.USER_IMPORT_MAX_UPLOAD_ROWS
+        return context
+
+    def form_valid(self, form):
+        rows, errors = read_user_rows(form.cleaned_data['file'], scope=self.request.scope)
+        if errors:
+            # Nothing is imported until the whole file is valid.
+            return self.render_to_response(self.get_context_data(
+                form=form, errors=errors[:self.max_errors], more_errors=len(errors) - self.max_errors))
+        if not rows:
+            form.add_error('file', 'The file has no users in it.')
+            return self.form_invalid(form)
+        if len(rows) > settings.USER_IMPORT_MAX_UPLOAD_ROWS:
+            # Hashing the passwords of a larger file would outlast the request timeout.
+            form.add_error('file', f'Upload at most {settings.USER_IMPORT_MAX_UPLOAD_ROWS} users at a time, '
+                                   f'or ask a system administrator to run `manage.py import_users` for this file.')
+            return self.form_invalid(form)
+        users = provision_users(rows, workers=settings.USER_IMPORT_UPLOAD_HASH_WORKERS)
+        messages.success(self.request, f'Imported {len(users)} users. Each must change the temporary password at first login.')
+        return redirect('user_list')
+
 class UserUpdateView(AdminRequiredMixin, UpdateView):
     """Handles editing an existing user."""
     model = User
@@ -76,15 +116,14 @@ class UserUpdateView(AdminRequiredMixin, UpdateView):
         # Pass the user's saved municipality and facility to the template.
         # This allows the JavaScript to pre-select the correct options on page load.
         if hasattr(self.object, 'profile'):
-            context['initial_municipality'] = self.object.profile.local_municipality
-            context['initial_facility'] = self.object.profile.facility
+            _, context['initial_municipality'], context['initial_facility'] = location_names(self.object.profile)
         
         return context
 
     def get_form_kwargs(self):
         """Passes the logged-in user to the form for permission checks."""
         kwargs = super().get_form_kwargs()
-        kwargs['user'] = self.request.user
+        kwargs['scope'] = self.request.scope
         return kwargs
 
 class UserDeleteView(AdminRequiredMixin, DeleteView):
@@ -92,3 +131,62 @@ class UserDeleteView(AdminRequiredMixin, DeleteView):
     model = User
     template_name = 'accounts/user_confirm_delete.html'
     success_url = reverse_lazy('user_list')
+
+
+class PasswordChangeView(auth_views.PasswordChangeView):
+    """Django's password change, which also clears the forced-change flag."""
+    template_name = 'registration/password_change_form.html'
+    success_url = reverse_lazy('password_change_done')
+
+    def form_valid(self, form):
+        response = super().form_valid(form)
+        Profile.objects.filter(user=form.user, must_change_password=True).update(must_change_password=False)
+        invalidate_user_cache(form.user.pk)  # update() sends no post_save
+        return response
+
+
+class LoginView(auth_views.LoginView):
+    """Django's login, throttled per Persal number and client address before any password is checked."""
+    template_name = 'registration/login.html'
+
+    def post(self, request, *args, **kwargs):
+        retry_after = throttle.take(request, request.POST.get('username', ''))
+        if retry_after:
+            # An unbound form: rendering the posted one would validate it, hashing the password.
+            context = self.get_context_data(form=self.get_form_class()(request), retry_after=retry_after)
+            response = self.render_to_response(context, status=429)
+            response['Retry-After'] = retry_after
+            return response
+        return super().post(request, *args, **kwargs)
+
+    def form_valid(self, form):
+        throttle.reset(form.cleaned_data['username'])
+        return super().form_valid(form)
+
+
+class LoginLockoutListView(AdminRequiredMixin, ListView):
+    """Persal numbers and addresses currently refused logins by accounts.throttle."""
+    template_name = 'accounts/lockout_list.html'
+    context_object_name = 'lockouts'
+
+    def get_queryset(self):
+        holders = Profile.objects.filter(persal_number=OuterRef('identifier'))
+        queryset = LoginLockout.objects.filter(locked_until__gt=timezone.now()).annotate(holder=Subquery(
+            holders.annotate(name=Concat('user__first_name', Value(' '), 'user__last_name')).values('name')[:1]))
+        scope = self.request.scope
+        # Superusers see every lockout. Admins see only those of users in their own district.
+        if not scope.is_superuser:
+            queryset = queryset.filter(kind='persal', identifier__in=Profile.objects.filter(
+                district_id=scope.district_id).values('persal_number'))
+        return queryset
+
+
+class LoginLockoutClearView(LoginLockoutListView):
+    """Lifts a lockout before its bucket refills."""
+    http_method_names = ['post']
+
+    def post(self, request, pk):
+        lockout = get_object_or_404(self.get_queryset(), pk=pk)
+        throttle.clear(lockout)
+        messages.success(request, f'Lifted the login lockout on {lockout.get_kind_display()} {lockout.identifier}.')
+        return redirect('login_lockouts')
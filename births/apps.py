@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class BirthsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'births'
+
+    def ready(self):
+        from . import signals  # noqa: F401 -- connects the rollup receivers
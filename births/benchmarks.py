@@ -0,0 +1,102 @@
+# births/benchmarks.py
+
+import platform
+import statistics
+import time
+from urllib.parse import urlencode
+
+import django
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Delivery, Baby
+from .seeding import seed_births, seed_users
+
+BENCHMARK_SIZES = (10_000, 100_000, 1_000_000)
+BENCHMARK_PASSWORD = 'Benchmark-Pass-2025'
+
+
+def benchmark_targets():
+    """(name, url, client role) of every benchmarked endpoint; the role is 'anonymous', 'superuser' or 'User'."""
+    def url(name, **params):
+        return reverse(name) + (f"?{urlencode(params)}" if params else '')
+
+    return [
+        ('landing_page', url('landing_page'), 'anonymous'),
+        ('landing_page_district', url('landing_page', district='Amathole DM'), 'anonymous'),
+        ('api_dashboard', url('api_dashboard'), 'anonymous'),
+        ('delivery_list', url('delivery_list'), 'superuser'),
+        ('delivery_list_facility_user', url('delivery_list'), 'User'),
+        ('export_full_report_excel', url('export_full_report'), 'superuser'),
+        ('export_full_report_csv', url('export_full_report_csv'), 'superuser'),
+        ('generate_dashboard_pdf', url('generate_dashboard_pdf'), 'superuser'),
+        ('ajax_load_options', url('ajax_load_options', type='district', id='Amathole DM'), 'anonymous'),
+        ('ajax_get_facility_type', url('ajax_get_facility_type', facility_name='Frere Hospital'), 'anonymous'),
+    ]
+
+
+def measure(client, url, repeat):
+    """
+    GETs `url` `repeat` times, reading streamed bodies to the end. The first
+    request runs on a cleared cache and is reported separately from the rest.
+    """
+    cache.clear()
+    timings, query_counts = [], []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = client.get(url)
+            body = b''.join(response.streaming_content) if response.streaming else response.content
+            timings.append((time.perf_counter() - start) * 1000)
+        query_counts.append(len(queries))
+    warm = timings[1:] or timings
+    return {
+        'status': response.status_code, 'bytes': len(body),
+        'first_ms': round(timings[0], 1), 'first_queries': query_counts[0],
+        'median_ms': round(statistics.median(warm), 1), 'max_ms': round(max(warm), 1),
+        'queries': query_counts[-1],
+    }
+
+
+def benchmark_clients():
+    """Logged-in test clients for every role used by benchmark_targets()."""
+    superuser = User.objects.filter(username='benchmark-admin').first() or User.objects.create_superuser(
+        'benchmark-admin', password=BENCHMARK_PASSWORD)
+    facility_user = User.objects.filter(groups__name='User', profile__facility__isnull=False).first()
+    if facility_user is None:
+        facility_user = seed_users(1, BENCHMARK_PASSWORD)[1]  # Admin, User, ProvinceUser
+    clients = {'anonymous': Client(), 'superuser': Client(), 'User': Client()}
+    clients['superuser'].force_login(superuser)
+    clients['User'].force_login(facility_user)
+    return clients
+
+
+def run_benchmarks(sizes=BENCHMARK_SIZES, repeat=5, seed=None, stdout=None):
+    """
+    Grows the births data to each size in turn and measures every endpoint of
+    benchmark_targets() at that size. Meant for a throw-away database: data is
+    only ever added. Returns the report as a JSON-serialisable dict.
+    """
+    results = []
+    for size in sorted(sizes):
+        missing = size - Delivery.objects.count()
+        if missing > 0:
+            seed_births(missing, seed=None if seed is None else seed + size)
+        clients = benchmark_clients()
+        endpoints = {}
+        for name, url, role in benchmark_targets():
+            endpoints[name] = measure(clients[role], url, repeat)
+            if stdout:
+                stats = endpoints[name]
+                stdout.write(f"{size:>9} births  {name:<28} {stats['median_ms']:>9.1f} ms  {stats['queries']:>4} queries")
+        results.append({'births': Delivery.objects.count(), 'babies': Baby.objects.count(), 'endpoints': endpoints})
+    return {
+        'generated_at': timezone.now().isoformat(), 'repeat': repeat,
+        'database': connection.vendor, 'django': django.get_version(), 'python': platform.python_version(),
+        'results': results,
+    }
@@ -0,0 +1,302 @@
+# births/dashboard.py
+
+from collections import defaultdict
+import hashlib
+import json
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Q, Sum
+
+from .models import Delivery, Facility, FacilityDailyRollup, parse_report_date
+from .data import DISTRICT_CHOICES, WEIGHT_BANDS
+
+AGE_GROUP_LABELS = [band for band, _ in Delivery.AGE_BAND_CHOICES]
+TEENAGE_GROUPS = dict(zip(Delivery.TEENAGE_AGE_BANDS, ['group_10_14', 'group_15_19']))
+MULTIPLE_BIRTH_LABELS = {2: 'twins', 3: 'triplets', 4: 'quadruplets', 5: 'quintuplets'}
+
+CACHE_KEY_PREFIX = 'dashboard:v3'
+DATA_VERSION_KEY = 'dashboard:data-version'
+CACHE_LOCK_TIMEOUT = 30  # seconds a recomputation may hold the lock
+CACHE_LOCK_WAIT = 5  # seconds a cold miss waits for another worker's result
+
+
+def _sorted_rows(rows, key):
+    """Orders summary rows by their label, keeping empty labels at the end."""
+    return sorted(rows.values(), key=lambda row: (row[key] is None, row[key] or ''))
+
+
+def apply_filters(queryset, report_date=None, district=None, municipality=None, facility=None):
+    """
+    Applies the public dashboard filters to Delivery or FacilityDailyRollup rows.
+    Locations are filtered by name, and an unreadable report date matches nothing.
+    """
+    # Delivery points at the location tables, the rollup stores the names.
+    name = '__name' if queryset.model is Delivery else ''
+    if report_date: queryset = queryset.filter(report_date=parse_report_date(report_date))
+    if district: queryset = queryset.filter(**{f'district{name}': district})
+    if municipality: queryset = queryset.filter(**{f'local_municipality{name}': municipality})
+    if facility: queryset = queryset.filter(**{f'facility{name}': facility})
+    return queryset
+
+
+def summary_grouping(district=None, municipality=None, facility=None):
+    """Returns (group_by, title, header, footer) for the dynamic summary table."""
+    if facility:
+        return 'facility', f'Births in {facility}', 'Facility', facility
+    if municipality:
+        return 'facility', f'Births per Facility in {municipality}', 'Facility', municipality
+    if district:
+        return 'local_municipality', f'Births per Local Municipality in {district}', 'Local Municipality', district
+    return 'district', 'Births per District', 'District', 'Eastern Cape'
+
+
+def multiple_births_pivot(deliveries_qs):
+    """
+    Sets of twins/triplets/... per facility, computed as a two-level aggregation:
+    the inner query counts babies per delivery, the outer one counts those
+    deliveries conditionally per facility and joins in its name. Returns rows
+    sorted by facility name.
+    """
+    per_delivery = (deliveries_qs.filter(no_births_to_report=False).order_by()
+                    .values('pk', 'facility_id').annotate(baby_count=Count('babies'))
+                    .filter(baby_count__in=list(MULTIPLE_BIRTH_LABELS))
+                    .values('facility_id', 'baby_count'))
+    inner_sql, params = per_delivery.query.sql_with_params()
+    columns = ", ".join(
+        f"SUM(CASE WHEN baby_count = {n} THEN 1 ELSE 0 END) AS {label}" for n, label in MULTIPLE_BIRTH_LABELS.items()
+    )
+    facility_table = connection.ops.quote_name(Facility._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT f.name AS facility, {columns} FROM ({inner_sql}) AS per_delivery "
+            f"LEFT JOIN {facility_table} AS f ON f.id = per_delivery.facility_id GROUP BY f.name ORDER BY f.name", params
+        )
+        names = [col[0] for col in cursor.description]
+        return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+
+def build_dashboard_context(report_date=None, district=None, municipality=None, facility=None):
+    """
+    Computes every dashboard panel for the given filters.
+
+    Counts by location, time slot, facility type, birth mode and weight are read
+    from FacilityDailyRollup, so they cost O(facilities) rather than O(births).
+    The mother's age band and babies per delivery are not rolled up and come
+    from two grouped scans over Delivery LEFT JOIN Baby. The result only holds
+    plain dicts and lists so it can be cached or serialised.
+    """
+    filters = {'report_date': report_date, 'district': district, 'municipality': municipality, 'facility': facility}
+    deliveries_qs = apply_filters(Delivery.objects.all(), **filters)
+    group_by, title, header, footer = summary_grouping(district, municipality, facility)
+
+    totals = defaultdict(int)
+    weight_summary = {band: 0 for band, _, _ in WEIGHT_BANDS}
+    age_group_summary = {label: {'male_count': 0, 'female_count': 0, 'total': 0} for label in AGE_GROUP_LABELS}
+    summary, birth_modes, time_slots, facility_types, teenage = {}, {}, {}, {}, {}
+
+    def add(panel, key_name, key, male_count, female_count, total, total_name):
+        entry = panel.setdefault(key, {key_name: key, 'male_count': 0, 'female_count': 0, total_name: 0})
+        entry['male_count'] += male_count; entry['female_count'] += female_count; entry[total_name] += total
+
+    # --- Rollup scan: KPIs, location summary, slot, facility type, birth mode and weight ---
+    dimensions = [group_by, 'facility_type', 'time_slot', 'birth_mode']
+    measures = ['deliveries', 'nil_reports', 'babies', 'males', 'females'] + [f'weight_{band}' for band in weight_summary]
+    rollups = (apply_filters(FacilityDailyRollup.objects.all(), **filters)
+               .values(*dimensions).annotate(**{f'sum_{m}': Sum(m) for m in measures}).order_by())
+    for row in rollups:
+        # Empty strings in the rollup key stand for NULL in the Delivery table.
+        keys = {dim: row[dim] or None for dim in dimensions}
+        males, females, babies = row['sum_males'], row['sum_females'], row['sum_babies']
+        totals['births'] += babies; totals['males'] += males; totals['females'] += females
+        totals['nil_reports'] += row['sum_nil_reports']
+        for band in weight_summary: weight_summary[band] += row[f'sum_weight_{band}']
+        if row['sum_deliveries'] <= row['sum_nil_reports']:
+            continue
+        add(summary, group_by, keys[group_by], males, females, babies, 'total_babies')
+        add(time_slots, 'time_slot', keys['time_slot'], males, females, babies, 'total_in_slot')
+        add(facility_types, 'facility_type', keys['facility_type'], males, females, babies, 'total_in_type')
+        if keys['birth_mode']:
+            add(birth_modes, 'birth_mode', keys['birth_mode'], males, females, babies, 'total')
+
+    # --- Delivery scan: the stored age band of the mother at delivery, per facility ---
+    age_rows = (deliveries_qs.filter(no_births_to_report=False, age_band__isnull=False)
+                .values('facility__name', 'age_band').order_by()
+                .annotate(total=Count('babies'), male_count=Count('babies', filter=Q(babies__gender='Male')),
+                          female_count=Count('babies', filter=Q(babies__gender='Female'))))
+    for row in age_rows:
+        age_group = row['age_band']
+        counts = age_group_summary[age_group]
+        counts['male_count'] += row['male_count']; counts['female_count'] += row['female_count']; counts['total'] += row['total']
+        if age_group in TEENAGE_GROUPS and row['total']:
+            facility = row['facility__name']
+            entry = teenage.setdefault(facility, {'facility': facility, 'group_10_14': 0, 'group_15_19': 0})
+            entry[TEENAGE_GROUPS[age_group]] += row['total']
+
+    teenage_pregnancy_summary = _sorted_rows(teenage, 'facility')
+    teenage_totals = {
+        'total_10_14': sum(r['group_10_14'] for r in teenage_pregnancy_summary),
+        'total_15_19': sum(r['group_15_19'] for r in teenage_pregnancy_summary),
+    }
+    birth_mode_summary = _sorted_rows(birth_modes, 'birth_mode')
+
+    # --- Delivery scan: multiple births pivoted per facility in SQL ---
+    multiple_births_summary = multiple_births_pivot(deliveries_qs)
+
+    return {
+        'total_births': totals['births'], 'total_males': totals['males'], 'total_females': totals['females'],
+        'total_nil_reports': totals['nil_reports'], 'summary_data': _sorted_rows(summary, group_by),
+        'summary_title': title, 'summary_table_header': header, 'summary_footer_title': footer, 'summary_group_by': group_by,
+        'form_title': "Festive Season Dashboard", 'selected_date': report_date, 'selected_district': district,
+        'selected_municipality': municipality, 'selected_facility': facility,
+        'district_list': [d[0] for d in DISTRICT_CHOICES if d[0]],
+        'age_group_summary': age_group_summary, 'birth_mode_summary': birth_mode_summary,
+        'time_slot_summary': _sorted_rows(time_slots, 'time_slot'),
+        'facility_type_summary': _sorted_rows(facility_types, 'facility_type'),
+        'teenage_pregnancy_summary': teenage_pregnancy_summary, 'teenage_totals': teenage_totals,
+        'multiple_births_summary': multiple_births_summary,
+        'has_multiple_births': bool(multiple_births_summary),
+        # Data formatted specifically for Chart.js
+        'age_group_labels': json.dumps(list(age_group_summary.keys())),
+        'age_group_data': json.dumps([d['total'] for d in age_group_summary.values()]),
+        'birth_mode_labels': json.dumps([i['birth_mode'] for i in birth_mode_summary]),
+        'birth_mode_data': json.dumps([i['total'] for i in birth_mode_summary]),
+        'weight_summary': weight_summary,
+    }
+
+
+# ==========================================================
+# STALE-WHILE-REVALIDATE CACHE
+# ==========================================================
+def filters_from_request(request):
+    """Reads the dashboard filters from the GET parameters of the dropdowns."""
+    return {
+        'report_date': request.GET.get('report_date') or None,
+        'district': request.GET.get('district') or None,
+        'municipality': request.GET.get('local_municipality') or None,
+        'facility': request.GET.get('facility') or None,
+    }
+
+
+def data_version():
+    """
+    Opaque token that changes whenever Delivery or Baby data is committed.
+    If the cache loses it, a new token is issued, which only costs a refetch.
+    """
+    version = cache.get(DATA_VERSION_KEY)
+    if version is None:
+        cache.add(DATA_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(DATA_VERSION_KEY)
+    return version
+
+
+def bump_data_version():
+    cache.set(DATA_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def dashboard_cache_key(report_date=None, district=None, municipality=None, facility=None):
+    filters = json.dumps([report_date, district, municipality, facility])
+    return f"{CACHE_KEY_PREFIX}:{hashlib.sha1(filters.encode()).hexdigest()}"
+
+
+def _store(key, context):
+    ttl = settings.DASHBOARD_CACHE_TTL
+    entry = {'context': context, 'fresh_until': time.time() + ttl}
+    cache.set(key, entry, ttl + settings.DASHBOARD_CACHE_STALE_TTL)
+
+
+def _compute(filters):
+    # The version is read first, so a change committed mid-computation is picked up next time.
+    version = data_version()
+    context = build_dashboard_context(**filters)
+    context['data_version'] = version
+    return context
+
+
+def get_dashboard_context(report_date=None, district=None, municipality=None, facility=None):
+    """
+    Returns build_dashboard_context() through the shared cache, with the data
+    version it was computed from under 'data_version'.
+
+    A fresh entry is returned as is, and a stale one whose data has not changed
+    since is simply marked fresh again. Otherwise the one request that takes the
+    lock recomputes it while every other request keeps getting the stale copy.
+    On a cold miss the requests that lose the race wait briefly for the winner's
+    result instead of all querying the database.
+    """
+    filters = {'report_date': report_date, 'district': district, 'municipality': municipality, 'facility': facility}
+    key = dashboard_cache_key(**filters)
+    lock_key = f"{key}:lock"
+
+    entry = cache.get(key)
+    if entry and entry['fresh_until'] > time.time():
+        return entry['context']
+    if entry and entry['context']['data_version'] == data_version():
+        _store(key, entry['context'])
+        return entry['context']
+
+    if not cache.add(lock_key, 1, CACHE_LOCK_TIMEOUT):
+        if entry:
+            return entry['context']
+        deadline = time.time() + CACHE_LOCK_WAIT
+        while time.time() < deadline:
+            time.sleep(0.1)
+            entry = cache.get(key)
+            if entry:
+                return entry['context']
+        # The other worker is taking too long; compute without the lock rather than fail.
+        context = _compute(filters)
+        _store(key, context)
+        return context
+
+    try:
+        context = _compute(filters)
+        _store(key, context)
+        return context
+    finally:
+        cache.delete(lock_key)
+
+
+# ==========================================================
+# JSON API PAYLOAD
+# ==========================================================
+def dashboard_etag(context, report_date=None, district=None, municipality=None, facility=None):
+    """Strong ETag: the same filters and data version always produce the same payload."""
+    filters = json.dumps([report_date, district, municipality, facility])
+    return f'"{context["data_version"]}-{hashlib.sha1(filters.encode()).hexdigest()[:12]}"'
+
+
+def dashboard_payload(context):
+    """Compact, presentation-free version of the dashboard context for the JSON API."""
+    def rows(items, label, total):
+        return [{'label': r[label], 'male': r['male_count'], 'female': r['female_count'], 'total': r[total]} for r in items]
+
+    group_by = context['summary_group_by']
+    return {
+        'version': context['data_version'],
+        'filters': {
+            'report_date': context['selected_date'], 'district': context['selected_district'],
+            'local_municipality': context['selected_municipality'], 'facility': context['selected_facility'],
+        },
+        'totals': {
+            'births': context['total_births'], 'males': context['total_males'],
+            'females': context['total_females'], 'nil_reports': context['total_nil_reports'],
+        },
+        'summary': {'group_by': group_by, 'rows': rows(context['summary_data'], group_by, 'total_babies')},
+        'age_groups': [
+            {'label': label, 'male': c['male_count'], 'female': c['female_count'], 'total': c['total']}
+            for label, c in context['age_group_summary'].items()
+        ],
+        'birth_modes': rows(context['birth_mode_summary'], 'birth_mode', 'total'),
+        'time_slots': rows(context['time_slot_summary'], 'time_slot', 'total_in_slot'),
+        'facility_types': rows(context['facility_type_summary'], 'facility_type', 'total_in_type'),
+        'teenage_pregnancies': {
+            'rows': context['teenage_pregnancy_summary'],
+            'totals': context['teenage_totals'],
+        },
+        'multiple_births': context['multiple_births_summary'],
+        'weights': context['weight_summary'],
+    }
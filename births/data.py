@@ -51,6 +51,15 @@ LOCATION_DATA = {
     }
 }
 
+# Birth weight bands in grams: (key, lower bound inclusive, upper bound exclusive)
+WEIGHT_BANDS = [
+    ("extremely_low", None, 1000),
+    ("very_low", 1000, 1500),
+    ("low", 1500, 2500),
+    ("normal", 2500, 4000),
+    ("high", 4000, None),
+]
+
 DISTRICT_CHOICES = [
     ("", "--Select District--"),
     ("Alfred Nzo DM", "Alfred Nzo DM"),
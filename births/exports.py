@@ -0,0 +1,592 @@
+# births/exports.py
+
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import csv
+import hashlib
+import json
+import tempfile
+import threading
+import zipfile
+import zlib
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.staticfiles import finders
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Case, CharField, Count, Max, Q, Value, When
+from django.db.models.functions import Length
+from django.template.loader import render_to_string
+from django.utils.text import slugify
+
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, PatternFill
+from openpyxl.utils import get_column_letter
+
+from .dashboard import get_dashboard_context
+from .data import DISTRICT_CHOICES
+from .forms import NilReportFilterForm
+from .models import ABNORMAL_WEIGHT, Baby, Delivery, District, REPORT_DATE_FORMAT, location_names
+from .pdf_render import PDFRenderPool, render_pdf
+
+EXPORT_CHUNK_SIZE = 2000  # rows fetched per round trip while streaming an export
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+STREAM_ROWS_PER_CHUNK = 500  # text rows joined into one chunk of a streaming response
+
+HEADER_FONT = Font(bold=True, color="FFFFFF")
+HEADER_FILL = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
+
+
+# ==========================================================
+# COLUMNS
+# ==========================================================
+def column_widths(queryset, columns):
+    """Widths for `columns`, measuring every lookup column with a single MAX(LENGTH()) query."""
+    lookups = [spec for _, spec in columns if isinstance(spec, str)]
+    longest = queryset.order_by().aggregate(**{f'width_{i}': Max(Length(lookup)) for i, lookup in enumerate(lookups)})
+    measured = dict(zip(lookups, longest.values()))
+    return [max(len(header), (measured[spec] or 0) if isinstance(spec, str) else spec) + 2 for header, spec in columns]
+
+
+# ==========================================================
+# EXPORT SPECS
+# An export is declared once: its columns, the rows a user may see and how
+# they are fetched and formatted. Any writer in WRITERS can then stream it.
+# rows() must cost a fixed number of queries however many rows there are.
+# ==========================================================
+class ExportSpec:
+    name = None      # key in EXPORTS and in the export URL
+    title = None     # sheet and report title
+    filename = None  # download name without its extension
+    columns = []     # (header, lookup to measure or fixed width)
+
+    @property
+    def headers(self):
+        return [header for header, _ in self.columns]
+
+    def has_permission(self, scope):
+        return True
+
+    def get_queryset(self, scope, params=None):
+        """What the RoleScope `scope` may export, narrowed by the request's `params` where the export has filters."""
+        raise NotImplementedError
+
+    def rows(self, queryset):
+        raise NotImplementedError
+
+    def count(self, queryset):
+        """Rows rows() will yield, for progress reporting."""
+        return queryset.count()
+
+    def widths(self, queryset):
+        return column_widths(queryset, self.columns)
+
+
+# --- FULL REPORT (one row per baby, one per NIL report) ---
+# Text columns are sized from the data with one aggregate query; dates,
+# numbers and flags have known widths.
+FULL_REPORT_COLUMNS = [
+    ('Timestamp', 16), ('Report Date', 17), ('Time Slot', 'time_slot'), ('Time of Birth', 5),
+    ('District', 'district__name'), ('Local Municipality', 'local_municipality__name'),
+    ('Facility', 'facility__name'), ('Facility Type', 'facility_type'),
+    ('Mother Name', 'mother_name'), ('Mother Surname', 'mother_surname'),
+    ('Mother D.O.B.', 10), ('Gravidity', 2), ('Parity', 2), ('Birth Mode', 'birth_mode'),
+    ('Born Before Arrival', 3), ('Baby Number', 10), ('Baby Gender', 6), ('Baby Weight (grams)', 5),
+    ('Captured By (Username)', 'captured_by__username'),
+]
+FULL_REPORT_FIELDS = [
+    'id', 'timestamp', 'report_date', 'time_slot', 'delivery_time',
+    'district__name', 'local_municipality__name', 'facility__name', 'facility_type',
+    'mother_name', 'mother_surname', 'mother_dob', 'gravidity', 'parity', 'birth_mode',
+    'born_before_arrival', 'no_births_to_report', 'mother_age_at_delivery', 'captured_by__username',
+    'babies__id', 'babies__gender', 'babies__weight',
+]
+
+
+def full_report_row_count(queryset):
+    """Rows of the full report: one per baby and one per NIL report."""
+    return queryset.aggregate(rows=Count('babies') + Count('id', filter=Q(no_births_to_report=True)))['rows']
+
+
+def full_report_records(queryset):
+    """
+    Yields (row, baby number) for every baby and NIL report of `queryset` from
+    one streamed LEFT JOIN of deliveries and babies, so memory stays flat
+    however many rows there are. NIL reports have no baby number.
+    """
+    rows = (queryset.order_by('timestamp', 'id', 'babies__id').values(*FULL_REPORT_FIELDS)
+            .iterator(chunk_size=EXPORT_CHUNK_SIZE))
+    delivery_id, baby_number = None, 0
+    for row in rows:
+        if row['id'] != delivery_id: delivery_id, baby_number = row['id'], 0
+        if row['no_births_to_report']:
+            yield row, None
+        elif row['babies__id'] is not None:
+            baby_number += 1
+            yield row, baby_number
+
+
+class FullReportExport(ExportSpec):
+    name, title, filename = 'full_report', 'Festive Births Full Report', 'festive_births_full_report'
+    columns = FULL_REPORT_COLUMNS
+
+    def get_queryset(self, scope, params=None):
+        return Delivery.objects.for_scope(scope, exports=True)
+
+    def count(self, queryset):
+        return full_report_row_count(queryset)
+
+    def rows(self, queryset):
+        for row, baby_number in full_report_records(queryset):
+            common = [
+                row['timestamp'].strftime('%Y-%m-%d %H:%M'),
+                row['report_date'].strftime(REPORT_DATE_FORMAT),
+                row['time_slot'],
+                row['delivery_time'].strftime('%H:%M') if row['delivery_time'] else '',
+                row['district__name'] or '', row['local_municipality__name'] or '', row['facility__name'] or '',
+                row['facility_type'],
+                row['mother_name'],
+                row['mother_surname'],
+                row['mother_dob'].strftime('%Y-%m-%d') if row['mother_dob'] else '',
+                row['gravidity'],
+                row['parity'],
+                row['birth_mode'],
+                'Yes' if row['born_before_arrival'] else 'No',
+            ]
+            captured_by = row['captured_by__username'] or 'N/A'
+            if baby_number is None:
+                yield common + ['NIL Report', 'N/A', 'N/A', captured_by]
+            else:
+                yield common + [baby_number, row['babies__gender'], row['babies__weight'], captured_by]
+
+
+# --- USER LIST ---
+class UserListExport(ExportSpec):
+    name, title, filename = 'user_list', 'User List Report', 'user_list_report'
+    columns = [
+        ('Name', 'first_name'), ('Surname', 'last_name'), ('Email', 'email'), ('Title', 'profile__title'),
+        ('Designation', 'profile__designation'), ('Persal Number', 'profile__persal_number'),
+        ('Mobile Number', 'profile__mobile_number'), ('Role(s)', 30),
+        ('Allocated District', 'profile__district__name'), ('Allocated Local Municipality', 'profile__local_municipality__name'),
+        ('Allocated Facility', 'profile__facility__name'), ('Active Account', 3), ('Superuser Status', 3),
+    ]
+
+    def has_permission(self, scope):
+        return scope.is_superuser
+
+    def get_queryset(self, scope, params=None):
+        return User.objects.all() if self.has_permission(scope) else User.objects.none()
+
+    def rows(self, queryset):
+        """One query for every user's roles, then one streamed query for the users and their profiles."""
+        roles = defaultdict(list)
+        memberships = (User.groups.through.objects.filter(user__in=queryset.values('pk'))
+                       .order_by('group__name').values_list('user_id', 'group__name'))
+        for user_id, group in memberships:
+            roles[user_id].append(group)
+
+        users = (queryset.select_related('profile__district', 'profile__local_municipality', 'profile__facility')
+                 .order_by('first_name', 'last_name'))
+        for app_user in users.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            profile = getattr(app_user, 'profile', None)
+            yield [
+                app_user.first_name, app_user.last_name, app_user.email,
+                profile.title if profile else '', profile.designation if profile else '',
+                profile.persal_number if profile else '', profile.mobile_number if profile else '',
+                ", ".join(roles[app_user.pk]),
+                *(location_names(profile) if profile else ('', '', '')),
+                'Yes' if app_user.is_active else 'No',
+                'Yes' if app_user.is_superuser else 'No',
+            ]
+
+
+# --- ABNORMAL BIRTH WEIGHTS (one row per baby outside 2500g - 3999g) ---
+class AbnormalWeightExport(ExportSpec):
+    name, title, filename = 'abnormal_weights', 'Abnormal Birth Weight Report', 'abnormal_birth_weights'
+    columns = [
+        ('District', 'delivery__district__name'), ('Facility', 'delivery__facility__name'),
+        ("Mother's Full Name", 30), ('Time of Birth', 5), ('Birth Weight (grams)', 5), ('Comment', 17),
+    ]
+
+    def get_queryset(self, scope, params=None):
+        # select_related serves the on-screen report's instances; rows() reads values() instead.
+        return Baby.objects.for_scope(scope).select_related(
+            'delivery', 'delivery__captured_by', 'delivery__district', 'delivery__facility',
+        ).filter(ABNORMAL_WEIGHT).annotate(
+            comment=Case(
+                When(weight__lt=1000, then=Value('Extremely Low')),
+                When(weight__gte=1000, weight__lt=1500, then=Value('Very Low')),
+                When(weight__gte=1500, weight__lt=2500, then=Value('Low')),
+                When(weight__gte=4000, then=Value('High / Macrosomic')),
+                default=Value('N/A'),
+                output_field=CharField(),
+            )
+        ).order_by('-delivery__timestamp')
+
+    def rows(self, queryset):
+        rows = queryset.values(
+            'delivery__district__name', 'delivery__facility__name', 'delivery__mother_name',
+            'delivery__mother_surname', 'delivery__delivery_time', 'weight', 'comment',
+        ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        for row in rows:
+            yield [
+                row['delivery__district__name'] or '', row['delivery__facility__name'] or '',
+                " ".join(part for part in (row['delivery__mother_name'], row['delivery__mother_surname']) if part),
+                row['delivery__delivery_time'].strftime('%H:%M') if row['delivery__delivery_time'] else '',
+                row['weight'], row['comment'],
+            ]
+
+
+# --- NIL REPORTS ---
+class NilReportExport(ExportSpec):
+    name, title, filename = 'nil_reports', 'Nil Births Report', 'nil_births_report'
+    columns = [
+        ('Report Date', 17), ('District', 'district__name'), ('Local Municipality', 'local_municipality__name'),
+        ('Facility', 'facility__name'), ('Facility Type', 'facility_type'),
+        ('Captured By (Username)', 'captured_by__username'), ('Captured At', 16),
+    ]
+
+    def get_queryset(self, scope, params=None):
+        """NIL reports in the user's scope, narrowed by NilReportFilterForm's fields in `params`."""
+        params = params or {}
+        queryset = Delivery.objects.for_scope(scope).filter(no_births_to_report=True).select_related(
+            'captured_by', 'district', 'local_municipality', 'facility')
+
+        # Only the dates are read from the form; cleaned_data keeps them even if a location is invalid.
+        # report_date is a DateField, so the range is served by delivery_nil_report_idx.
+        form = NilReportFilterForm(params)
+        form.is_valid()
+        start_date, end_date = form.cleaned_data.get('start_date'), form.cleaned_data.get('end_date')
+        if start_date: queryset = queryset.filter(report_date__gte=start_date)
+        if end_date: queryset = queryset.filter(report_date__lte=end_date)
+
+        for field, lookup in (('district', 'district__name'), ('local_municipality', 'local_municipality__name'),
+                              ('facility', 'facility__name')):
+            if params.get(field): queryset = queryset.filter(**{lookup: params[field]})
+        return queryset.order_by('-report_date', 'district__name', 'facility__name')
+
+    def rows(self, queryset):
+        rows = queryset.values(
+            'report_date', 'district__name', 'local_municipality__name', 'facility__name', 'facility_type',
+            'captured_by__username', 'timestamp',
+        ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        for row in rows:
+            yield [
+                row['report_date'].strftime(REPORT_DATE_FORMAT),
+                row['district__name'] or '', row['local_municipality__name'] or '', row['facility__name'] or '',
+                row['facility_type'], row['captured_by__username'] or 'N/A',
+                row['timestamp'].strftime('%Y-%m-%d %H:%M'),
+            ]
+
+
+FULL_REPORT = FullReportExport()
+USER_LIST = UserListExport()
+ABNORMAL_WEIGHTS = AbnormalWeightExport()
+NIL_REPORTS = NilReportExport()
+EXPORTS = {export.name: export for export in (FULL_REPORT, USER_LIST, ABNORMAL_WEIGHTS, NIL_REPORTS)}
+
+
+# ==========================================================
+# WRITERS
+# A writer turns an export's rows into one file format. Streaming writers
+# yield text chunks for a StreamingHttpResponse; every writer can also
+# write() to a file. `track`, if given, wraps the row iterator (job progress).
+# ==========================================================
+def write_xlsx(file, title, columns, rows, widths):
+    """Writes a one-sheet workbook in openpyxl's write-only mode, which spools rows to disk."""
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(title)
+    # Write-only sheets emit their column widths before the first row.
+    for i, width in enumerate(widths, 1):
+        sheet.column_dimensions[get_column_letter(i)].width = width
+    header = []
+    for title_text, _ in columns:
+        cell = WriteOnlyCell(sheet, value=title_text)
+        cell.font = HEADER_FONT; cell.fill = HEADER_FILL; cell.alignment = Alignment(horizontal='center')
+        header.append(cell)
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(file)
+
+
+def _rows(export, queryset, track):
+    rows = export.rows(queryset)
+    return track(rows) if track else rows
+
+
+def _chunked(lines):
+    """Joins lines of text into chunks of STREAM_ROWS_PER_CHUNK."""
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) == STREAM_ROWS_PER_CHUNK:
+            yield ''.join(chunk); chunk = []
+    if chunk: yield ''.join(chunk)
+
+
+class _Echo:
+    """File-like target that hands csv.writer's output straight back."""
+    def write(self, value):
+        return value
+
+
+class XlsxWriter:
+    extension, content_type, streaming = 'xlsx', XLSX_CONTENT_TYPE, False
+    compressed = True  # an .xlsx file is already a ZIP archive
+
+    def write(self, file, export, queryset, track=None):
+        write_xlsx(file, export.title, export.columns, _rows(export, queryset, track), export.widths(queryset))
+
+
+class _TextWriter:
+    streaming, compressed = True, False
+
+    def stream(self, export, queryset, track=None):
+        raise NotImplementedError
+
+    def write(self, file, export, queryset, track=None):
+        for chunk in self.stream(export, queryset, track):
+            file.write(chunk.encode('utf-8'))
+
+
+class DelimitedWriter(_TextWriter):
+    def __init__(self, delimiter, content_type, extension):
+        self.delimiter, self.content_type, self.extension = delimiter, content_type, extension
+
+    def stream(self, export, queryset, track=None):
+        writer = csv.writer(_Echo(), delimiter=self.delimiter)
+        yield writer.writerow(export.headers)
+        yield from _chunked(writer.writerow(row) for row in _rows(export, queryset, track))
+
+
+class JsonLinesWriter(_TextWriter):
+    """One JSON object per row, keyed by the column headers."""
+    extension, content_type = 'jsonl', 'application/x-ndjson'
+
+    def stream(self, export, queryset, track=None):
+        headers = export.headers
+        yield from _chunked(json.dumps(dict(zip(headers, row)), default=str) + '\n'
+                            for row in _rows(export, queryset, track))
+
+
+WRITERS = {
+    'xlsx': XlsxWriter(),
+    'csv': DelimitedWriter(',', 'text/csv', 'csv'),
+    'tsv': DelimitedWriter('\t', 'text/tab-separated-values', 'tsv'),
+    'jsonl': JsonLinesWriter(),
+}
+
+
+def gzip_stream(chunks, level=6):
+    """Gzips a stream of text chunks on the fly; the output is a valid .gz file."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data: yield data
+    yield compressor.flush()
+
+
+# ==========================================================
+# DISTRICT PACK (one file per district, zipped)
+# ==========================================================
+DISTRICT_PACK_FILENAME = 'festive_births_district_pack.zip'
+ZIP_COPY_CHUNK = 64 * 1024
+
+
+def can_export_district_pack(scope):
+    return scope.sees_everything
+
+
+def pack_districts():
+    """(name, pk) of the districts in DISTRICT_CHOICES order, from one query."""
+    names = [name for name, _ in DISTRICT_CHOICES if name]
+    ids = dict(District.objects.filter(name__in=names).values_list('name', 'pk'))
+    return [(name, ids[name]) for name in names if name in ids]
+
+
+def _build_shard(export, writer, queryset):
+    """Writes one district's file to a temporary file in a pool thread and returns it, rewound."""
+    spool = tempfile.TemporaryFile()
+    try:
+        writer.write(spool, export, queryset)
+        spool.seek(0)
+        return spool
+    except BaseException:
+        spool.close()
+        raise
+    finally:
+        connections.close_all()  # this thread's own connections
+
+
+class _ZipSink:
+    """Unseekable target for ZipFile that collects its output until drained."""
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data, self._chunks = b''.join(self._chunks), []
+        return data
+
+
+def district_pack_stream(queryset, writer, export=FULL_REPORT, workers=None):
+    """
+    Yields a ZIP archive of `export` with one file per district of `queryset`.
+    The districts are built concurrently, one streamed query each, in a pool of
+    DISTRICT_PACK_WORKERS threads, and each file is zipped as soon as it is
+    finished, so the download takes about as long as the slowest district.
+    Deliveries without a district are left out.
+    """
+    sink = _ZipSink()
+    archive = zipfile.ZipFile(sink, 'w', zipfile.ZIP_STORED if writer.compressed else zipfile.ZIP_DEFLATED)
+    pool = ThreadPoolExecutor(workers or settings.DISTRICT_PACK_WORKERS, thread_name_prefix='district-pack')
+    shards = {
+        pool.submit(_build_shard, export, writer, queryset.filter(district_id=pk)): f'{slugify(name)}.{writer.extension}'
+        for name, pk in pack_districts()
+    }
+    try:
+        for shard in as_completed(shards):
+            with shard.result() as spool, archive.open(shards[shard], 'w', force_zip64=True) as entry:
+                for chunk in iter(lambda: spool.read(ZIP_COPY_CHUNK), b''):
+                    entry.write(chunk)
+                    data = sink.drain()
+                    if data: yield data
+        archive.close()
+        yield sink.drain()
+    finally:
+        # On a dropped download, stop districts that have not started and discard finished files.
+        pool.shutdown(wait=False, cancel_futures=True)
+        for shard in shards:
+            if shard.done() and not shard.cancelled() and shard.exception() is None: shard.result().close()
+
+
+# ==========================================================
+# PARQUET (typed, columnar copy of the full report for analysts)
+# ==========================================================
+PARQUET_CONTENT_TYPE = 'application/vnd.apache.parquet'
+PARQUET_ROW_GROUP_SIZE = 50_000  # rows buffered per row group; bounds memory while writing
+# column: (arrow type name, record -> value). Low-cardinality text is dictionary encoded.
+PARQUET_COLUMNS = {
+    'delivery_id': ('int64', lambda row, n: row['id']),
+    'captured_at': ('timestamp', lambda row, n: row['timestamp']),
+    'report_date': ('date', lambda row, n: row['report_date']),
+    'time_slot': ('category', lambda row, n: row['time_slot']),
+    'delivery_time': ('time', lambda row, n: row['delivery_time']),
+    'district': ('category', lambda row, n: row['district__name']),
+    'local_municipality': ('category', lambda row, n: row['local_municipality__name']),
+    'facility': ('category', lambda row, n: row['facility__name']),
+    'facility_type': ('category', lambda row, n: row['facility_type']),
+    'mother_name': ('string', lambda row, n: row['mother_name']),
+    'mother_surname': ('string', lambda row, n: row['mother_surname']),
+    'mother_dob': ('date', lambda row, n: row['mother_dob']),
+    'mother_age': ('int16', lambda row, n: row['mother_age_at_delivery']),
+    'gravidity': ('int16', lambda row, n: row['gravidity']),
+    'parity': ('int16', lambda row, n: row['parity']),
+    'birth_mode': ('category', lambda row, n: row['birth_mode']),
+    'born_before_arrival': ('bool', lambda row, n: row['born_before_arrival']),
+    'nil_report': ('bool', lambda row, n: row['no_births_to_report']),
+    'baby_number': ('int16', lambda row, n: n),
+    'baby_gender': ('category', lambda row, n: row['babies__gender']),
+    'baby_weight_grams': ('int32', lambda row, n: row['babies__weight']),
+    'captured_by': ('category', lambda row, n: row['captured_by__username']),
+}
+
+
+def parquet_schema():
+    import pyarrow as pa
+
+    types = {
+        'int16': pa.int16(), 'int32': pa.int32(), 'int64': pa.int64(), 'bool': pa.bool_(), 'string': pa.string(),
+        'date': pa.date32(), 'time': pa.time64('us'), 'timestamp': pa.timestamp('us', tz='UTC'),
+        'category': pa.dictionary(pa.int32(), pa.string()),
+    }
+    return pa.schema([(name, types[kind]) for name, (kind, _) in PARQUET_COLUMNS.items()])
+
+
+def write_full_report_parquet(file, queryset, track=None):
+    """
+    Writes the full report of `queryset` as a zstd-compressed Parquet file, one
+    row group per PARQUET_ROW_GROUP_SIZE records, so at most one row group is
+    held in memory. pyarrow is only imported by the processes that use it.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = parquet_schema()
+    records = full_report_records(queryset)
+    with pq.ParquetWriter(file, schema, compression='zstd') as writer:
+        columns = {name: [] for name in PARQUET_COLUMNS}
+        for count, (row, baby_number) in enumerate(track(records) if track else records, 1):
+            for name, (_, value) in PARQUET_COLUMNS.items():
+                columns[name].append(value(row, baby_number))
+            if count % PARQUET_ROW_GROUP_SIZE == 0:
+                writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+                columns = {name: [] for name in PARQUET_COLUMNS}
+        if columns['delivery_id']:  # the last, partial row group
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+
+
+# ==========================================================
+# DASHBOARD PDF
+# ==========================================================
+PDF_CACHE_KEY_PREFIX = 'dashboard-pdf:v1'
+
+
+def dashboard_report_title(context):
+    for key in ('selected_facility', 'selected_municipality', 'selected_district'):
+        if context.get(key): return f"{context[key]} Report"
+    return "Provincial Dashboard Report"
+
+
+def pdf_css_path():
+    css_path = finders.find('css/pdf_style.css')
+    if not css_path:
+        raise FileNotFoundError("CSS file 'pdf_style.css' not found in static directories.")
+    return css_path
+
+
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+
+def pdf_pool():
+    """This process's PDF render pool, or None when PDF_RENDER_WORKERS is 0 (render inline)."""
+    global _pdf_pool
+    with _pdf_pool_lock:  # shared by the threads of a gthread worker
+        if _pdf_pool is None and settings.PDF_RENDER_WORKERS > 0:
+            _pdf_pool = PDFRenderPool(settings.PDF_RENDER_WORKERS, settings.PDF_RENDER_QUEUE_DEPTH)
+        return _pdf_pool
+
+
+def dashboard_pdf_cache_key(filters, user_name, version):
+    key = json.dumps([filters.get('report_date'), filters.get('district'), filters.get('municipality'),
+                      filters.get('facility'), user_name, version])
+    return f"{PDF_CACHE_KEY_PREFIX}:{hashlib.sha1(key.encode()).hexdigest()}"
+
+
+def render_dashboard_pdf(filters, user, base_url=None, pool=None):
+    """
+    Returns the dashboard PDF for the given dashboard filters as bytes. PDFs
+    are cached per filters, report user and the data version of the figures,
+    so a repeated download skips the layout until the data changes.
+    The layout runs in `pool` if given (raising RenderPoolBusy when it is
+    full), otherwise in this process.
+    """
+    context = dict(get_dashboard_context(**filters), report_user=user)
+    key = dashboard_pdf_cache_key(filters, user.get_full_name(), context['data_version'])
+    pdf = cache.get(key)
+    if pdf is None:
+        context['report_title'] = dashboard_report_title(context)
+        args = (render_to_string('births/dashboard_pdf.html', context), base_url, pdf_css_path())
+        pdf = pool.run(render_pdf, *args, timeout=settings.PDF_RENDER_TIMEOUT) if pool else render_pdf(*args)
+        cache.set(key, pdf, settings.DASHBOARD_PDF_CACHE_TTL)
+    return pdf
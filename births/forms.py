@@ -3,7 +3,7 @@
 from django import forms
 from django.forms import inlineformset_factory, BaseInlineFormSet
 from datetime import date, time
-from .models import Delivery, Baby
+from .models import Delivery, Baby, REPORT_DATE_FORMAT, LOCATION_FIELDS, location_names, locations_from_names
 from .data import LOCATION_DATA, DISTRICT_CHOICES
 
 # --- STATIC CHOICES LISTS ---
@@ -14,10 +14,24 @@ FACILITY_TYPE_CHOICES = [
     ("Private Hospital", "Private Hospital"), ("Regional Hospital", "Regional Hospital"), 
     ("Tertiary Hospital", "Tertiary Hospital"),
 ]
-REPORT_DATE_CHOICES = [("", "--Select Report Date--"), ("01 January 2026", "01 January 2026")]
+REPORT_DATES = [date(2026, 1, 1)]
+REPORT_DATE_CHOICES = [("", "--Select Report Date--")] + [(d.isoformat(), d.strftime(REPORT_DATE_FORMAT)) for d in REPORT_DATES]
 TIME_SLOT_CHOICES = [("", "--Select Time Slot--"), ("00:01 - 06:00", "00:01 - 06:00"), ("06:01 - 12:00", "06:01 - 12:00"), ("12:01 - 18:00", "12:01 - 18:00"), ("18:01 - 24:00", "18:01 - 24:00")]
 BIRTH_MODE_CHOICES = [("", "--Select Birth Mode--"), ("Normal Vertex", "Normal Vertex"), ("Caesarean section Elective", "Caesarean section Elective"), ("Caesarean section Emergency", "Caesarean section Emergency"), ("Vacuum", "Vacuum"), ("Forceps", "Forceps"), ("Vaginal Breech", "Vaginal Breech")]
 
+def resolve_location_fields(form, cleaned_data):
+    """
+    Swaps the district/municipality/facility names posted by the cascading
+    dropdowns for their District/Municipality/Facility rows in cleaned_data.
+    """
+    names = [cleaned_data.get(field) or None for field in LOCATION_FIELDS]
+    for field, name, location in zip(LOCATION_FIELDS, names, locations_from_names(*names)):
+        if name and location is None:
+            form.add_error(field, f'"{name}" is not a known location.')
+        else:
+            cleaned_data[field] = location
+    return cleaned_data
+
 # --- THE MAIN FORM FOR THE DELIVERY EVENT ---
 class DeliveryForm(forms.ModelForm):
     number_of_babies = forms.ChoiceField(choices=[('', '--Select Number of Babies--')] + [(i, str(i)) for i in range(1, 6)], label="Number of Babies in this Delivery", required=False)
@@ -25,7 +39,7 @@ class DeliveryForm(forms.ModelForm):
     local_municipality = forms.ChoiceField(choices=[], required=False)
     facility = forms.ChoiceField(choices=[], required=False)
     facility_type = forms.ChoiceField(choices=FACILITY_TYPE_CHOICES, required=False)
-    report_date = forms.ChoiceField(choices=REPORT_DATE_CHOICES, required=True)
+    report_date = forms.TypedChoiceField(choices=REPORT_DATE_CHOICES, coerce=date.fromisoformat, empty_value=None, required=True)
     time_slot = forms.ChoiceField(choices=TIME_SLOT_CHOICES, required=False)
     birth_mode = forms.ChoiceField(choices=BIRTH_MODE_CHOICES, required=False)
 
@@ -37,7 +51,7 @@ class DeliveryForm(forms.ModelForm):
             'delivery_time': forms.TimeInput(attrs={'class': 'timepicker', 'placeholder': 'Select Time of Delivery...'}),
         }
 
-    def __init__(self, *args, user=None, **kwargs):
+    def __init__(self, *args, scope=None, **kwargs):
         super().__init__(*args, **kwargs)
         
         # Time slot is disabled as it's purely backend calculated
@@ -49,6 +63,9 @@ class DeliveryForm(forms.ModelForm):
         self.fields['facility_type'].help_text = 'This is set automatically when you select a Facility.'
         
         data, instance = self.data, self.instance
+        if instance and instance.pk:
+            # The dropdowns work with names, the model with foreign keys.
+            self.initial.update(zip(LOCATION_FIELDS, location_names(instance)))
         if data:
             try:
                 district = data.get('district'); municipality = data.get('local_municipality')
@@ -56,21 +73,22 @@ class DeliveryForm(forms.ModelForm):
                 if municipality: self.fields['facility'].choices = [(f, f) for f in LOCATION_DATA['facilities'].get(municipality, [])]
             except (ValueError, TypeError, KeyError): pass
         elif instance and instance.pk:
-            if instance.district: self.fields['local_municipality'].choices = [(m, m) for m in LOCATION_DATA['municipalities'].get(instance.district, [])]
-            if instance.local_municipality: self.fields['facility'].choices = [(f, f) for f in LOCATION_DATA['facilities'].get(instance.local_municipality, [])]
-
-        if user:
-            if user.is_superuser or user.groups.filter(name='ProvinceUser').exists(): return
-            profile = user.profile
-            if user.groups.filter(name='Admin').exists():
-                self.fields['district'].initial = profile.district; self.fields['district'].choices = [(profile.district, profile.district)]; self.fields['district'].widget.attrs['readonly'] = True
-            elif user.groups.filter(name='User').exists():
-                self.fields['district'].initial = profile.district; self.fields['district'].choices = [(profile.district, profile.district)]; self.fields['district'].widget.attrs['readonly'] = True
-                self.fields['local_municipality'].choices = [(profile.local_municipality, profile.local_municipality)]; self.fields['local_municipality'].initial = profile.local_municipality; self.fields['local_municipality'].widget.attrs['readonly'] = True
-                self.fields['facility'].choices = [(profile.facility, profile.facility)]; self.fields['facility'].initial = profile.facility; self.fields['facility'].widget.attrs['readonly'] = True
+            district, municipality, _ = location_names(instance)
+            if district: self.fields['local_municipality'].choices = [(m, m) for m in LOCATION_DATA['municipalities'].get(district, [])]
+            if municipality: self.fields['facility'].choices = [(f, f) for f in LOCATION_DATA['facilities'].get(municipality, [])]
+
+        if scope:
+            if scope.sees_everything: return
+            district, municipality, facility = scope.location_names
+            if scope.is_admin:
+                self.fields['district'].initial = district; self.fields['district'].choices = [(district, district)]; self.fields['district'].widget.attrs['readonly'] = True
+            elif scope.is_facility_user:
+                self.fields['district'].initial = district; self.fields['district'].choices = [(district, district)]; self.fields['district'].widget.attrs['readonly'] = True
+                self.fields['local_municipality'].choices = [(municipality, municipality)]; self.fields['local_municipality'].initial = municipality; self.fields['local_municipality'].widget.attrs['readonly'] = True
+                self.fields['facility'].choices = [(facility, facility)]; self.fields['facility'].initial = facility; self.fields['facility'].widget.attrs['readonly'] = True
 
     def clean(self):
-        cleaned_data = super().clean()
+        cleaned_data = resolve_location_fields(self, super().clean())
         is_nil_report = cleaned_data.get('no_births_to_report')
         
         # Manually get value for 'time_slot' as it's a disabled field
@@ -124,20 +142,20 @@ class DashboardReportFilterForm(forms.Form):
     local_municipality = forms.ChoiceField(required=False, label="Local Municipality (Optional)")
     facility = forms.ChoiceField(required=False, label="Facility (Optional)")
 
-    def __init__(self, *args, user=None, **kwargs):
+    def __init__(self, *args, scope=None, **kwargs):
         super().__init__(*args, **kwargs)
         self.fields['district'].choices = [('', 'All Districts')] + [(d[0], d[1]) for d in DISTRICT_CHOICES if d[0]]
         self.fields['local_municipality'].choices = [('', 'All Municipalities')]
         self.fields['facility'].choices = [('', 'All Facilities')]
-        if user and not user.is_superuser and not user.groups.filter(name='ProvinceUser').exists():
-            profile = user.profile
-            if user.groups.filter(name='Admin').exists():
-                self.fields['district'].choices = [(profile.district, profile.district)]; self.fields['district'].initial = profile.district; self.fields['district'].widget.attrs['readonly'] = True
-                self.fields['local_municipality'].choices = [('', 'All Municipalities')] + [(m, m) for m in LOCATION_DATA['municipalities'].get(profile.district, [])]
-            elif user.groups.filter(name='User').exists():
-                self.fields['district'].choices = [(profile.district, profile.district)]; self.fields['district'].initial = profile.district; self.fields['district'].widget.attrs['readonly'] = True
-                self.fields['local_municipality'].choices = [(profile.local_municipality, profile.local_municipality)]; self.fields['local_municipality'].initial = profile.local_municipality; self.fields['local_municipality'].widget.attrs['readonly'] = True
-                self.fields['facility'].choices = [(profile.facility, profile.facility)]; self.fields['facility'].initial = profile.facility; self.fields['facility'].widget.attrs['readonly'] = True
+        if scope and not scope.sees_everything:
+            district, municipality, facility = scope.location_names
+            if scope.is_admin:
+                self.fields['district'].choices = [(district, district)]; self.fields['district'].initial = district; self.fields['district'].widget.attrs['readonly'] = True
+                self.fields['local_municipality'].choices = [('', 'All Municipalities')] + [(m, m) for m in LOCATION_DATA['municipalities'].get(district, [])]
+            elif scope.is_facility_user:
+                self.fields['district'].choices = [(district, district)]; self.fields['district'].initial = district; self.fields['district'].widget.attrs['readonly'] = True
+                self.fields['local_municipality'].choices = [(municipality, municipality)]; self.fields['local_municipality'].initial = municipality; self.fields['local_municipality'].widget.attrs['readonly'] = True
+                self.fields['facility'].choices = [(facility, facility)]; self.fields['facility'].initial = facility; self.fields['facility'].widget.attrs['readonly'] = True
 
 class NilReportFilterForm(forms.Form):
     start_date = forms.DateField(
@@ -154,7 +172,7 @@ class NilReportFilterForm(forms.Form):
     local_municipality = forms.ChoiceField(required=False, label="Local Municipality")
     facility = forms.ChoiceField(required=False, label="Facility")
 
-    def __init__(self, *args, user=None, **kwargs):
+    def __init__(self, *args, scope=None, **kwargs):
         super().__init__(*args, **kwargs)
         
         # Default choices
@@ -163,22 +181,22 @@ class NilReportFilterForm(forms.Form):
         self.fields['facility'].choices = [('', 'All Facilities')]
 
         # Permissions Logic (Same as DashboardReportFilterForm)
-        if user and not user.is_superuser and not user.groups.filter(name='ProvinceUser').exists():
-            profile = user.profile
-            if user.groups.filter(name='Admin').exists():
-                self.fields['district'].choices = [(profile.district, profile.district)]
-                self.fields['district'].initial = profile.district
+        if scope and not scope.sees_everything:
+            district, municipality, facility = scope.location_names
+            if scope.is_admin:
+                self.fields['district'].choices = [(district, district)]
+                self.fields['district'].initial = district
                 self.fields['district'].widget.attrs['readonly'] = True
-                self.fields['local_municipality'].choices = [('', 'All Municipalities')] + [(m, m) for m in LOCATION_DATA['municipalities'].get(profile.district, [])]
-            elif user.groups.filter(name='User').exists():
-                self.fields['district'].choices = [(profile.district, profile.district)]
-                self.fields['district'].initial = profile.district
+                self.fields['local_municipality'].choices = [('', 'All Municipalities')] + [(m, m) for m in LOCATION_DATA['municipalities'].get(district, [])]
+            elif scope.is_facility_user:
+                self.fields['district'].choices = [(district, district)]
+                self.fields['district'].initial = district
                 self.fields['district'].widget.attrs['readonly'] = True
                 
-                self.fields['local_municipality'].choices = [(profile.local_municipality, profile.local_municipality)]
-                self.fields['local_municipality'].initial = profile.local_municipality
+                self.fields['local_municipality'].choices = [(municipality, municipality)]
+                self.fields['local_municipality'].initial = municipality
                 self.fields['local_municipality'].widget.attrs['readonly'] = True
                 
-                self.fields['facility'].choices = [(profile.facility, profile.facility)]
-                self.fields['facility'].initial = profile.facility
+                self.fields['facility'].choices = [(facility, facility)]
+                self.fields['facility'].initial = facility
                 self.fields['facility'].widget.attrs['readonly'] = True
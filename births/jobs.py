@@ -0,0 +1,134 @@
+# births/jobs.py
+
+from datetime import timedelta
+import logging
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.files import File
+from django.db import close_old_connections
+from django.utils import timezone
+
+from accounts.scope import RoleScope
+
+from .exports import EXPORTS, WRITERS, render_dashboard_pdf
+from .models import ExportJob
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_EVERY = 1000  # rows between progress writes
+STALE_JOB_TIMEOUT = timedelta(hours=1)  # a job running this long belonged to a worker that died
+CLEANUP_INTERVAL = 3600  # seconds between sweeps for expired export files
+
+
+def enqueue_export(user, kind, params=None):
+    return ExportJob.objects.create(requested_by=user, kind=kind, params=params or {})
+
+
+# ==========================================================
+# RUNNERS (kind: function(job, file) -> download filename)
+# ==========================================================
+def _tracker(job):
+    """Wraps a row iterator so the job's progress is saved every PROGRESS_EVERY rows."""
+    def track(rows):
+        for count, row in enumerate(rows, 1):
+            if count % PROGRESS_EVERY == 0:
+                ExportJob.objects.filter(pk=job.pk).update(progress=count)
+            yield row
+    return track
+
+
+def _run_spreadsheet(job, file):
+    """Full report and user list jobs: the export named by the job's kind, as .xlsx."""
+    export, writer, scope = EXPORTS[job.kind], WRITERS['xlsx'], RoleScope.for_user(job.requested_by)
+    if not export.has_permission(scope):
+        raise PermissionError(f"{job.requested_by} may not export the {export.title.lower()}.")
+    queryset = export.get_queryset(scope, job.params)
+    job.total = export.count(queryset)
+    ExportJob.objects.filter(pk=job.pk).update(total=job.total)
+    writer.write(file, export, queryset, track=_tracker(job))
+    return f'{export.filename}.{writer.extension}'
+
+
+def _run_dashboard_pdf(job, file):
+    filters = {key: job.params.get(key) or None for key in ('report_date', 'district', 'municipality', 'facility')}
+    file.write(render_dashboard_pdf(filters, job.requested_by))
+    return 'dashboard_report.pdf'
+
+
+RUNNERS = {
+    ExportJob.FULL_REPORT: _run_spreadsheet,
+    ExportJob.USER_LIST: _run_spreadsheet,
+    ExportJob.DASHBOARD_PDF: _run_dashboard_pdf,
+}
+
+
+# ==========================================================
+# QUEUE
+# ==========================================================
+def claim_next_job():
+    """
+    Marks the oldest queued job as running and returns it, or None if the queue
+    is empty. The conditional UPDATE makes the claim safe between workers on
+    any database, without SELECT ... FOR UPDATE SKIP LOCKED.
+    """
+    candidates = ExportJob.objects.filter(status=ExportJob.QUEUED).order_by('created_at').values_list('pk', flat=True)
+    for pk in candidates[:10]:
+        if ExportJob.objects.filter(pk=pk, status=ExportJob.QUEUED).update(status=ExportJob.RUNNING, started_at=timezone.now()):
+            return ExportJob.objects.select_related('requested_by').get(pk=pk)
+    return None
+
+
+def run_job(job):
+    """Builds the job's artifact in a temporary file, then stores it and marks the job done or failed."""
+    try:
+        with tempfile.TemporaryFile() as spool:
+            filename = RUNNERS[job.kind](job, spool)
+            spool.seek(0)
+            job.artifact.save(filename, File(spool), save=False)
+        job.status, job.error = ExportJob.DONE, ''
+        job.progress = job.total or job.progress
+    except Exception as e:
+        logger.exception("Export job %s failed", job.pk)
+        job.status, job.error = ExportJob.FAILED, str(e) or e.__class__.__name__
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'progress', 'total', 'artifact', 'finished_at'])
+    return job
+
+
+def requeue_stale_jobs():
+    """Puts jobs left 'running' by a worker that died back on the queue."""
+    return ExportJob.objects.filter(status=ExportJob.RUNNING, started_at__lt=timezone.now() - STALE_JOB_TIMEOUT).update(
+        status=ExportJob.QUEUED, started_at=None, progress=0)
+
+
+def delete_expired_exports():
+    """Deletes finished jobs, and their files, older than EXPORT_RETENTION_DAYS."""
+    cutoff = timezone.now() - timedelta(days=settings.EXPORT_RETENTION_DAYS)
+    expired = ExportJob.objects.filter(finished_at__lt=cutoff)
+    for job in expired.exclude(artifact=''):
+        job.artifact.delete(save=False)
+    return expired.delete()[0]
+
+
+def run_worker(poll_interval=2, once=False, stdout=None):
+    """
+    Runs queued jobs one at a time until interrupted, polling the database when
+    the queue is empty. With `once`, returns as soon as the queue is empty.
+    """
+    last_cleanup = 0
+    while True:
+        close_old_connections()
+        if time.monotonic() - last_cleanup > CLEANUP_INTERVAL:
+            requeue_stale_jobs(); delete_expired_exports()
+            last_cleanup = time.monotonic()
+        job = claim_next_job()
+        if job is None:
+            if once: return
+            time.sleep(poll_interval)
+            continue
+        job = run_job(job)
+        if stdout:
+            stdout.write(f"[{os.getpid()}] {job}")
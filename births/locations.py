@@ -0,0 +1,62 @@
+# births/locations.py
+
+from .data import LOCATION_DATA, FACILITY_TYPES
+
+
+def seed_locations(district_model, municipality_model, facility_model):
+    """
+    Creates the districts, municipalities and facilities listed in births/data.py
+    that are not in the database yet, and refreshes facility types. Idempotent.
+    Takes the model classes so migrations can pass their historical versions.
+    """
+    municipality_parents = {
+        municipality: district
+        for district, municipalities in LOCATION_DATA['municipalities'].items() for municipality in municipalities
+    }
+    for district_name, municipalities in LOCATION_DATA['municipalities'].items():
+        district, _ = district_model.objects.get_or_create(name=district_name)
+        for municipality_name in municipalities:
+            municipality_model.objects.get_or_create(district=district, name=municipality_name)
+
+    for municipality_name, facilities in LOCATION_DATA['facilities'].items():
+        district_name = municipality_parents.get(municipality_name)
+        if district_name is None: continue
+        municipality = municipality_model.objects.get(district__name=district_name, name=municipality_name)
+        for facility_name in facilities:
+            facility_model.objects.update_or_create(
+                municipality=municipality, name=facility_name,
+                defaults={'facility_type': FACILITY_TYPES.get(facility_name, '')},
+            )
+
+
+class LocationResolver:
+    """
+    Maps free-text location names, as stored before the dimension tables existed,
+    to District/Municipality/Facility rows. Names that births/data.py does not
+    list are added rather than dropped. Lookups are memoised for batch use.
+    """
+    def __init__(self, district_model, municipality_model, facility_model):
+        self.district_model, self.municipality_model, self.facility_model = district_model, municipality_model, facility_model
+        self._cache = {}
+
+    def _get(self, model, **lookup):
+        key = (model, *sorted(lookup.items()))
+        if key not in self._cache:
+            self._cache[key] = model.objects.get_or_create(**lookup)[0]
+        return self._cache[key]
+
+    def __call__(self, district=None, municipality=None, facility=None):
+        """Returns (district, municipality, facility) rows, None where a level cannot be placed."""
+        district_obj = self._get(self.district_model, name=district) if district else None
+        municipality_obj = facility_obj = None
+        if district_obj and municipality:
+            municipality_obj = self._get(self.municipality_model, district=district_obj, name=municipality)
+        if municipality_obj and facility:
+            facility_obj = self._get(self.facility_model, municipality=municipality_obj, name=facility)
+        elif facility:
+            # No usable municipality: only a facility that is already known can be placed.
+            facility_obj = self.facility_model.objects.filter(name=facility).select_related('municipality__district').first()
+            if facility_obj:
+                municipality_obj = facility_obj.municipality
+                district_obj = district_obj or municipality_obj.district
+        return district_obj, municipality_obj, facility_obj
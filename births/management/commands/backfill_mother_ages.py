@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from births.models import Delivery
+
+
+class Command(BaseCommand):
+    help = "Fills Delivery.mother_age_at_delivery and Delivery.age_band from mother_dob and the report date."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Recompute every delivery, not only those missing an age.")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows per UPDATE batch (default 1000).")
+
+    def handle(self, *args, **options):
+        queryset = Delivery.objects.filter(mother_dob__isnull=False)
+        if not options['all']:
+            queryset = queryset.filter(mother_age_at_delivery__isnull=True)
+        queryset = queryset.only('id', 'mother_dob', 'report_date').order_by('pk')
+
+        batch, updated = [], 0
+        for delivery in queryset.iterator(chunk_size=options['batch_size']):
+            delivery.set_mother_age()
+            delivery.updated_at = timezone.now()  # the age is part of the delta export
+            batch.append(delivery)
+            if len(batch) >= options['batch_size']:
+                updated += self._flush(batch)
+        updated += self._flush(batch)
+        self.stdout.write(self.style.SUCCESS(f"Updated mother age for {updated} deliveries."))
+
+    def _flush(self, batch):
+        count = len(batch)
+        if batch:
+            with transaction.atomic():
+                Delivery.objects.bulk_update(batch, ['mother_age_at_delivery', 'age_band', 'updated_at'])
+            batch.clear()
+        return count
@@ -0,0 +1,33 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from births.benchmarks import BENCHMARK_SIZES, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Times and query-counts the dashboard, list, export, PDF and AJAX views at growing data sizes "
+        "and writes a JSON report. Runs against a fresh test database, never the configured one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=list(BENCHMARK_SIZES), help="Numbers of births to measure at (default 10k 100k 1M).")
+        parser.add_argument('--repeat', type=int, default=5, help="Requests per endpoint and size (default 5).")
+        parser.add_argument('--seed', type=int, default=2025, help="Random seed of the generated data.")
+        parser.add_argument('--output', default='benchmark-report.json', help="Where to write the JSON report.")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            report = run_benchmarks(options['sizes'], options['repeat'], options['seed'], stdout=self.stdout)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}."))
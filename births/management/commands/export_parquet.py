@@ -0,0 +1,25 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.scope import RoleScope
+from births.exports import FULL_REPORT, write_full_report_parquet
+from births.models import Delivery
+
+
+class Command(BaseCommand):
+    help = "Writes the full births report (one row per baby or NIL report) as a typed Parquet file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="Path of the .parquet file to write.")
+        parser.add_argument('--user', help="Username (Persal number) whose role scope to apply; default is every delivery.")
+
+    def handle(self, *args, **options):
+        queryset = Delivery.objects.all()
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f"No user named {options['user']!r}.")
+            queryset = FULL_REPORT.get_queryset(RoleScope.for_user(user))
+        with open(options['output'], 'wb') as f:
+            write_full_report_parquet(f, queryset)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}."))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from births.models import FacilityDailyRollup
+from births.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the FacilityDailyRollup table from the Delivery and Baby tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows per INSERT (default 1000).")
+        parser.add_argument('--if-empty', action='store_true',
+                            help="Only backfill an empty table; the signals keep a filled one current.")
+
+    def handle(self, *args, **options):
+        if options['if_empty'] and FacilityDailyRollup.objects.exists():
+            self.stdout.write("Facility rollups are already filled, skipping.")
+            return
+        count = rebuild_rollups(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} facility rollup rows."))
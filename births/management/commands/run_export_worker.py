@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from births.jobs import run_worker
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs queued report exports (full report, user list, dashboard PDF) outside the web workers. "
+        "Start one or more next to gunicorn; the database is the queue."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll-interval', type=float, default=2, help="Seconds between queue checks when idle (default 2).")
+        parser.add_argument('--once', action='store_true', help="Exit once the queue is empty instead of waiting for more jobs.")
+
+    def handle(self, *args, **options):
+        self.stdout.write("Export worker started.")
+        try:
+            run_worker(poll_interval=options['poll_interval'], once=options['once'], stdout=self.stdout)
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS("Export worker stopped."))
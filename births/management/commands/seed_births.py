@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from births.dashboard import bump_data_version
+from births.seeding import seed_births, seed_users
+
+
+class Command(BaseCommand):
+    help = "Generates synthetic deliveries, babies and users for load testing. Never run it against production data."
+
+    def add_arguments(self, parser):
+        parser.add_argument('births', type=int, help="Number of deliveries to generate.")
+        parser.add_argument('--users-per-role', type=int, default=0, help="Admin, User and ProvinceUser accounts to create per role (default 0).")
+        parser.add_argument('--password', default='Seeded-Pass-2025', help="Password of the generated users.")
+        parser.add_argument('--seed', type=int, help="Random seed, for reproducible data sets.")
+        parser.add_argument('--batch-size', type=int, default=2000, help="Deliveries per INSERT batch (default 2000).")
+
+    def handle(self, *args, **options):
+        try:
+            babies = seed_births(options['births'], seed=options['seed'], batch_size=options['batch_size'])
+        except ValueError as e:
+            raise CommandError(e)
+        users = seed_users(options['users_per_role'], options['password'], seed=options['seed'])
+        bump_data_version()
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {options['births']} deliveries, {babies} babies and {len(users)} users."
+        ))
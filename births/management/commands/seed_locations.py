@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from births.locations import seed_locations
+from births.models import District, Municipality, Facility
+
+
+class Command(BaseCommand):
+    help = "Adds the districts, municipalities and facilities of births/data.py that are missing from the database."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            seed_locations(District, Municipality, Facility)
+        self.stdout.write(self.style.SUCCESS(
+            f"{District.objects.count()} districts, {Municipality.objects.count()} municipalities, "
+            f"{Facility.objects.count()} facilities."
+        ))
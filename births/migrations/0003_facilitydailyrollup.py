@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('births', '0002_alter_delivery_born_before_arrival_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FacilityDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('district', models.CharField(max_length=100)),
+                ('local_municipality', models.CharField(blank=True, default='', max_length=100)),
+                ('facility', models.CharField(blank=True, default='', max_length=100)),
+                ('facility_type', models.CharField(blank=True, default='', max_length=100)),
+                ('report_date', models.CharField(max_length=50)),
+                ('time_slot', models.CharField(blank=True, default='', max_length=50)),
+                ('birth_mode', models.CharField(blank=True, default='', max_length=100)),
+                ('deliveries', models.IntegerField(default=0)),
+                ('nil_reports', models.IntegerField(default=0)),
+                ('babies', models.IntegerField(default=0)),
+                ('males', models.IntegerField(default=0)),
+                ('females', models.IntegerField(default=0)),
+                ('weight_extremely_low', models.IntegerField(default=0)),
+                ('weight_very_low', models.IntegerField(default=0)),
+                ('weight_low', models.IntegerField(default=0)),
+                ('weight_normal', models.IntegerField(default=0)),
+                ('weight_high', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('district', 'local_municipality', 'facility', 'facility_type', 'report_date', 'time_slot', 'birth_mode'), name='unique_facility_daily_rollup')],
+            },
+        ),
+    ]
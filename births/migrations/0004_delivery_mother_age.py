@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('births', '0003_facilitydailyrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='delivery',
+            name='age_band',
+            field=models.CharField(blank=True, choices=[('10-14 yrs', '10-14 yrs'), ('15-19 yrs', '15-19 yrs'), ('20-35 yrs', '20-35 yrs'), ('35+ yrs', '35+ yrs')], db_index=True, editable=False, max_length=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='delivery',
+            name='mother_age_at_delivery',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('births', '0004_delivery_mother_age'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='baby',
+            index=models.Index(fields=['delivery', 'gender', 'weight'], name='baby_delivery_gender_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='baby',
+            index=models.Index(condition=models.Q(('weight__gte', 2500), ('weight__lt', 4000), _negated=True), fields=['delivery'], name='baby_abnormal_weight_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(fields=['district', 'local_municipality', 'facility', 'report_date'], name='delivery_location_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(fields=['report_date', 'district'], name='delivery_report_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(fields=['district', '-timestamp'], name='delivery_district_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(fields=['facility', '-timestamp'], name='delivery_facility_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(fields=['-timestamp'], name='delivery_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(condition=models.Q(('no_births_to_report', True)), fields=['-report_date', 'district', 'facility'], name='delivery_nil_report_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='facilitydailyrollup',
+            index=models.Index(fields=['report_date'], name='rollup_report_date_idx'),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.7 on 2026-10-17 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from births.locations import seed_locations
+
+
+def seed(apps, schema_editor):
+    seed_locations(apps.get_model('births', 'District'), apps.get_model('births', 'Municipality'),
+                   apps.get_model('births', 'Facility'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('births', '0005_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='District',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Municipality',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('district', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='municipalities', to='births.district')),
+            ],
+            options={
+                'verbose_name_plural': 'municipalities',
+                'ordering': ['name'],
+                'constraints': [models.UniqueConstraint(fields=('district', 'name'), name='unique_municipality_per_district')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Facility',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('facility_type', models.CharField(blank=True, default='', max_length=100)),
+                ('municipality', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='facilities', to='births.municipality')),
+            ],
+            options={
+                'verbose_name_plural': 'facilities',
+                'ordering': ['name'],
+                'constraints': [models.UniqueConstraint(fields=('municipality', 'name'), name='unique_facility_per_municipality')],
+            },
+        ),
+        migrations.RunPython(seed, migrations.RunPython.noop),
+        # Filled by 0007 and swapped in for the string columns by 0008.
+        migrations.AddField(
+            model_name='delivery',
+            name='district_ref',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='births.district'),
+        ),
+        migrations.AddField(
+            model_name='delivery',
+            name='local_municipality_ref',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='births.municipality'),
+        ),
+        migrations.AddField(
+            model_name='delivery',
+            name='facility_ref',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='births.facility'),
+        ),
+        migrations.AddField(
+            model_name='delivery',
+            name='report_day',
+            field=models.DateField(null=True),
+        ),
+    ]
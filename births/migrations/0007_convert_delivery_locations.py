@@ -0,0 +1,55 @@
+# Generated by Django 5.2.7 on 2026-10-17 09:12
+
+from datetime import date, datetime
+
+from django.db import migrations, transaction
+
+from births.locations import LocationResolver
+
+BATCH_SIZE = 1000
+
+
+def parse_report_date(value):
+    for parse in (lambda v: datetime.strptime(v, "%d %B %Y").date(), date.fromisoformat):
+        try:
+            return parse((value or '').strip())
+        except ValueError:
+            pass
+    return None
+
+
+def convert_deliveries(apps, schema_editor):
+    """
+    Fills the new foreign keys and report day from the string columns, one
+    committed batch at a time. Converted rows are skipped, so it can be re-run.
+    """
+    Delivery = apps.get_model('births', 'Delivery')
+    resolve = LocationResolver(apps.get_model('births', 'District'), apps.get_model('births', 'Municipality'),
+                               apps.get_model('births', 'Facility'))
+    pending = Delivery.objects.filter(report_day__isnull=True).order_by('pk').only(
+        'pk', 'district', 'local_municipality', 'facility', 'report_date', 'timestamp')
+    last_pk = 0
+    while True:
+        batch = list(pending.filter(pk__gt=last_pk)[:BATCH_SIZE])
+        if not batch: break
+        for delivery in batch:
+            delivery.district_ref, delivery.local_municipality_ref, delivery.facility_ref = resolve(
+                delivery.district, delivery.local_municipality, delivery.facility)
+            # Unreadable dates fall back to the capture date, as Delivery.delivery_date did.
+            delivery.report_day = parse_report_date(delivery.report_date) or delivery.timestamp.date()
+        with transaction.atomic():
+            Delivery.objects.bulk_update(batch, ['district_ref', 'local_municipality_ref', 'facility_ref', 'report_day'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+    # Each batch commits on its own instead of holding one long transaction on the table.
+    atomic = False
+
+    dependencies = [
+        ('births', '0006_location_dimensions'),
+    ]
+
+    operations = [
+        migrations.RunPython(convert_deliveries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.7 on 2026-10-17 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def clear_rollups(apps, schema_editor):
+    # Rollups are derived data; build.sh runs `manage.py rebuild_rollups` after migrating.
+    apps.get_model('births', 'FacilityDailyRollup').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('births', '0007_convert_delivery_locations'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(model_name='delivery', name='delivery_location_idx'),
+        migrations.RemoveIndex(model_name='delivery', name='delivery_report_date_idx'),
+        migrations.RemoveIndex(model_name='delivery', name='delivery_district_ts_idx'),
+        migrations.RemoveIndex(model_name='delivery', name='delivery_facility_ts_idx'),
+        migrations.RemoveIndex(model_name='delivery', name='delivery_nil_report_idx'),
+        migrations.RemoveField(model_name='delivery', name='district'),
+        migrations.RemoveField(model_name='delivery', name='local_municipality'),
+        migrations.RemoveField(model_name='delivery', name='facility'),
+        migrations.RemoveField(model_name='delivery', name='report_date'),
+        migrations.RenameField(model_name='delivery', old_name='district_ref', new_name='district'),
+        migrations.RenameField(model_name='delivery', old_name='local_municipality_ref', new_name='local_municipality'),
+        migrations.RenameField(model_name='delivery', old_name='facility_ref', new_name='facility'),
+        migrations.RenameField(model_name='delivery', old_name='report_day', new_name='report_date'),
+        migrations.AlterField(
+            model_name='delivery',
+            name='district',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='deliveries', to='births.district'),
+        ),
+        migrations.AlterField(
+            model_name='delivery',
+            name='local_municipality',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='deliveries', to='births.municipality'),
+        ),
+        migrations.AlterField(
+            model_name='delivery',
+            name='facility',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='deliveries', to='births.facility'),
+        ),
+        migrations.AlterField(
+            model_name='delivery',
+            name='report_date',
+            field=models.DateField(),
+        ),
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(fields=['district', 'local_municipality', 'facility', 'report_date'], name='delivery_location_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(fields=['report_date', 'district'], name='delivery_report_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(fields=['district', '-timestamp'], name='delivery_district_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(fields=['facility', '-timestamp'], name='delivery_facility_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(condition=models.Q(('no_births_to_report', True)), fields=['-report_date', 'district', 'facility'], name='delivery_nil_report_idx'),
+        ),
+        migrations.RunPython(clear_rollups, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='facilitydailyrollup',
+            name='report_date',
+            field=models.DateField(),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:02
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_updated_at(apps, schema_editor):
+    # Existing rows were last known to change when they were captured.
+    apps.get_model('births', 'Delivery').objects.update(updated_at=F('timestamp'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('births', '0009_export_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delivery_id', models.BigIntegerField()),
+                ('district_id', models.BigIntegerField(blank=True, null=True)),
+                ('facility_id', models.BigIntegerField(blank=True, null=True)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='delivery',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(fields=['updated_at', 'id'], name='delivery_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deleteddelivery',
+            index=models.Index(fields=['deleted_at', 'id'], name='deleted_delivery_cursor_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('births', '0010_delivery_change_tracking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportFileChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('index', models.PositiveIntegerField()),
+                ('data', models.BinaryField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('name', 'index'), name='unique_export_file_chunk')],
+            },
+        ),
+    ]
@@ -1,17 +1,116 @@
 # births/models.py
-from django.db import models
+from datetime import date, datetime
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.urls import reverse
 
+REPORT_DATE_FORMAT = "%d %B %Y"  # e.g. "01 January 2026"
+
+# Location fields of Delivery and accounts.Profile, from the widest to the narrowest.
+LOCATION_FIELDS = ('district', 'local_municipality', 'facility')
+
+# Babies outside the normal 2500g-4000g range (unknown weights included), as listed
+# by the abnormal weight report; also the condition of its partial index.
+ABNORMAL_WEIGHT = ~models.Q(weight__gte=2500, weight__lt=4000)
+
+
+def parse_report_date(value):
+    """Reads a report date given as a date, "01 January 2026" or "2026-01-01". Returns None if invalid."""
+    if not value: return None
+    if isinstance(value, date): return value
+    for parse in (lambda v: datetime.strptime(v, REPORT_DATE_FORMAT).date(), date.fromisoformat):
+        try:
+            return parse(value.strip())
+        except (TypeError, ValueError):
+            pass
+    return None
+
+
+# ==========================================================
+# LOCATION DIMENSIONS (seeded from births/data.py)
+# ==========================================================
+class District(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+class Municipality(models.Model):
+    district = models.ForeignKey(District, related_name='municipalities', on_delete=models.PROTECT)
+    name = models.CharField(max_length=100)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name_plural = 'municipalities'
+        constraints = [models.UniqueConstraint(fields=['district', 'name'], name='unique_municipality_per_district')]
+
+    def __str__(self):
+        return self.name
+
+class Facility(models.Model):
+    municipality = models.ForeignKey(Municipality, related_name='facilities', on_delete=models.PROTECT)
+    name = models.CharField(max_length=100)
+    facility_type = models.CharField(max_length=100, blank=True, default='')
+
+    class Meta:
+        ordering = ['name']
+        verbose_name_plural = 'facilities'
+        constraints = [models.UniqueConstraint(fields=['municipality', 'name'], name='unique_facility_per_municipality')]
+
+    def __str__(self):
+        return self.name
+
+
+def location_names(obj):
+    """(district, municipality, facility) names of a Delivery or Profile, '' where unset."""
+    return tuple(getattr(obj, field).name if getattr(obj, f'{field}_id') else '' for field in LOCATION_FIELDS)
+
+
+def locations_from_names(district=None, municipality=None, facility=None):
+    """
+    Looks up the dimension rows for location names as posted by the cascading
+    dropdowns. Each level is searched within its parent; None where not found.
+    """
+    district_obj = District.objects.filter(name=district).first() if district else None
+    municipality_obj = facility_obj = None
+    if district_obj and municipality:
+        municipality_obj = Municipality.objects.filter(district=district_obj, name=municipality).first()
+    if municipality_obj and facility:
+        facility_obj = Facility.objects.filter(municipality=municipality_obj, name=facility).first()
+    return district_obj, municipality_obj, facility_obj
+
+
+class DeliveryQuerySet(models.QuerySet):
+    scope_prefix = ''  # lookup path from the model to Delivery
+
+    def for_scope(self, scope, exports=False):
+        """Rows a RoleScope (accounts.scope) may see, or may export with `exports`."""
+        filters = scope.delivery_filters(exports)
+        if filters is None: return self.none()
+        return self.filter(**{f'{self.scope_prefix}{field}': value for field, value in filters.items()})
+
+
+class BabyQuerySet(DeliveryQuerySet):
+    scope_prefix = 'delivery__'
+
+
 class Delivery(models.Model):
-    # Location Info
-    district = models.CharField(max_length=100)
-    local_municipality = models.CharField(max_length=100, blank=True, null=True) # Allow blank
-    facility = models.CharField(max_length=100, blank=True, null=True) # Allow blank
+    AGE_BAND_CHOICES = [("10-14 yrs", "10-14 yrs"), ("15-19 yrs", "15-19 yrs"), ("20-35 yrs", "20-35 yrs"), ("35+ yrs", "35+ yrs")]
+    TEENAGE_AGE_BANDS = ["10-14 yrs", "15-19 yrs"]
+
+    # Location Info (district and facility are indexed by the composite indexes below)
+    district = models.ForeignKey(District, related_name='deliveries', on_delete=models.PROTECT, null=True, blank=True, db_index=False)
+    local_municipality = models.ForeignKey(Municipality, related_name='deliveries', on_delete=models.PROTECT, null=True, blank=True)
+    facility = models.ForeignKey(Facility, related_name='deliveries', on_delete=models.PROTECT, null=True, blank=True, db_index=False)
     facility_type = models.CharField(max_length=100, blank=True, null=True) # Allow blank
 
     # Reporting Info
-    report_date = models.CharField(max_length=50)
+    report_date = models.DateField()
     time_slot = models.CharField(max_length=50, blank=True, null=True) # Allow blank
 
     # --- MISSING FIELDS ---
@@ -24,10 +123,34 @@ class Delivery(models.Model):
     birth_mode = models.CharField(max_length=100, null=True, blank=True)
     gravidity = models.PositiveIntegerField(null=True, blank=True)
     parity = models.PositiveIntegerField(null=True, blank=True)
-    
+
+    # Derived on save from mother_dob and the report date
+    mother_age_at_delivery = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    age_band = models.CharField(max_length=10, choices=AGE_BAND_CHOICES, null=True, blank=True, editable=False, db_index=True)
+
     # Metadata
     captured_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     timestamp = models.DateTimeField(auto_now_add=True)
+    # Last change to the delivery or its babies; the watermark of the delta export (births.delta).
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = DeliveryQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Dashboard filters: district > municipality > facility, optionally by date
+            models.Index(fields=['district', 'local_municipality', 'facility', 'report_date'], name='delivery_location_idx'),
+            models.Index(fields=['report_date', 'district'], name='delivery_report_date_idx'),
+            # Capture list and exports, scoped by role and newest first
+            models.Index(fields=['district', '-timestamp'], name='delivery_district_ts_idx'),
+            models.Index(fields=['facility', '-timestamp'], name='delivery_facility_ts_idx'),
+            models.Index(fields=['-timestamp'], name='delivery_timestamp_idx'),
+            # NIL report listing; the partial index only holds NIL reports
+            models.Index(fields=['-report_date', 'district', 'facility'], name='delivery_nil_report_idx',
+                         condition=models.Q(no_births_to_report=True)),
+            # Delta export: changes after a (updated_at, id) cursor
+            models.Index(fields=['updated_at', 'id'], name='delivery_updated_idx'),
+        ]
 
     @property
     def mother_full_name(self):
@@ -36,12 +159,37 @@ class Delivery(models.Model):
 
     def __str__(self):
         if self.no_births_to_report:
-            return f"NIL Report for {self.facility} on {self.report_date}"
+            return f"NIL Report for {self.facility} on {self.report_date:{REPORT_DATE_FORMAT}}"
         return f"Delivery at {self.facility} - {self.mother_full_name or 'N/A'}"
 
     def get_absolute_url(self):
         return reverse('delivery_list')
 
+    def set_mother_age(self):
+        """Fills mother_age_at_delivery and age_band from mother_dob and the report date."""
+        self.mother_age_at_delivery = self.age_band = None
+        if not self.mother_dob or not self.report_date: return
+        on = self.report_date
+        age = on.year - self.mother_dob.year - ((on.month, on.day) < (self.mother_dob.month, self.mother_dob.day))
+        if age < 0: return
+        self.mother_age_at_delivery = age
+        if 10 <= age <= 14: self.age_band = "10-14 yrs"
+        elif 15 <= age <= 19: self.age_band = "15-19 yrs"
+        elif 20 <= age <= 35: self.age_band = "20-35 yrs"
+        elif age > 35: self.age_band = "35+ yrs"
+
+    def save(self, *args, **kwargs):
+        self.set_mother_age()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields) | {'updated_at'}
+            if {'mother_dob', 'report_date'} & update_fields:
+                update_fields |= {'mother_age_at_delivery', 'age_band'}
+            kwargs['update_fields'] = update_fields
+        # Runs inside a transaction so the rollup update in births.signals commits with the row.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
 class Baby(models.Model):
     GENDER_CHOICES = [("Male", "Male"), ("Female", "Female")]
 
@@ -49,7 +197,148 @@ class Baby(models.Model):
     gender = models.CharField(max_length=10, choices=GENDER_CHOICES, null=True, blank=True)
     weight = models.PositiveIntegerField(null=True, blank=True, help_text="Weight in grams")
 
+    objects = BabyQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Joins from Delivery that count babies by gender and weight band
+            models.Index(fields=['delivery', 'gender', 'weight'], name='baby_delivery_gender_idx'),
+            # Abnormal weight report; the partial index only holds abnormal weights
+            models.Index(fields=['delivery'], name='baby_abnormal_weight_idx', condition=ABNORMAL_WEIGHT),
+        ]
 
     def __str__(self):
         return f"Baby ({self.gender}, {self.weight}g) for Delivery {self.delivery.id}"
-    
+
+    def save(self, *args, **kwargs):
+        # Runs inside a transaction so the rollup update in births.signals commits with the row.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+class DeletedDelivery(models.Model):
+    """
+    Tombstone of a deleted Delivery, so the delta export can report deletes.
+    Keeps the location ids the role scopes filter on.
+    """
+    delivery_id = models.BigIntegerField()
+    district_id = models.BigIntegerField(null=True, blank=True)
+    facility_id = models.BigIntegerField(null=True, blank=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['deleted_at', 'id'], name='deleted_delivery_cursor_idx')]
+
+    def __str__(self):
+        return f"Deleted delivery {self.delivery_id}"
+
+class FacilityDailyRollup(models.Model):
+    """
+    Pre-aggregated counts per facility, report date, time slot and birth mode.
+    Kept up to date by births.signals; rebuild with `manage.py rebuild_rollups`.
+    Locations are stored by name, and missing location/slot/mode values as empty
+    strings, so the key is unique without joins or NULLs.
+    """
+    # Key
+    district = models.CharField(max_length=100)
+    local_municipality = models.CharField(max_length=100, blank=True, default='')
+    facility = models.CharField(max_length=100, blank=True, default='')
+    facility_type = models.CharField(max_length=100, blank=True, default='')
+    report_date = models.DateField()
+    time_slot = models.CharField(max_length=50, blank=True, default='')
+    birth_mode = models.CharField(max_length=100, blank=True, default='')
+
+    # Counts
+    deliveries = models.IntegerField(default=0)
+    nil_reports = models.IntegerField(default=0)
+    babies = models.IntegerField(default=0)
+    males = models.IntegerField(default=0)
+    females = models.IntegerField(default=0)
+    weight_extremely_low = models.IntegerField(default=0)
+    weight_very_low = models.IntegerField(default=0)
+    weight_low = models.IntegerField(default=0)
+    weight_normal = models.IntegerField(default=0)
+    weight_high = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=['report_date'], name='rollup_report_date_idx')]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['district', 'local_municipality', 'facility', 'facility_type', 'report_date', 'time_slot', 'birth_mode'],
+                name='unique_facility_daily_rollup',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Rollup for {self.facility or self.district} on {self.report_date:{REPORT_DATE_FORMAT}} ({self.time_slot or 'no slot'})"
+
+
+# ==========================================================
+# BACKGROUND EXPORTS (run by `manage.py run_export_worker`)
+# ==========================================================
+def export_storage():
+    """
+    Finished export files; kept outside MEDIA/STATIC and only served by the
+    download view. In the database when the worker and web services do not
+    share a disk (EXPORT_STORAGE), otherwise under EXPORT_ROOT.
+    """
+    if settings.EXPORT_STORAGE == 'database':
+        from .storage import DatabaseStorage
+        return DatabaseStorage()
+    return FileSystemStorage(location=settings.EXPORT_ROOT)
+
+
+class ExportFileChunk(models.Model):
+    """One piece of an export file stored by births.storage.DatabaseStorage."""
+    name = models.CharField(max_length=255)
+    index = models.PositiveIntegerField()
+    data = models.BinaryField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['name', 'index'], name='unique_export_file_chunk')]
+
+
+class ExportJob(models.Model):
+    """A queued report. The database is the queue: workers claim the oldest queued job."""
+    FULL_REPORT = 'full_report'
+    USER_LIST = 'user_list'
+    DASHBOARD_PDF = 'dashboard_pdf'
+    KIND_CHOICES = [
+        (FULL_REPORT, 'Full Report (Excel)'),
+        (USER_LIST, 'User List (Excel)'),
+        (DASHBOARD_PDF, 'Dashboard Report (PDF)'),
+    ]
+
+    QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    requested_by = models.ForeignKey(User, related_name='export_jobs', on_delete=models.CASCADE)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    params = models.JSONField(default=dict, blank=True)  # e.g. the dashboard filters of a PDF
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    progress = models.PositiveIntegerField(default=0)  # rows written so far
+    total = models.PositiveIntegerField(null=True, blank=True)  # rows expected, when known up front
+    artifact = models.FileField(storage=export_storage, upload_to='%Y/%m/', blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Queue pick-up: the oldest queued job.
+            models.Index(fields=['status', 'created_at'], name='exportjob_queue_idx'),
+            models.Index(fields=['requested_by', '-created_at'], name='exportjob_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} for {self.requested_by} ({self.status})"
+
+    @property
+    def percent(self):
+        if self.status == self.DONE: return 100
+        return min(99, 100 * self.progress // self.total) if self.total else 0
+
+    @property
+    def is_finished(self):
+        return self.status in (self.DONE, self.FAILED)
@@ -0,0 +1,76 @@
+# births/pdf_render.py
+#
+# WeasyPrint rendering, run either inline or in the processes of PDFRenderPool.
+# Pool processes are spawned fresh, so this module must not import Django.
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import functools
+import multiprocessing
+import threading
+
+
+class RenderPoolBusy(Exception):
+    """Every render slot (running and queued) is taken; the caller should retry later."""
+
+
+@functools.lru_cache(maxsize=None)
+def pdf_resources(css_path):
+    """The parsed stylesheets and font configuration, built once per process."""
+    from weasyprint import CSS
+    from weasyprint.text.fonts import FontConfiguration
+
+    font_config = FontConfiguration()
+    stylesheets = [CSS(filename=css_path, font_config=font_config),
+                   CSS(string='@page { size: A4 portrait; }', font_config=font_config)]
+    return stylesheets, font_config
+
+
+def render_pdf(html_string, base_url, css_path):
+    from weasyprint import HTML
+
+    stylesheets, font_config = pdf_resources(css_path)
+    return HTML(string=html_string, base_url=base_url).write_pdf(stylesheets=stylesheets, font_config=font_config)
+
+
+class PDFRenderPool:
+    """
+    A process pool for CPU-heavy work with a hard bound on pending jobs:
+    `workers` render at once and up to `queue_depth` more wait. Beyond that
+    run() raises RenderPoolBusy at once instead of queueing. The pool and its
+    processes are started on first use, so forking servers start them per worker.
+    """
+    def __init__(self, workers, queue_depth):
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(workers + queue_depth)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def _reset(self, executor):
+        with self._lock:
+            if self._executor is executor: self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def run(self, fn, *args, timeout=None):
+        if not self._slots.acquire(blocking=False):
+            raise RenderPoolBusy()
+        executor = self._get_executor()
+        try:
+            future = executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is held until the job finishes, even if this caller gives up waiting.
+        future.add_done_callback(lambda f: self._slots.release())
+        try:
+            return future.result(timeout=timeout)
+        except BrokenProcessPool:
+            # A render process died (e.g. killed for memory); start a fresh pool next time.
+            self._reset(executor)
+            raise
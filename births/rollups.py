@@ -0,0 +1,100 @@
+# births/rollups.py
+
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from .data import WEIGHT_BANDS
+from .models import Delivery, FacilityDailyRollup, LOCATION_FIELDS
+
+KEY_FIELDS = ('district', 'local_municipality', 'facility', 'facility_type', 'report_date', 'time_slot', 'birth_mode')
+# Delivery lookups for each key field; the rollup stores locations by name.
+DELIVERY_KEY_LOOKUPS = tuple(f'{field}__name' if field in LOCATION_FIELDS else field for field in KEY_FIELDS)
+COUNT_FIELDS = ('deliveries', 'nil_reports', 'babies', 'males', 'females') + tuple(f'weight_{band}' for band, _, _ in WEIGHT_BANDS)
+
+
+def rollup_key(values, prefix=''):
+    """Builds the rollup key from a Delivery instance or a values(*DELIVERY_KEY_LOOKUPS) dict."""
+    if isinstance(values, dict):
+        return tuple(values[prefix + lookup] or '' for lookup in DELIVERY_KEY_LOOKUPS)
+    key = []
+    for field in KEY_FIELDS:
+        value = getattr(values, field)
+        key.append((value.name if field in LOCATION_FIELDS and value else value) or '')
+    return tuple(key)
+
+
+def weight_band(weight):
+    """Returns the WEIGHT_BANDS key for a weight in grams, or None when unknown."""
+    if weight is None: return None
+    for band, lower, upper in WEIGHT_BANDS:
+        if (lower is None or weight >= lower) and (upper is None or weight < upper):
+            return band
+    return None
+
+
+def delivery_counts(no_births_to_report):
+    """What a delivery contributes to its rollup row, excluding its babies."""
+    return Counter(deliveries=1, nil_reports=int(bool(no_births_to_report)))
+
+
+def baby_counts(gender, weight):
+    """What a single baby contributes to its delivery's rollup row."""
+    counts = Counter(babies=1, males=int(gender == 'Male'), females=int(gender == 'Female'))
+    band = weight_band(weight)
+    if band: counts[f'weight_{band}'] = 1
+    return counts
+
+
+def apply_changes(changes):
+    """
+    Adds signed count changes ({key: Counter}) to the rollup table.
+    Rows are updated with F() increments so concurrent captures never lose counts.
+    """
+    with transaction.atomic():
+        for key, counts in changes.items():
+            counts = {field: value for field, value in counts.items() if value}
+            if not counts: continue
+            lookup = dict(zip(KEY_FIELDS, key))
+            increments = {field: F(field) + value for field, value in counts.items()}
+            if not FacilityDailyRollup.objects.filter(**lookup).update(**increments):
+                FacilityDailyRollup.objects.bulk_create([FacilityDailyRollup(**lookup)], ignore_conflicts=True)
+                FacilityDailyRollup.objects.filter(**lookup).update(**increments)
+
+
+def compute_rollups(deliveries_qs=None):
+    """Aggregates raw Delivery/Baby rows into {key: Counter} with one grouped query."""
+    deliveries_qs = Delivery.objects.all() if deliveries_qs is None else deliveries_qs
+    measures = {
+        'deliveries': Count('id', distinct=True),
+        'nil_reports': Count('id', distinct=True, filter=Q(no_births_to_report=True)),
+        'babies': Count('babies'),
+        'males': Count('babies', filter=Q(babies__gender='Male')),
+        'females': Count('babies', filter=Q(babies__gender='Female')),
+    }
+    for band, lower, upper in WEIGHT_BANDS:
+        q = Q()
+        if lower is not None: q &= Q(babies__weight__gte=lower)
+        if upper is not None: q &= Q(babies__weight__lt=upper)
+        measures[f'weight_{band}'] = Count('babies', filter=q)
+
+    rollups = defaultdict(Counter)
+    # Annotations are prefixed because 'babies' is also the name of the relation.
+    rows = deliveries_qs.values(*DELIVERY_KEY_LOOKUPS).annotate(**{f'n_{f}': m for f, m in measures.items()}).order_by()
+    for row in rows:
+        # NULL and '' share a key, so groups are merged rather than assigned.
+        rollups[rollup_key(row)].update({field: row[f'n_{field}'] for field in COUNT_FIELDS})
+    return rollups
+
+
+def rebuild_rollups(batch_size=1000):
+    """Replaces the whole rollup table with freshly aggregated rows. Returns the row count."""
+    with transaction.atomic():
+        rows = [
+            FacilityDailyRollup(**dict(zip(KEY_FIELDS, key)), **counts)
+            for key, counts in compute_rollups().items()
+        ]
+        FacilityDailyRollup.objects.all().delete()
+        FacilityDailyRollup.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
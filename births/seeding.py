@@ -0,0 +1,151 @@
+# births/seeding.py
+
+import random
+from datetime import date, time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.db import transaction
+
+from accounts.models import Profile
+
+from .models import Delivery, Baby, Facility
+from .rollups import rebuild_rollups
+
+# ==========================================================
+# DISTRIBUTIONS
+# Rough Eastern Cape public-sector shares; they only need to be plausible
+# enough for the dashboards, reports and indexes to see realistic data.
+# ==========================================================
+FESTIVE_REPORT_DATES = [date(2025, 12, 25), date(2026, 1, 1)]
+TIME_SLOTS = {  # slot: (first, last) minute of the day
+    "00:01 - 06:00": (1, 360), "06:01 - 12:00": (361, 720), "12:01 - 18:00": (721, 1080), "18:01 - 24:00": (1081, 1439),
+}
+BIRTH_MODE_WEIGHTS = {
+    "Normal Vertex": 66, "Caesarean section Emergency": 18, "Caesarean section Elective": 9,
+    "Vacuum": 4, "Vaginal Breech": 2, "Forceps": 1,
+}
+BABIES_PER_DELIVERY_WEIGHTS = {1: 9700, 2: 285, 3: 12, 4: 2, 5: 1}
+MOTHER_AGE_WEIGHTS = {(12, 14): 0.5, (15, 19): 12, (20, 35): 75, (36, 48): 12.5}  # (youngest, oldest): share
+# Mean birth weight in grams by babies per delivery; standard deviation 15% of the mean.
+MEAN_WEIGHT = {1: 3150, 2: 2400, 3: 1800, 4: 1500, 5: 1300}
+# Relative delivery volume by facility type.
+FACILITY_TYPE_WEIGHTS = {
+    "Tertiary Hospital": 10, "Academic Hospital": 10, "Regional Hospital": 8, "Private Hospital": 4,
+    "District Hospital": 3, "CHC": 2, "Clinic": 1,
+}
+NIL_REPORT_RATE = 0.02
+BORN_BEFORE_ARRIVAL_RATE = 0.02
+MOTHER_NAMES = ["Ayanda", "Bongiwe", "Lindiwe", "Nomsa", "Sinazo", "Thandeka", "Zintle", "Anele", "Lerato", "Maria"]
+MOTHER_SURNAMES = ["Mbeki", "Ndlovu", "Jacobs", "Dlamini", "Mthembu", "Nkosi", "van Wyk", "Zulu", "Botha", "Khumalo"]
+
+SEED_PERSAL_START = 90000000
+
+
+def _choice(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def _mother_dob(rng, on):
+    youngest, oldest = _choice(rng, MOTHER_AGE_WEIGHTS)
+    age = rng.randint(youngest, oldest)
+    dob = date(on.year - age - 1, rng.randint(1, 12), rng.randint(1, 28))
+    # Exactly `age` on the report date, whether or not the birthday has passed by then.
+    return dob.replace(year=dob.year + 1) if (dob.month, dob.day) <= (on.month, on.day) else dob
+
+
+def make_delivery(rng, facility):
+    """An unsaved Delivery at the given facility (with municipality and district selected)."""
+    municipality = facility.municipality
+    report_date = rng.choice(FESTIVE_REPORT_DATES)
+    slot = rng.choice(list(TIME_SLOTS))
+    delivery = Delivery(
+        district=municipality.district, local_municipality=municipality, facility=facility,
+        facility_type=facility.facility_type or None, report_date=report_date, time_slot=slot,
+    )
+    if rng.random() < NIL_REPORT_RATE:
+        delivery.no_births_to_report = True
+        return delivery
+    minute = rng.randint(*TIME_SLOTS[slot])
+    delivery.delivery_time = time(minute // 60, minute % 60)
+    delivery.born_before_arrival = rng.random() < BORN_BEFORE_ARRIVAL_RATE
+    delivery.mother_name, delivery.mother_surname = rng.choice(MOTHER_NAMES), rng.choice(MOTHER_SURNAMES)
+    delivery.mother_dob = _mother_dob(rng, report_date)
+    delivery.birth_mode = _choice(rng, BIRTH_MODE_WEIGHTS)
+    delivery.gravidity = rng.randint(1, 6)
+    delivery.parity = rng.randint(0, delivery.gravidity - 1)
+    delivery.set_mother_age()
+    return delivery
+
+
+def make_babies(rng, delivery):
+    """Unsaved Babies for a saved Delivery; none for a NIL report."""
+    if delivery.no_births_to_report: return []
+    count = _choice(rng, BABIES_PER_DELIVERY_WEIGHTS)
+    mean = MEAN_WEIGHT[count]
+    return [
+        Baby(delivery=delivery, gender="Male" if rng.random() < 0.51 else "Female",
+             weight=max(400, min(5800, round(rng.gauss(mean, mean * 0.15)))))
+        for _ in range(count)
+    ]
+
+
+def seed_births(count, seed=None, batch_size=2000):
+    """
+    Inserts `count` synthetic deliveries (and their babies) spread over every
+    facility, weighted by facility type, then rebuilds the rollups once.
+    Rows are bulk inserted, so the per-row rollup signals do not fire.
+    Returns the number of babies created.
+    """
+    rng = random.Random(seed)
+    facilities = list(Facility.objects.select_related('municipality__district'))
+    if not facilities:
+        raise ValueError("No facilities found; run `manage.py seed_locations` first.")
+    facility_weights = [FACILITY_TYPE_WEIGHTS.get(f.facility_type, 1) for f in facilities]
+
+    babies_created, remaining = 0, count
+    while remaining > 0:
+        size = min(batch_size, remaining)
+        with transaction.atomic():
+            deliveries = Delivery.objects.bulk_create(
+                [make_delivery(rng, f) for f in rng.choices(facilities, weights=facility_weights, k=size)]
+            )
+            babies = [baby for delivery in deliveries for baby in make_babies(rng, delivery)]
+            Baby.objects.bulk_create(babies, batch_size=batch_size)
+        babies_created += len(babies); remaining -= size
+    rebuild_rollups()
+    return babies_created
+
+
+def seed_users(per_role, password, seed=None):
+    """
+    Creates `per_role` Admin, User and ProvinceUser accounts with profiles on
+    persal numbers from SEED_PERSAL_START. Admins are spread over districts and
+    Users over facilities. The password is hashed once for all of them.
+    Returns the created users.
+    """
+    rng = random.Random(seed)
+    facilities = list(Facility.objects.select_related('municipality__district'))
+    taken = set(Profile.objects.filter(persal_number__gte=str(SEED_PERSAL_START)).values_list('persal_number', flat=True))
+    persal_numbers = (str(n) for n in range(SEED_PERSAL_START, 100000000) if str(n) not in taken)
+    encoded = make_password(password)
+
+    created = []
+    with transaction.atomic():
+        for role in ('Admin', 'User', 'ProvinceUser'):
+            group, _ = Group.objects.get_or_create(name=role)
+            for i in range(per_role):
+                facility = rng.choice(facilities)
+                municipality = facility.municipality
+                persal = next(persal_numbers)
+                user = User.objects.create(username=persal, password=encoded, first_name=rng.choice(MOTHER_NAMES),
+                                           last_name=f"{role} {i + 1}")
+                user.groups.add(group)
+                location = {}
+                if role == 'Admin':
+                    location = {'district': municipality.district}
+                elif role == 'User':
+                    location = {'district': municipality.district, 'local_municipality': municipality, 'facility': facility}
+                Profile.objects.create(user=user, persal_number=persal, title=rng.choice(['Ms', 'Mr', 'Dr']), **location)
+                created.append(user)
+    return created
@@ -0,0 +1,110 @@
+# births/signals.py
+
+from collections import Counter, defaultdict
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .dashboard import bump_data_version
+from .models import Delivery, Baby, DeletedDelivery
+from .rollups import DELIVERY_KEY_LOOKUPS, rollup_key, delivery_counts, baby_counts, apply_changes
+
+# ==========================================================
+# FACILITY DAILY ROLLUP MAINTENANCE
+# Every handler applies the difference between the old and the new state of
+# the row, so the rollup always matches the committed Delivery/Baby tables.
+# ==========================================================
+@receiver(pre_save, sender=Delivery)
+def snapshot_delivery(sender, instance, raw=False, **kwargs):
+    instance._rollup_old = None
+    if not raw and not instance._state.adding:
+        instance._rollup_old = Delivery.objects.filter(pk=instance.pk).values(*DELIVERY_KEY_LOOKUPS, 'no_births_to_report').first()
+
+@receiver(post_save, sender=Delivery)
+def update_rollup_for_delivery(sender, instance, created, raw=False, **kwargs):
+    if raw: return
+    old, new_key = getattr(instance, '_rollup_old', None), rollup_key(instance)
+    changes = defaultdict(Counter)
+    changes[new_key].update(delivery_counts(instance.no_births_to_report))
+    if old:
+        old_key = rollup_key(old)
+        changes[old_key].subtract(delivery_counts(old['no_births_to_report']))
+        if old_key != new_key:
+            # The babies move with their delivery into a different rollup row.
+            for baby in instance.babies.values('gender', 'weight'):
+                counts = baby_counts(baby['gender'], baby['weight'])
+                changes[old_key].subtract(counts); changes[new_key].update(counts)
+    apply_changes(changes)
+
+@receiver(post_delete, sender=Delivery)
+def remove_delivery_from_rollup(sender, instance, **kwargs):
+    # Its babies are deleted first by the cascade and remove themselves.
+    changes = defaultdict(Counter)
+    changes[rollup_key(instance)].subtract(delivery_counts(instance.no_births_to_report))
+    apply_changes(changes)
+
+def _delivery_key(baby):
+    """Current rollup key of a baby's delivery, reusing the cached delivery when present."""
+    if Baby.delivery.is_cached(baby):
+        return rollup_key(baby.delivery)
+    values = Delivery.objects.filter(pk=baby.delivery_id).values(*DELIVERY_KEY_LOOKUPS).first()
+    return rollup_key(values) if values else None
+
+@receiver(pre_save, sender=Baby)
+def snapshot_baby(sender, instance, raw=False, **kwargs):
+    instance._rollup_old = None
+    if not raw and not instance._state.adding:
+        instance._rollup_old = Baby.objects.filter(pk=instance.pk).values(
+            'gender', 'weight', *(f'delivery__{lookup}' for lookup in DELIVERY_KEY_LOOKUPS)).first()
+
+@receiver(post_save, sender=Baby)
+def update_rollup_for_baby(sender, instance, raw=False, **kwargs):
+    if raw: return
+    changes = defaultdict(Counter)
+    changes[_delivery_key(instance)].update(baby_counts(instance.gender, instance.weight))
+    old = getattr(instance, '_rollup_old', None)
+    if old:
+        old_key = rollup_key(old, prefix='delivery__')
+        changes[old_key].subtract(baby_counts(old['gender'], old['weight']))
+    apply_changes(changes)
+
+@receiver(post_delete, sender=Baby)
+def remove_baby_from_rollup(sender, instance, **kwargs):
+    key = _delivery_key(instance)
+    if not key: return
+    changes = defaultdict(Counter)
+    changes[key].subtract(baby_counts(instance.gender, instance.weight))
+    apply_changes(changes)
+
+# ==========================================================
+# DASHBOARD DATA VERSION (ETags of the JSON API, cache revalidation)
+# ==========================================================
+@receiver(post_save, sender=Delivery)
+@receiver(post_delete, sender=Delivery)
+@receiver(post_save, sender=Baby)
+@receiver(post_delete, sender=Baby)
+def mark_dashboard_data_changed(sender, **kwargs):
+    transaction.on_commit(bump_data_version)
+
+# ==========================================================
+# CHANGE TRACKING (births.delta)
+# Delivery.updated_at only moves on Delivery.save(), so changes that reach a
+# delivery some other way touch it here, and deletes leave a tombstone.
+# ==========================================================
+@receiver(post_save, sender=Baby)
+@receiver(post_delete, sender=Baby)
+def touch_delivery_of_baby(sender, instance, raw=False, **kwargs):
+    if raw: return
+    Delivery.objects.filter(pk=instance.delivery_id).update(updated_at=timezone.now())
+
+@receiver(post_delete, sender=Delivery)
+def record_deleted_delivery(sender, instance, **kwargs):
+    DeletedDelivery.objects.create(delivery_id=instance.pk, district_id=instance.district_id, facility_id=instance.facility_id)
+
+@receiver(pre_delete, sender=User)
+def touch_deliveries_of_deleted_user(sender, instance, **kwargs):
+    # captured_by is about to be SET_NULL with a plain UPDATE.
+    Delivery.objects.filter(captured_by=instance).update(updated_at=timezone.now())
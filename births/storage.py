@@ -0,0 +1,84 @@
+# births/storage.py
+#
+# Storage for finished background exports (ExportJob.artifact) in the database,
+# for deployments where the export worker and the web service have separate
+# disks (as on Render). Selected with EXPORT_STORAGE = 'database'.
+
+import io
+
+from django.core.files import File
+from django.core.files.storage import Storage
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import Length
+
+CHUNK_SIZE = 1024 * 1024  # bytes per ExportFileChunk row; every chunk but the last is full
+
+
+def _chunks():
+    from .models import ExportFileChunk  # models.py builds its storage at import time
+    return ExportFileChunk.objects
+
+
+class DatabaseStorage(Storage):
+    """Files kept as CHUNK_SIZE rows of ExportFileChunk, read back one chunk at a time."""
+    def _save(self, name, content):
+        # One row at a time, so no more than a chunk of the file is held in memory.
+        with transaction.atomic():
+            index = -1
+            for index, data in enumerate(content.chunks(CHUNK_SIZE)):
+                _chunks().create(name=name, index=index, data=data)
+            if index < 0: _chunks().create(name=name, index=0, data=b'')  # an empty file still exists
+        return name
+
+    def _open(self, name, mode='rb'):
+        if 'b' not in mode or set(mode) - set('rb'):
+            raise ValueError("Export files can only be opened for binary reading.")
+        size = self.size(name)
+        return File(io.BufferedReader(_ChunkReader(name, size), CHUNK_SIZE), name)
+
+    def exists(self, name):
+        return _chunks().filter(name=name).exists()
+
+    def delete(self, name):
+        _chunks().filter(name=name).delete()
+
+    def size(self, name):
+        size = _chunks().filter(name=name).aggregate(size=Sum(Length('data')))['size']
+        if size is None: raise FileNotFoundError(name)
+        return size
+
+    def url(self, name):
+        raise NotImplementedError("Export files are only served by the download view.")
+
+
+class _ChunkReader(io.RawIOBase):
+    """A seekable reader over a stored file that fetches the chunk under the position when needed."""
+    def __init__(self, name, size):
+        self.file_name, self.size, self.position = name, size, 0
+        self._cached = (None, b'')
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.position, io.SEEK_END: self.size}[whence]
+        self.position = max(0, base + offset)
+        return self.position
+
+    def readinto(self, buffer):
+        if self.position >= self.size: return 0
+        index, offset = divmod(self.position, CHUNK_SIZE)
+        if self._cached[0] != index:
+            data = _chunks().filter(name=self.file_name, index=index).values_list('data', flat=True).get()
+            self._cached = (index, bytes(data))
+        data = self._cached[1][offset:offset + len(buffer)]
+        buffer[:len(data)] = data
+        self.position += len(data)
+        return len(data)
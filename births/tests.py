@@ -1,3 +1,652 @@
-from django.test import TestCase
+import csv
+from datetime import date, timedelta
+import gzip
+import json
+import os
+from importlib.util import find_spec
+import tempfile
+import threading
+import time
+import zipfile
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.contrib.auth.models import AnonymousUser, Group, User
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+import openpyxl
+
+from accounts.models import Profile
+from accounts.scope import RoleScope
+from festive_births import metrics
+
+from .dashboard import (
+    apply_filters, build_dashboard_context, bump_data_version, get_dashboard_context, dashboard_cache_key, dashboard_etag, dashboard_payload, data_version,
+)
+from .delta import delta_page
+from .exports import (
+    ABNORMAL_WEIGHTS, FULL_REPORT, NIL_REPORTS, USER_LIST, WRITERS, gzip_stream, pdf_pool, render_dashboard_pdf, write_full_report_parquet,
+)
+from .forms import DeliveryForm
+from .pdf_render import BrokenProcessPool, PDFRenderPool, RenderPoolBusy
+from .jobs import claim_next_job, enqueue_export, run_job, run_worker
+from .models import Delivery, Baby, ExportFileChunk, ExportJob, FacilityDailyRollup, ABNORMAL_WEIGHT, locations_from_names, parse_report_date
+from .rollups import compute_rollups, COUNT_FIELDS, KEY_FIELDS
+from .storage import DatabaseStorage
+
+
+def make_delivery(babies=(), **fields):
+    """Creates a Delivery with the given (gender, weight) babies; locations are given by name."""
+    values = {
+        'district': 'Amathole DM', 'local_municipality': 'Mnquma LM', 'facility': 'Butterworth Hospital',
+        'facility_type': 'District Hospital', 'report_date': date(2026, 1, 1), 'time_slot': '00:01 - 06:00',
+        'birth_mode': 'Normal Vertex',
+    }
+    values.update(fields)
+    names = (values['district'], values['local_municipality'], values['facility'])
+    values['district'], values['local_municipality'], values['facility'] = locations_from_names(*names)
+    delivery = Delivery.objects.create(**values)
+    for gender, weight in babies:
+        Baby.objects.create(delivery=delivery, gender=gender, weight=weight)
+    return delivery
+
+
+class DashboardContextTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Ages are taken on the report date, 01 January 2026.
+        make_delivery([('Male', 3000), ('Female', 900)], mother_dob=date(2009, 6, 1))
+        make_delivery([('Female', 4200)], mother_dob=date(1995, 6, 1), facility='Nqamakwe CHC',
+                      facility_type='CHC', birth_mode='Vacuum', time_slot='06:01 - 12:00')
+        make_delivery([('Male', 2600)], mother_dob=date(2013, 6, 1), district='OR Tambo DM',
+                      local_municipality='Nyandeni LM', facility='St Barnabas Hospital')
+        make_delivery(no_births_to_report=True, birth_mode=None)
+
+    def test_panels_use_three_queries(self):
+        with self.assertNumQueries(3):
+            context = build_dashboard_context()
+        self.assertEqual((context['total_births'], context['total_males'], context['total_females']), (4, 2, 2))
+        self.assertEqual(context['total_nil_reports'], 1)
+        self.assertEqual(context['weight_summary'], {'extremely_low': 1, 'very_low': 0, 'low': 0, 'normal': 2, 'high': 1})
+
+    def test_breakdowns(self):
+        context = build_dashboard_context()
+        self.assertEqual([(r['district'], r['total_babies']) for r in context['summary_data']],
+                         [('Amathole DM', 3), ('OR Tambo DM', 1)])
+        self.assertEqual([(r['birth_mode'], r['total']) for r in context['birth_mode_summary']],
+                         [('Normal Vertex', 3), ('Vacuum', 1)])
+        self.assertEqual(context['age_group_summary']['15-19 yrs'], {'male_count': 1, 'female_count': 1, 'total': 2})
+        self.assertEqual(context['age_group_summary']['10-14 yrs']['total'], 1)
+        self.assertEqual(context['teenage_totals'], {'total_10_14': 1, 'total_15_19': 2})
+        self.assertEqual(context['multiple_births_summary'], [
+            {'facility': 'Butterworth Hospital', 'twins': 1, 'triplets': 0, 'quadruplets': 0, 'quintuplets': 0},
+        ])
+
+    def test_filters_switch_summary_grouping(self):
+        context = build_dashboard_context(district='Amathole DM')
+        self.assertEqual(context['summary_group_by'], 'local_municipality')
+        self.assertEqual(context['total_births'], 3)
+        self.assertEqual(context['summary_data'], [
+            {'local_municipality': 'Mnquma LM', 'male_count': 1, 'female_count': 2, 'total_babies': 3},
+        ])
+
+
+class FacilityDailyRollupTests(TestCase):
+    def assertRollupsMatchRawData(self):
+        stored = {
+            tuple(row[f] for f in KEY_FIELDS): {f: row[f] for f in COUNT_FIELDS}
+            for row in FacilityDailyRollup.objects.values() if any(row[f] for f in COUNT_FIELDS)
+        }
+        expected = {key: {f: counts[f] for f in COUNT_FIELDS} for key, counts in compute_rollups().items()}
+        self.assertEqual(stored, expected)
+
+    def test_saves_and_deletes_keep_rollups_in_sync(self):
+        delivery = make_delivery([('Male', 3000), ('Female', 1200)])
+        other = make_delivery([('Female', 4100)], time_slot='06:01 - 12:00')
+        self.assertRollupsMatchRawData()
+
+        baby = delivery.babies.first()
+        baby.weight = 2000; baby.gender = 'Female'; baby.save()
+        delivery.facility = locations_from_names('Amathole DM', 'Mnquma LM', 'Nqamakwe CHC')[2]
+        delivery.birth_mode = 'Vacuum'; delivery.save()
+        self.assertRollupsMatchRawData()
+
+        # The delete-all path used when an edit turns a delivery into a NIL report.
+        delivery.no_births_to_report = True; delivery.birth_mode = None; delivery.save()
+        delivery.babies.all().delete()
+        self.assertRollupsMatchRawData()
+
+        other.delete()
+        self.assertRollupsMatchRawData()
+
+    def test_rebuild_command(self):
+        make_delivery([('Male', 3000)])
+        FacilityDailyRollup.objects.update(babies=0, males=0)
+        call_command('rebuild_rollups', '--if-empty', stdout=StringIO())
+        self.assertEqual(FacilityDailyRollup.objects.get().babies, 0)  # filled tables are left alone
+        call_command('rebuild_rollups', stdout=StringIO())
+        self.assertRollupsMatchRawData()
+
+
+class LocationDimensionTests(TestCase):
+    def test_locations_are_seeded_and_resolved_within_their_parent(self):
+        district, municipality, facility = locations_from_names('OR Tambo DM', 'Nyandeni LM', 'Canzibe Hospital')
+        self.assertEqual((facility.municipality, municipality.district, facility.facility_type),
+                         (municipality, district, 'District Hospital'))
+        # The same facility name is listed under two municipalities.
+        self.assertNotEqual(facility, locations_from_names('OR Tambo DM', 'King Sabata Dalindyebo LM', 'Canzibe Hospital')[2])
+        self.assertEqual(locations_from_names('OR Tambo DM', 'Mnquma LM', 'Butterworth Hospital')[1:], (None, None))
+
+    def test_delivery_form_stores_foreign_keys_and_a_date(self):
+        form = DeliveryForm(data={
+            'district': 'Amathole DM', 'local_municipality': 'Mnquma LM', 'facility': 'Nqamakwe CHC',
+            'report_date': '2026-01-01', 'time_slot': '00:01 - 06:00', 'no_births_to_report': 'on',
+        })
+        self.assertTrue(form.is_valid(), form.errors)
+        delivery = form.save()
+        self.assertEqual((delivery.facility.name, delivery.report_date), ('Nqamakwe CHC', date(2026, 1, 1)))
+        self.assertEqual(DeliveryForm(instance=delivery)['facility'].value(), 'Nqamakwe CHC')
+
+    def test_report_date_filter_accepts_both_formats(self):
+        make_delivery([('Male', 3000)])
+        self.assertEqual(parse_report_date('01 January 2026'), parse_report_date('2026-01-01'))
+        self.assertEqual(apply_filters(Delivery.objects.all(), report_date='01 January 2026').count(), 1)
+        self.assertEqual(apply_filters(Delivery.objects.all(), report_date='not a date').count(), 0)
+
+
+class SeedBirthsTests(TestCase):
+    def test_command_generates_consistent_data_and_users(self):
+        call_command('seed_births', 300, '--users-per-role', '2', '--seed', '7', '--batch-size', '100', stdout=StringIO())
+        self.assertEqual(Delivery.objects.count(), 300)
+        self.assertGreaterEqual(Baby.objects.count(), Delivery.objects.filter(no_births_to_report=False).count())
+        self.assertFalse(Delivery.objects.filter(no_births_to_report=False, age_band__isnull=True).exists())
+        self.assertEqual(build_dashboard_context()['total_births'], Baby.objects.count())
+        self.assertEqual(Profile.objects.filter(user__groups__name='User', facility__isnull=False).count(), 2)
+        self.assertEqual(User.objects.filter(groups__name__in=['Admin', 'User', 'ProvinceUser']).count(), 6)
+
+
+class MotherAgeTests(TestCase):
+    def test_age_is_taken_on_the_report_date(self):
+        delivery = make_delivery(mother_dob=date(2006, 1, 2))
+        self.assertEqual((delivery.mother_age_at_delivery, delivery.age_band), (19, '15-19 yrs'))
+        delivery.mother_dob = date(2006, 1, 1); delivery.save(update_fields=['mother_dob'])
+        delivery.refresh_from_db()
+        self.assertEqual((delivery.mother_age_at_delivery, delivery.age_band), (20, '20-35 yrs'))
+
+    def test_backfill_command(self):
+        delivery = make_delivery(mother_dob=date(1985, 3, 1))
+        Delivery.objects.update(mother_age_at_delivery=None, age_band=None)
+        call_command('backfill_mother_ages', stdout=StringIO())
+        delivery.refresh_from_db()
+        self.assertEqual((delivery.mother_age_at_delivery, delivery.age_band), (40, '35+ yrs'))
+
+
+@override_settings(DASHBOARD_CACHE_TTL=60, DASHBOARD_CACHE_STALE_TTL=600)
+class DashboardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        make_delivery([('Male', 3000)])
+
+    def test_fresh_entry_is_served_from_cache(self):
+        self.assertEqual(get_dashboard_context()['total_births'], 1)
+        make_delivery([('Female', 3000)])
+        self.assertEqual(get_dashboard_context()['total_births'], 1)
+        self.assertEqual(get_dashboard_context(district='Amathole DM')['total_births'], 2)
+
+    def test_stale_entry_is_served_while_another_request_recomputes(self):
+        get_dashboard_context()
+        key = dashboard_cache_key()
+        entry = cache.get(key); entry['fresh_until'] = 0; cache.set(key, entry)
+        with self.captureOnCommitCallbacks(execute=True):
+            make_delivery([('Female', 3000)])
+
+        cache.add(f"{key}:lock", 1)
+        self.assertEqual(get_dashboard_context()['total_births'], 1)
+
+        cache.delete(f"{key}:lock")
+        self.assertEqual(get_dashboard_context()['total_births'], 2)
+        self.assertIsNone(cache.get(f"{key}:lock"))
+
+    def test_stale_entry_with_unchanged_data_is_not_recomputed(self):
+        get_dashboard_context()
+        key = dashboard_cache_key()
+        entry = cache.get(key); entry['fresh_until'] = 0; cache.set(key, entry)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(get_dashboard_context()['total_births'], 1)
+        self.assertFalse([q for q in queries.captured_queries if 'births_' in q['sql']])
+
+    def test_data_version_changes_on_commit_and_drives_the_etag(self):
+        context = get_dashboard_context()
+        etag = dashboard_etag(context)
+        self.assertEqual(dashboard_payload(context)['totals']['births'], 1)
+        self.assertEqual(etag, dashboard_etag(get_dashboard_context()))
+
+        version = data_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            make_delivery([('Female', 3000)])
+        self.assertNotEqual(data_version(), version)
+        self.assertNotEqual(dashboard_etag(context), dashboard_etag(context, district='Amathole DM'))
+
+    def test_api_answers_conditional_gets_until_the_data_changes(self):
+        response = self.client.get(reverse('api_dashboard'))
+        self.assertEqual((response.status_code, response['Cache-Control']), (200, 'no-cache'))
+        self.assertEqual(response.json()['totals']['births'], 1)
+        etag = response['ETag']
+
+        response = self.client.get(reverse('api_dashboard'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response['ETag'], response.content), (304, etag, b''))
+
+        bump_data_version()
+        key = dashboard_cache_key()  # a fresh entry is served as is; the new version shows once it goes stale
+        entry = cache.get(key); entry['fresh_until'] = 0; cache.set(key, entry)
+        response = self.client.get(reverse('api_dashboard'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class FullReportExportTests(TestCase):
+    def test_rows_are_streamed_per_baby_with_sized_columns(self):
+        make_delivery([('Male', 3100), ('Female', 2900)], mother_name='Nomsa')
+        make_delivery(no_births_to_report=True, facility='Frere Hospital', local_municipality='Buffalo City SD',
+                      district='Buffalo City MM')
+        make_delivery(mother_name='No babies captured')
+
+        file = BytesIO()
+        with self.assertNumQueries(2):  # column widths, then the streamed rows
+            WRITERS['xlsx'].write(file, FULL_REPORT, Delivery.objects.all())
+        sheet = openpyxl.load_workbook(file).active
+        rows = list(sheet.iter_rows(min_row=2, values_only=True))
+
+        self.assertEqual([row[15:18] for row in rows], [(1, 'Male', 3100), (2, 'Female', 2900), ('NIL Report', 'N/A', 'N/A')])
+        self.assertEqual(rows[0][1], '01 January 2026')
+        self.assertEqual(rows[2][6], 'Frere Hospital')
+        self.assertEqual(sheet.column_dimensions['F'].width, len('Local Municipality') + 2)
+        self.assertEqual(sheet.column_dimensions['G'].width, len('Butterworth Hospital') + 2)
+
+    def test_delimited_text_is_streamed_and_gzipped(self):
+        make_delivery([('Male', 3100), ('Female', 2900)], mother_name='Nomsa, "Noms"')
+        with self.assertNumQueries(1):
+            text = ''.join(WRITERS['tsv'].stream(FULL_REPORT, Delivery.objects.all()))
+        lines = text.splitlines()
+        self.assertEqual(lines[0].split('\t')[:3], ['Timestamp', 'Report Date', 'Time Slot'])
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(lines[2].split('\t')[15:18], ['2', 'Female', '2900'])
+
+        rows = list(csv.reader(StringIO(gzip.decompress(b''.join(gzip_stream(WRITERS['csv'].stream(FULL_REPORT, Delivery.objects.all())))).decode())))
+        self.assertEqual(rows[1][8], 'Nomsa, "Noms"')
+
+    def test_user_list_costs_fixed_queries(self):
+        admins, users = Group.objects.create(name='Admin'), Group.objects.create(name='User')
+        for i in range(5):
+            app_user = User.objects.create_user(f'0000010{i}', first_name=f'Name {i}')
+            app_user.groups.add(admins, users)
+        User.objects.create_user('00000200', first_name='No Roles')
+        Profile.objects.filter(user__username='00000100').delete()
+
+        queryset = USER_LIST.get_queryset(RoleScope.for_user(User.objects.create_superuser('export-su')))
+        with self.assertNumQueries(2):  # roles, then the streamed users with their profiles
+            rows = list(USER_LIST.rows(queryset))
+        roles = {row[0]: row[7] for row in rows}
+        self.assertEqual((roles['Name 0'], roles['Name 4'], roles['No Roles']), ('Admin, User', 'Admin, User', ''))
+
+    def test_reports_export_as_json_lines(self):
+        make_delivery([('Male', 900), ('Female', 3000)], mother_name='Nomsa', mother_surname='Dube')
+        make_delivery(no_births_to_report=True, report_date=date(2026, 1, 2))
+        admin = User.objects.create_superuser('report-admin')
+        scope = RoleScope.for_user(admin)
+
+        abnormal = ABNORMAL_WEIGHTS.get_queryset(scope)
+        with self.assertNumQueries(1):
+            lines = ''.join(WRITERS['jsonl'].stream(ABNORMAL_WEIGHTS, abnormal)).splitlines()
+        self.assertEqual(json.loads(lines[0]), {
+            'District': 'Amathole DM', 'Facility': 'Butterworth Hospital', "Mother's Full Name": 'Nomsa Dube',
+            'Time of Birth': '', 'Birth Weight (grams)': 900, 'Comment': 'Extremely Low',
+        })
+        nil_reports = NIL_REPORTS.get_queryset(scope, {'start_date': '2026-01-02'})
+        rows = list(csv.reader(StringIO(''.join(WRITERS['csv'].stream(NIL_REPORTS, nil_reports)))))
+        self.assertEqual([row[:2] for row in rows], [['Report Date', 'District'], ['02 January 2026', 'Amathole DM']])
+
+        self.client.force_login(admin)
+        response = self.client.get(reverse('export_report', args=['nil_reports', 'xlsx']))
+        self.assertIn('nil_births_report.xlsx', response['Content-Disposition'])
+        self.assertEqual(self.client.get(reverse('export_report', args=['nil_reports', 'pdf'])).status_code, 404)
+        self.client.force_login(User.objects.create_user('report-user'))
+        self.assertRedirects(self.client.get(reverse('export_user_list_excel')), reverse('landing_page'),
+                             fetch_redirect_response=False)
+
+    @skipUnless(find_spec('pyarrow'), "pyarrow is not installed")
+    def test_parquet_has_typed_columns(self):
+        import pyarrow.parquet as pq
+
+        make_delivery([('Male', 3100), ('Female', 2900)], mother_dob=date(1990, 6, 1))
+        make_delivery(no_births_to_report=True)
+        file = BytesIO()
+        write_full_report_parquet(file, Delivery.objects.all())
+        table = pq.read_table(file)
+
+        self.assertEqual(str(table.schema.field('facility').type), 'dictionary<values=string, indices=int32, ordered=0>')
+        self.assertEqual(str(table.schema.field('report_date').type), 'date32[day]')
+        self.assertEqual(table.column('baby_number').to_pylist(), [1, 2, None])
+        self.assertEqual(table.column('baby_weight_grams').to_pylist(), [3100, 2900, None])
+        self.assertEqual(table.column('report_date').to_pylist()[0], date(2026, 1, 1))
+
+
+class DistrictPackTests(TransactionTestCase):
+    # Districts are built on other threads and connections, so the data must be committed.
+    serialized_rollback = True  # restores the districts seeded by migrations
+    def test_pack_has_one_file_per_district(self):
+        make_delivery([('Male', 3100), ('Female', 2900)])
+        make_delivery([('Male', 2600)], district='OR Tambo DM', local_municipality='Nyandeni LM',
+                      facility='St Barnabas Hospital')
+        province = User.objects.create_user('province-user')
+        province.groups.add(Group.objects.get_or_create(name='ProvinceUser')[0])
+        self.client.force_login(province)
+
+        response = self.client.get(reverse('export_district_pack', args=['csv']))
+        archive = zipfile.ZipFile(BytesIO(b''.join(response.streaming_content)))
+        self.assertIn('amathole-dm.csv', archive.namelist())
+        self.assertEqual(len(archive.read('amathole-dm.csv').decode().splitlines()), 3)
+        self.assertEqual(len(archive.read('or-tambo-dm.csv').decode().splitlines()), 2)
+        self.assertEqual(len(archive.read('alfred-nzo-dm.csv').decode().splitlines()), 1)
+
+        self.client.force_login(User.objects.create_user('facility-user'))
+        self.assertEqual(self.client.get(reverse('export_district_pack', args=['csv'])).status_code, 302)
+
+
+@override_settings(DASHBOARD_PDF_CACHE_TTL=600)
+class DashboardPDFCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        make_delivery([('Male', 3000)])
+        self.user = User.objects.create_user('pdf-user', first_name='Ayanda', last_name='Mbeki')
+
+    @mock.patch('births.exports.render_pdf', return_value=b'%PDF-')
+    def test_pdf_is_rendered_once_per_filters_user_and_data_version(self, write_pdf):
+        self.assertEqual(render_dashboard_pdf({'district': 'Amathole DM'}, self.user), b'%PDF-')
+        render_dashboard_pdf({'district': 'Amathole DM'}, self.user)
+        self.assertEqual(write_pdf.call_count, 1)
+
+        render_dashboard_pdf({}, self.user)
+        self.assertEqual(write_pdf.call_count, 2)
+
+        cache.delete(dashboard_cache_key(district='Amathole DM'))
+        with self.captureOnCommitCallbacks(execute=True):
+            make_delivery([('Female', 3000)])
+        render_dashboard_pdf({'district': 'Amathole DM'}, self.user)
+        self.assertEqual(write_pdf.call_count, 3)
+        self.assertIn('Ayanda Mbeki', write_pdf.call_args.args[0])
+
+    def test_broken_render_pool_answers_503(self):
+        self.client.force_login(self.user)
+        with mock.patch('births.views.render_dashboard_pdf', side_effect=BrokenProcessPool):
+            response = self.client.get(reverse('generate_dashboard_pdf'))
+        self.assertEqual((response.status_code, response['Retry-After']), (503, str(settings.PDF_RENDER_RETRY_AFTER)))
+
+
+class PDFRenderPoolTests(TestCase):
+    def test_render_pool_rejects_work_beyond_its_queue(self):
+        pool = PDFRenderPool(workers=1, queue_depth=0)
+        self.addCleanup(lambda: pool._executor and pool._executor.shutdown())
+        busy = threading.Thread(target=pool.run, args=(time.sleep, 1))
+        busy.start()
+        while pool._executor is None: time.sleep(0.01)  # started once the job holds the only slot
+        with self.assertRaises(RenderPoolBusy):
+            pool.run(pow, 2, 10)
+        busy.join()
+
+    def test_render_pool_returns_the_result(self):
+        pool = PDFRenderPool(workers=1, queue_depth=0)
+        self.addCleanup(lambda: pool._executor and pool._executor.shutdown())
+        self.assertEqual(pool.run(pow, 2, 10, timeout=30), 1024)
+
+
+@override_settings(PDF_RENDER_WORKERS=1, PDF_RENDER_QUEUE_DEPTH=0)
+class DashboardPDFConcurrencyTests(TransactionTestCase):
+    # The requests run on their own threads and connections, as in a gthread worker.
+    serialized_rollback = True  # leaves the seeded districts for the TransactionTestCases after it
+    def test_concurrent_requests_beyond_the_pool_get_503(self):
+        user = User.objects.create_user('pdf-user')
+
+        def render(filters, user, base_url=None, pool=None):
+            pool.run(time.sleep, 1, timeout=30)
+            return b'%PDF-'
+
+        def get(results):
+            client = self.client_class()
+            client.force_login(user)
+            results.append(client.get(reverse('generate_dashboard_pdf')).status_code)
+
+        results = []
+        with mock.patch('births.exports._pdf_pool', None), mock.patch('births.views.render_dashboard_pdf', render):
+            threads = [threading.Thread(target=get, args=(results,)) for _ in range(2)]
+            threads[0].start()
+            # The pool's processes start once the first render holds the only slot.
+            while pdf_pool()._executor is None: time.sleep(0.01)
+            threads[1].start()
+            for thread in threads: thread.join()
+            pool = pdf_pool()
+        pool._executor.shutdown()
+        self.assertEqual(sorted(results), [200, 503])
+
+
+class ExportJobTests(TestCase):
+    def setUp(self):
+        export_root = tempfile.TemporaryDirectory()
+        self.addCleanup(export_root.cleanup)
+        self.enterContext(override_settings(EXPORT_ROOT=export_root.name))
+        self.admin = User.objects.create_superuser('export-admin', password='x')
+
+    def test_worker_builds_queued_full_report(self):
+        make_delivery([('Male', 3100)])
+        job = enqueue_export(self.admin, ExportJob.FULL_REPORT)
+        run_worker(once=True)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.progress, job.total, job.percent), (ExportJob.DONE, 1, 1, 100))
+        with job.artifact.open('rb') as f:
+            rows = list(openpyxl.load_workbook(f).active.iter_rows(values_only=True))
+        self.assertEqual(len(rows), 2)
+        self.assertIsNone(claim_next_job())
+
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('download_export', args=[job.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('festive_births_full_report', response['Content-Disposition'])
+        self.assertContains(self.client.get(reverse('export_jobs')), reverse('download_export', args=[job.pk]))
+
+    def test_jobs_are_private_and_user_list_is_superuser_only(self):
+        user = User.objects.create_user('export-user', password='x')
+        enqueue_export(user, ExportJob.USER_LIST)
+        with self.assertLogs('births.jobs', 'ERROR'):
+            self.assertEqual(run_job(claim_next_job()).status, ExportJob.FAILED)
+
+        done = enqueue_export(self.admin, ExportJob.USER_LIST)
+        run_job(claim_next_job())
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(reverse('download_export', args=[done.pk])).status_code, 404)
+        self.client.post(reverse('request_export'), {'kind': ExportJob.USER_LIST})
+        self.assertFalse(ExportJob.objects.filter(requested_by=user, status=ExportJob.QUEUED).exists())
+
+    @mock.patch('births.storage.CHUNK_SIZE', 1000)
+    def test_database_storage_is_shared_by_worker_and_web(self):
+        make_delivery([('Male', 3100)])
+        field = ExportJob._meta.get_field('artifact')
+        with mock.patch.object(field, 'storage', DatabaseStorage()):
+            job = enqueue_export(self.admin, ExportJob.FULL_REPORT)
+            run_worker(once=True)
+            job.refresh_from_db()
+            self.assertGreater(ExportFileChunk.objects.filter(name=job.artifact.name).count(), 1)
+            with job.artifact.open('rb') as f:  # openpyxl seeks around the zip
+                self.assertEqual(len(list(openpyxl.load_workbook(f).active.iter_rows())), 2)
+
+            self.client.force_login(self.admin)
+            response = self.client.get(reverse('download_export', args=[job.pk]))
+            self.assertEqual(len(b''.join(response.streaming_content)), job.artifact.size)
+            ExportFileChunk.objects.all().delete()  # e.g. written where this server cannot read it
+            self.assertEqual(self.client.get(reverse('download_export', args=[job.pk])).status_code, 404)
+
+
+@mock.patch('births.delta.DELTA_SETTLE_TIME', timedelta(0))
+class DeltaExportTests(TestCase):
+    def test_pages_follow_creates_updates_and_deletes(self):
+        first = make_delivery([('Male', 3100)])
+        second = make_delivery(no_births_to_report=True)
+
+        with self.assertNumQueries(3):
+            page = delta_page({}, limit=1)
+        self.assertEqual(([d['id'] for d in page['deliveries']], page['has_more']), ([first.pk], True))
+        self.assertEqual(page['deliveries'][0]['babies'][0]['weight'], 3100)
+        page = delta_page({}, page['cursor'], limit=1)
+        self.assertEqual([d['id'] for d in page['deliveries']], [second.pk])
+        cursor = delta_page({}, page['cursor'])['cursor']
+        self.assertEqual(delta_page({}, cursor)['deliveries'], [])
+
+        baby = first.babies.get(); baby.weight = 2000; baby.save()
+        second_pk = second.pk
+        second.delete()
+        page = delta_page({}, cursor)
+        self.assertEqual([(d['id'], d['babies'][0]['weight']) for d in page['deliveries']], [(first.pk, 2000)])
+        self.assertEqual(page['deleted'], [second_pk])
+        self.assertEqual(delta_page({'district_id': 0}, cursor)['deleted'], [])
+
+    def test_api_requires_login_and_a_valid_cursor(self):
+        url = reverse('api_deliveries_delta')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_login(User.objects.create_superuser('delta-admin', password='x'))
+        self.assertEqual(self.client.get(url, {'cursor': 'tampered'}).status_code, 400)
+        make_delivery()
+        page = self.client.get(url).json()
+        self.assertEqual(len(page['deliveries']), 1)
+        self.assertEqual(self.client.get(url, {'cursor': page['cursor']}).json()['deliveries'], [])
+
+
+@override_settings(METRICS_TOKEN='scrape-token', METRICS_FLUSH_INTERVAL=3600)
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(metrics, 'store', metrics.MetricsStore())
+        patcher.start(); self.addCleanup(patcher.stop)
+        self.factory = RequestFactory()
+
+    def request(self, view_name, queries):
+        def view(request):
+            request.resolver_match = mock.Mock(view_name=view_name)
+            for _ in range(queries): Delivery.objects.count()
+            return HttpResponse()
+        return metrics.RequestMetricsMiddleware(view)(self.factory.get('/'))
+
+    def scrape(self, **headers):
+        request = self.factory.get('/metrics/', **headers)
+        request.user = AnonymousUser()
+        return metrics.metrics_view(request)
+
+    def test_latency_and_queries_are_recorded_per_view(self):
+        self.request('delivery_list', 3)
+        self.request('delivery_list', 1)
+        body = self.scrape(HTTP_AUTHORIZATION='Bearer scrape-token').content.decode()
+        self.assertIn(f'festive_http_request_duration_seconds_count{{view="delivery_list",method="GET"}} 2', body)
+        self.assertIn('festive_http_requests_total{view="delivery_list",method="GET",status="200"} 2', body)
+        self.assertIn('festive_db_queries_per_request_bucket{view="delivery_list",method="GET",le="2"} 1', body)
+        self.assertIn('festive_db_queries_per_request_sum{view="delivery_list",method="GET"} 4', body)
+
+    def test_snapshots_of_other_workers_are_added_up(self):
+        self.request('landing_page', 0)
+        other = metrics.MetricsStore()
+        other.record('landing_page', 'GET', 200, 0.2, 5, 0.01)
+        cache.set(f"{metrics.WORKER_KEY_PREFIX}:other", other.snapshot())
+        cache.set(metrics.WORKERS_KEY, {f"{metrics.WORKER_KEY_PREFIX}:other"})
+        body = self.scrape(HTTP_AUTHORIZATION='Bearer scrape-token').content.decode()
+        self.assertIn('festive_http_requests_total{view="landing_page",method="GET",status="200"} 2', body)
+
+    def test_workers_without_a_snapshot_are_pruned(self):
+        self.request('landing_page', 0)
+        worker_key = f"{metrics.WORKER_KEY_PREFIX}:{os.getpid()}"
+        cache.set(metrics.WORKERS_KEY, {worker_key, f"{metrics.WORKER_KEY_PREFIX}:restarted"})
+        self.scrape(HTTP_AUTHORIZATION='Bearer scrape-token')
+        self.assertEqual(cache.get(metrics.WORKERS_KEY), {worker_key})
+
+    def test_endpoint_requires_token_or_superuser(self):
+        self.assertEqual(self.scrape().status_code, 403)
+        self.assertEqual(self.scrape(HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        request = self.factory.get('/metrics/')
+        request.user = User.objects.create_superuser('metrics-admin', password='x')
+        self.assertEqual(metrics.metrics_view(request).status_code, 200)
+
+
+class SlidingSessionTests(TestCase):
+    def session_writes(self, count):
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(count):
+                self.assertEqual(self.client.get(reverse('delivery_list')).status_code, 200)
+        return len([query for query in queries if query['sql'].startswith('UPDATE "django_session"')])
+
+    def test_session_is_only_saved_when_its_expiry_is_due(self):
+        self.client.force_login(User.objects.create_superuser('session-admin', password='x'))
+        self.session_writes(1)  # stamps the session and caches the role scope
+        self.assertEqual(self.session_writes(10), 0)
+
+        later = time.time() + settings.SESSION_REFRESH_INTERVAL + 1
+        with mock.patch('festive_births.sessions.time.time', return_value=later):
+            self.assertEqual(self.session_writes(3), 1)
+        self.assertGreaterEqual(settings.SESSION_COOKIE_AGE - settings.SESSION_REFRESH_INTERVAL, 1800)
+
+
+@skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN output is SQLite specific")
+class AccessPathIndexTests(TestCase):
+    """The list, report and dashboard queries must be served by the indexes of migration 0005."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.superuser = User.objects.create_superuser('00000001', password='x')
+        cls.admin = User.objects.create_user('00000002', password='x')
+        cls.admin.groups.add(Group.objects.get_or_create(name='Admin')[0])
+        district, municipality, facility = locations_from_names('Amathole DM', 'Mnquma LM', 'Butterworth Hospital')
+        Profile.objects.create(user=cls.admin, persal_number='00000002', district=district)
+        cls.user = User.objects.create_user('00000003', password='x')
+        cls.user.groups.add(Group.objects.get_or_create(name='User')[0])
+        Profile.objects.create(user=cls.user, persal_number='00000003', district=district,
+                               local_municipality=municipality, facility=facility)
+
+    def view_queryset(self, view_class, user):
+        view = view_class()
+        view.request = RequestFactory().get('/'); view.request.user = user
+        view.request.scope = RoleScope.for_user(user)
+        view.args, view.kwargs = (), {}
+        return view.get_queryset()
+
+    def assertUsesIndex(self, queryset, *names):
+        plan = queryset.explain()
+        self.assertTrue(any(f'INDEX {name}' in plan for name in names), plan)
+
+    def test_delivery_list(self):
+        from .views import DeliveryListView  # views import WeasyPrint
+        self.assertUsesIndex(self.view_queryset(DeliveryListView, self.superuser), 'delivery_timestamp_idx')
+        self.assertUsesIndex(self.view_queryset(DeliveryListView, self.admin), 'delivery_district_ts_idx')
+        self.assertUsesIndex(self.view_queryset(DeliveryListView, self.user), 'delivery_facility_ts_idx')
+
+    def test_nil_report(self):
+        from .views import NilReportView
+        self.assertUsesIndex(self.view_queryset(NilReportView, self.superuser), 'delivery_nil_report_idx')
+        self.assertUsesIndex(self.view_queryset(NilReportView, self.admin), 'delivery_nil_report_idx', 'delivery_district_ts_idx')
+
+    def test_abnormal_weight_report(self):
+        from .views import AbnormalWeightReportView
+        for user in (self.superuser, self.admin, self.user):
+            self.assertUsesIndex(self.view_queryset(AbnormalWeightReportView, user),
+                                 'baby_abnormal_weight_idx', 'baby_delivery_gender_idx')
+        self.assertUsesIndex(Baby.objects.filter(ABNORMAL_WEIGHT).values('delivery'), 'baby_abnormal_weight_idx')
+
+    def test_dashboard_filters(self):
+        self.assertUsesIndex(apply_filters(Delivery.objects.all(), district='Amathole DM'),
+                             'delivery_location_idx', 'delivery_district_ts_idx')
+        self.assertUsesIndex(Delivery.objects.filter(no_births_to_report=True, report_date__gte=date(2026, 1, 1)),
+                             'delivery_nil_report_idx')
+        self.assertUsesIndex(apply_filters(Delivery.objects.all(), report_date='01 January 2026'), 'delivery_report_date_idx')
+        self.assertUsesIndex(apply_filters(FacilityDailyRollup.objects.all(), report_date='01 January 2026'), 'rollup_report_date_idx')
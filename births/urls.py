@@ -1,8 +1,9 @@
 from django.urls import path
-from django.contrib.auth.views import LoginView, LogoutView
+from django.contrib.auth.views import LogoutView
 from django.contrib.auth import views as auth_views
 from django.urls import reverse_lazy
 from . import views
+from accounts.views import LoginView, PasswordChangeView
 from django.contrib.auth.forms import AuthenticationForm
 
 class CustomAuthForm(AuthenticationForm):
@@ -14,13 +15,12 @@ class CustomAuthForm(AuthenticationForm):
 urlpatterns = [
     # --- Public & Auth URLs ---
     path('', views.LandingPageView.as_view(), name='landing_page'),
+    path('api/dashboard/', views.dashboard_api, name='api_dashboard'),
+    path('api/deliveries/changes/', views.deliveries_delta_api, name='api_deliveries_delta'),
     path('login/', LoginView.as_view(template_name='registration/login.html'), name='login'),
     path('logout/', LogoutView.as_view(next_page='landing_page'), name='logout'),
 
-    path('password-change/', auth_views.PasswordChangeView.as_view(
-        template_name='registration/password_change_form.html',
-        success_url = reverse_lazy('password_change_done') # Redirect after success
-    ), name='password_change'),
+    path('password-change/', PasswordChangeView.as_view(), name='password_change'),
     path(
     'password-change/done/',
     auth_views.PasswordChangeDoneView.as_view(template_name='registration/password_change_done.html'),
@@ -42,8 +42,16 @@ urlpatterns = [
     # Delete View: The confirmation page to delete a delivery
     path('deliveries/<int:pk>/delete/', views.DeliveryDeleteView.as_view(), name='delivery_delete'),
 
-    path('reports/export-excel/', views.export_full_report_excel, name='export_full_report'),
-    path('export-users/', views.export_user_list_excel, name='export_user_list_excel'),
+    path('reports/export/<slug:export>.<slug:export_format>', views.export_report, name='export_report'),
+    path('reports/export-excel/', views.export_report, {'export': 'full_report', 'export_format': 'xlsx'}, name='export_full_report'),
+    path('reports/export-csv/', views.export_report, {'export': 'full_report', 'export_format': 'csv'}, name='export_full_report_csv'),
+    path('reports/district-pack.<slug:export_format>', views.export_district_pack, name='export_district_pack'),
+    path('reports/export-parquet/', views.export_full_report_parquet, name='export_full_report_parquet'),
+    path('reports/export-tsv/', views.export_report, {'export': 'full_report', 'export_format': 'tsv'}, name='export_full_report_tsv'),
+    path('export-users/', views.export_report, {'export': 'user_list', 'export_format': 'xlsx'}, name='export_user_list_excel'),
+    path('reports/exports/', views.ExportJobListView.as_view(), name='export_jobs'),
+    path('reports/exports/new/', views.request_export, name='request_export'),
+    path('reports/exports/<int:pk>/download/', views.download_export, name='download_export'),
     path('reports/abnormal-weights/', views.AbnormalWeightReportView.as_view(), name='report_abnormal_weights'),
     
     # --- AJAX URL for dynamic dropdowns (this remains the same) ---
@@ -2,91 +2,38 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse_lazy
 from django.views.generic import TemplateView, ListView, CreateView, UpdateView, DeleteView
 from django.views import View
-from django.http import HttpResponse, JsonResponse
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.db import transaction
-from django.db.models import Count, Q, Sum, Case, When, Value, CharField
+from django.db.models import Q
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.auth.decorators import login_required # Ensure this is here
-from django.template.loader import render_to_string
-from django.contrib.staticfiles import finders
 from django.contrib import messages # Ensure this is here
-from datetime import date, timedelta
-import json
-
-# --- Third-Party Library Imports ---
-import openpyxl # Ensure this is here
-from openpyxl.styles import Font, Alignment # Ensure this is here
-from weasyprint import HTML, CSS
-
-# --- Local App Imports ---
-from .models import Delivery, Baby
-from .forms import DeliveryForm, BabyFormSet, DashboardReportFilterForm, NilReportFilterForm # Ensure NilReportFilterForm is defined
-from .data import LOCATION_DATA, DISTRICT_CHOICES, FACILITY_TYPES
-from accounts.models import Profile # <--- Correct Import for your Profile model
-from django.contrib.auth import get_user_model # To get the active User model
-
-User = get_user_model() # Define User here for consistency
-
-# ==========================================================
-# HELPER FUNCTIONS & PERMISSION MIXINS
-# ==========================================================
-def can_modify_data(user):
-    """Permission check for users who can create/edit/delete data."""
-    return user.is_authenticated and not user.groups.filter(name='ProvinceUser').exists()
-
-class DataEditorRequiredMixin(UserPassesTestMixin):
-    """Mixin to apply the can_modify_data permission check to views."""
-    def test_func(self):
-        return can_modify_data(self.request.user)
-
-# ==========================================================
-# DASHBOARD VIEW
-# ==========================================================
-from django.views.generic import TemplateView
-from django.db.models import Count, Q, Sum
-from datetime import date, timedelta
-import json
-
-from django.shortcuts import render, redirect, get_object_or_404
-from django.urls import reverse_lazy
-from django.views.generic import TemplateView, ListView, CreateView, UpdateView, DeleteView
-from django.views import View
-from django.http import HttpResponse, JsonResponse
-from django.db import transaction
-from django.db.models import Count, Q, Sum, Case, When, Value, CharField
-from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.contrib.auth.decorators import login_required # Ensure this is here
-from django.template.loader import render_to_string
-from django.contrib.staticfiles import finders
-from django.contrib import messages # Ensure this is here
-from datetime import date, timedelta
-import json
-
-# --- Third-Party Library Imports ---
-import openpyxl # Ensure this is here
-from openpyxl.styles import Font, Alignment # Ensure this is here
-from weasyprint import HTML, CSS
+from django.conf import settings
+from django.utils.cache import get_conditional_response
+from django.views.decorators.http import require_GET, require_POST
+import os
+import tempfile
 
 # --- Local App Imports ---
-from .models import Delivery, Baby
+from .models import Delivery, Baby, ExportJob
 from .forms import DeliveryForm, BabyFormSet, DashboardReportFilterForm, NilReportFilterForm # Ensure NilReportFilterForm is defined
-from .data import LOCATION_DATA, DISTRICT_CHOICES, FACILITY_TYPES
-from accounts.models import Profile # <--- Correct Import for your Profile model
-from django.contrib.auth import get_user_model # To get the active User model
-
-User = get_user_model() # Define User here for consistency
+from .data import LOCATION_DATA, FACILITY_TYPES
+from .dashboard import get_dashboard_context, filters_from_request, dashboard_payload, dashboard_etag
+from .exports import (
+    ABNORMAL_WEIGHTS, DISTRICT_PACK_FILENAME, EXPORTS, FULL_REPORT, NIL_REPORTS, PARQUET_CONTENT_TYPE, WRITERS,
+    can_export_district_pack, district_pack_stream, gzip_stream, pdf_pool, render_dashboard_pdf, write_full_report_parquet,
+)
+from .delta import DELTA_PAGE_SIZE, InvalidCursor, delta_page
+from .jobs import enqueue_export
+from .pdf_render import BrokenProcessPool, RenderPoolBusy
 
 # ==========================================================
 # HELPER FUNCTIONS & PERMISSION MIXINS
 # ==========================================================
-def can_modify_data(user):
-    """Permission check for users who can create/edit/delete data."""
-    return user.is_authenticated and not user.groups.filter(name='ProvinceUser').exists()
-
 class DataEditorRequiredMixin(UserPassesTestMixin):
-    """Mixin to apply the can_modify_data permission check to views."""
+    """Mixin to apply the RoleScope.can_modify_data permission check to views."""
     def test_func(self):
-        return can_modify_data(self.request.user)
+        return self.request.scope.can_modify_data
 
 # ==========================================================
 # DASHBOARD VIEW
@@ -96,147 +43,43 @@ class LandingPageView(TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        
+
         # This view is fully public and does NOT filter by user role.
         # It ONLY filters based on the GET parameters from the dropdowns.
-        deliveries_qs = Delivery.objects.all()
-
-        # Get and clean URL filter values from the user's dropdown selections
-        selected_date = self.request.GET.get('report_date') or None
-        selected_district = self.request.GET.get('district') or None
-        selected_municipality = self.request.GET.get('local_municipality') or None
-        selected_facility = self.request.GET.get('facility') or None
-
-        # Apply the user-selected filters
-        if selected_date: deliveries_qs = deliveries_qs.filter(report_date=selected_date)
-        if selected_district: deliveries_qs = deliveries_qs.filter(district=selected_district)
-        if selected_municipality: deliveries_qs = deliveries_qs.filter(local_municipality=selected_municipality)
-        if selected_facility: deliveries_qs = deliveries_qs.filter(facility=selected_facility)
-        
-        # 3. Create the babies queryset based on the filtered deliveries
-        babies_qs = Baby.objects.filter(delivery__in=deliveries_qs)
-
-        # 4. KPI Card Calculations
-        total_births = babies_qs.count()
-        total_males = babies_qs.filter(gender='Male').count()
-        total_females = babies_qs.filter(gender='Female').count()
-        total_nil_reports = deliveries_qs.filter(no_births_to_report=True).count()
-
-        # 5. Dynamic Summary Table Logic
-        if selected_facility:
-            group_by, title, header, footer = 'facility', f'Births in {selected_facility}', 'Facility', selected_facility
-        elif selected_municipality:
-            group_by, title, header, footer = 'facility', f'Births per Facility in {selected_municipality}', 'Facility', selected_municipality
-        elif selected_district:
-            group_by, title, header, footer = 'local_municipality', f'Births per Local Municipality in {selected_district}', 'Local Municipality', selected_district
-        else:
-            group_by, title, header, footer = 'district', 'Births per District', 'District', 'Eastern Cape'
-        
-        summary_data = deliveries_qs.filter(no_births_to_report=False).values(group_by).annotate(
-            total_babies=Count('babies'), male_count=Count('babies', filter=Q(babies__gender='Male')),
-            female_count=Count('babies', filter=Q(babies__gender='Female'))).order_by(group_by)
-        
-        context.update({'summary_title': title, 'summary_table_header': header, 'summary_footer_title': footer, 'summary_group_by': group_by})
-
-        # 6. Detailed Breakdown Queries for Tables & Charts
-        
-        # Age Group Summary
-        age_group_labels = ["10-14 yrs", "15-19 yrs", "20-35 yrs", "35+ yrs"]
-        age_group_summary = {label: {'male_count': 0, 'female_count': 0, 'total': 0} for label in age_group_labels}
-        today = date.today()
-        for delivery in deliveries_qs.filter(mother_dob__isnull=False, no_births_to_report=False).prefetch_related('babies'):
-            age = today.year - delivery.mother_dob.year - ((today.month, today.day) < (delivery.mother_dob.month, delivery.mother_dob.day))
-            age_group = next((label for label in age_group_labels if (10 <= age <= 14 and label == "10-14 yrs") or \
-                               (15 <= age <= 19 and label == "15-19 yrs") or \
-                               (20 <= age <= 35 and label == "20-35 yrs") or \
-                               (age > 35 and label == "35+ yrs")), None)
-            if age_group:
-                for baby in delivery.babies.all():
-                    if baby.gender == 'Male': age_group_summary[age_group]['male_count'] += 1
-                    elif baby.gender == 'Female': age_group_summary[age_group]['female_count'] += 1
-                    age_group_summary[age_group]['total'] += 1
-        
-        # Birth Mode Summary
-        birth_mode_summary = deliveries_qs.filter(no_births_to_report=False, birth_mode__isnull=False).exclude(birth_mode__exact='').values('birth_mode').annotate(male_count=Count('babies', filter=Q(babies__gender='Male')), female_count=Count('babies', filter=Q(babies__gender='Female')), total=Count('babies')).order_by('birth_mode')
-        
-        # Time Slot Summary
-        time_slot_summary = deliveries_qs.filter(no_births_to_report=False).values('time_slot').annotate(male_count=Count('babies', filter=Q(babies__gender='Male')), female_count=Count('babies', filter=Q(babies__gender='Female')), total_in_slot=Count('babies')).order_by('time_slot')
-        
-        # Facility Type Summary
-        facility_type_summary = deliveries_qs.filter(
-            no_births_to_report=False
-        ).values('facility_type').annotate(
-            male_count=Count('babies', filter=Q(babies__gender='Male')),
-            female_count=Count('babies', filter=Q(babies__gender='Female')),
-            total_in_type=Count('babies')
-        ).order_by('facility_type')
-
-        # Teenage Pregnancy Summary
-        date_10_years_ago = today.replace(year=today.year-10)
-        date_15_years_ago = today.replace(year=today.year-15)
-        date_20_years_ago = today.replace(year=today.year-20)
-
-        teenage_pregnancy_summary = deliveries_qs.filter(
-            no_births_to_report=False, 
-            mother_dob__isnull=False, 
-            mother_dob__gte=date_20_years_ago # Mothers 19 years old or younger (born 20 years ago or less)
-        ).values(
-            'facility'
-        ).annotate(
-            group_10_14=Count('babies', filter=Q(mother_dob__range=(date_15_years_ago + timedelta(days=1), date_10_years_ago))),
-            group_15_19=Count('babies', filter=Q(mother_dob__range=(date_20_years_ago, date_15_years_ago + timedelta(days=1))))
-            # Note: The logic for date ranges needs to be precise.
-            # mother_dob__range=(start_date, end_date) includes both start and end dates.
-            # A mother born 15 years ago today would be 15. A mother born 15 years and 1 day ago would be 15.
-            # If '10-14' means age 10 to 14 inclusive, adjust date ranges carefully.
-            # Example: Age 10 is born 10 years ago. Age 14 is born 14 years ago.
-            # For 10-14: mother_dob__gte (today - 15 years + 1 day), mother_dob__lte (today - 10 years)
-        ).order_by('facility')
-        
-        teenage_totals = teenage_pregnancy_summary.aggregate(total_10_14=Sum('group_10_14'), total_15_19=Sum('group_15_19'))
-
-        # Multiple Births Summary (Pivoted by Facility)
-        multiple_births_summary = {}
-        deliveries_with_counts = deliveries_qs.annotate(baby_count=Count('babies')).filter(baby_count__gt=1, no_births_to_report=False)
-        for delivery in deliveries_with_counts:
-            facility_name = delivery.facility
-            if facility_name not in multiple_births_summary:
-                multiple_births_summary[facility_name] = {'Twins': 0, 'Triplets': 0, 'Quadruplets': 0, 'Quintuplets': 0}
-            if delivery.baby_count == 2: multiple_births_summary[facility_name]['Twins'] += 1
-            elif delivery.baby_count == 3: multiple_births_summary[facility_name]['Triplets'] += 1
-            elif delivery.baby_count == 4: multiple_births_summary[facility_name]['Quadruplets'] += 1
-            elif delivery.baby_count == 5: multiple_births_summary[facility_name]['Quintuplets'] += 1
-        has_multiple_births = bool(multiple_births_summary)
-
-        weight_summary = babies_qs.aggregate(
-            extremely_low=Count('id', filter=Q(weight__lt=1000)),
-            very_low=Count('id', filter=Q(weight__gte=1000, weight__lt=1500)),
-            low=Count('id', filter=Q(weight__gte=1500, weight__lt=2500)),
-            normal=Count('id', filter=Q(weight__gte=2500, weight__lt=4000)),
-            high=Count('id', filter=Q(weight__gte=4000)),
-        )
-
-        # 7. Pass all data to the context
-        context.update({
-            'total_births': total_births, 'total_males': total_males, 'total_females': total_females,
-            'total_nil_reports': total_nil_reports, 'summary_data': summary_data,
-            'form_title': "Festive Season Dashboard", 'selected_date': selected_date, 'selected_district': selected_district,
-            'selected_municipality': selected_municipality, 'selected_facility': selected_facility,
-            'district_list': [d[0] for d in DISTRICT_CHOICES if d[0]],
-            'age_group_summary': age_group_summary, 'birth_mode_summary': birth_mode_summary,
-            'time_slot_summary': time_slot_summary, 'facility_type_summary': facility_type_summary,
-            'teenage_pregnancy_summary': teenage_pregnancy_summary, 'teenage_totals': teenage_totals,
-            'multiple_births_summary': multiple_births_summary,
-            'has_multiple_births': has_multiple_births,
-            # Data formatted specifically for Chart.js
-            'age_group_labels': json.dumps(list(age_group_summary.keys())),
-            'age_group_data': json.dumps([d['total'] for d in age_group_summary.values()]),
-            'birth_mode_labels': json.dumps([i['birth_mode'] for i in birth_mode_summary]), 
-            'birth_mode_data': json.dumps([i['total'] for i in birth_mode_summary]),
-            'weight_summary': weight_summary,
-        })
+        context.update(get_dashboard_context(**filters_from_request(self.request)))
         return context
 
+@require_GET
+def dashboard_api(request):
+    """The dashboard aggregates as compact JSON, with a strong ETag for conditional GETs."""
+    filters = filters_from_request(request)
+    context = get_dashboard_context(**filters)
+    etag = dashboard_etag(context, **filters)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = JsonResponse(dashboard_payload(context), json_dumps_params={'separators': (',', ':')})
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+@require_GET
+def deliveries_delta_api(request):
+    """
+    Incremental sync: deliveries created/updated and ids deleted since `cursor`,
+    within the caller's export scope. Call again with the returned cursor.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required.'}, status=401)
+    filters = request.scope.delivery_filters(exports=True)
+    if filters is None:
+        return JsonResponse({'error': 'You do not have access to delivery exports.'}, status=403)
+    try:
+        limit = int(request.GET.get('limit', DELTA_PAGE_SIZE))
+        page = delta_page(filters, request.GET.get('cursor'), limit)
+    except (InvalidCursor, ValueError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(page)
+
 # ==========================================================
 # AUTHENTICATED CRUD VIEWS
 # ==========================================================
@@ -247,24 +90,14 @@ class DeliveryListView(LoginRequiredMixin, ListView):
     paginate_by = 25
 
     def get_queryset(self):
-        user = self.request.user
-        queryset = super().get_queryset().prefetch_related('babies').order_by('-timestamp')
-        
-        # If user is Superuser OR ProvinceUser, show all data.
-        if user.is_superuser or user.groups.filter(name='ProvinceUser').exists():
-            pass # No filter is applied
-        # Otherwise, filter by Admin or User role
-        elif user.groups.filter(name='Admin').exists():
-            queryset = queryset.filter(district=user.profile.district)
-        elif user.groups.filter(name='User').exists():
-            queryset = queryset.filter(facility=user.profile.facility)
-        else:
-            return queryset.none()
-        
+        # Superusers and ProvinceUsers see all data, Admins their district and Users their facility.
+        queryset = Delivery.objects.for_scope(self.request.scope).select_related('facility').prefetch_related(
+            'babies').order_by('-timestamp')
+
         query = self.request.GET.get('q')
         if query:
             queryset = queryset.filter(
-                Q(facility__icontains=query) | Q(mother_name__icontains=query) |
+                Q(facility__name__icontains=query) | Q(mother_name__icontains=query) |
                 Q(mother_surname__icontains=query) | Q(birth_mode__icontains=query)
             )
         return queryset
@@ -287,7 +120,7 @@ class DeliveryCreateView(LoginRequiredMixin, DataEditorRequiredMixin, CreateView
         
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
-        kwargs['user'] = self.request.user
+        kwargs['scope'] = self.request.scope
         return kwargs
         
     def form_valid(self, form):
@@ -327,7 +160,7 @@ class DeliveryUpdateView(LoginRequiredMixin, DataEditorRequiredMixin, UpdateView
         
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
-        kwargs['user'] = self.request.user
+        kwargs['scope'] = self.request.scope
         return kwargs
         
     def post(self, request, *args, **kwargs):
@@ -364,109 +197,132 @@ class DeliveryDeleteView(LoginRequiredMixin, DataEditorRequiredMixin, DeleteView
 # REPORTING VIEWS
 # ==========================================================
 @login_required
-def export_full_report_excel(request):
-    user = request.user
-    queryset = Delivery.objects.select_related('captured_by').prefetch_related('babies').order_by('timestamp')
-
-    if not user.is_superuser:
-        if user.groups.filter(name='Admin').exists(): queryset = queryset.filter(district=user.profile.district)
-        elif user.groups.filter(name='User').exists(): queryset = queryset.filter(facility=user.profile.facility)
-        else: queryset = queryset.none()
-
-    workbook = openpyxl.Workbook()
-    sheet = workbook.active
-    sheet.title = 'Festive Births Full Report'
-
-    headers = [
-        'Timestamp', 'Report Date', 'Time Slot', 'Time of Birth', 'District', 
-        'Local Municipality', 'Facility', 'Facility Type', 
-        'Mother Name', 'Mother Surname', 
-        'Mother D.O.B.', 'Gravidity', 'Parity', 'Birth Mode', 'Born Before Arrival', 
-        'Baby Number', 'Baby Gender', 'Baby Weight (grams)',
-        'Captured By (Username)' 
-    ]
-    
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = openpyxl.styles.PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
-    for col_num, title in enumerate(headers, 1):
-        cell = sheet.cell(row=1, column=col_num, value=title)
-        cell.font = header_font; cell.fill = header_fill; cell.alignment = Alignment(horizontal='center')
-
-    for delivery in queryset:
-        common_data = [
-            delivery.timestamp.strftime('%Y-%m-%d %H:%M'),
-            delivery.report_date,
-            delivery.time_slot,
-            delivery.delivery_time.strftime('%H:%M') if delivery.delivery_time else '',
-            delivery.district,
-            delivery.local_municipality,
-            delivery.facility,
-            delivery.facility_type,
-            delivery.mother_name,      
-            delivery.mother_surname,   
-            delivery.mother_dob.strftime('%Y-%m-%d') if delivery.mother_dob else '',
-            delivery.gravidity,
-            delivery.parity,
-            delivery.birth_mode,
-            'Yes' if delivery.born_before_arrival else 'No',
-        ]
-        
-        captured_by_username = delivery.captured_by.username if delivery.captured_by else 'N/A'
-
-        if delivery.no_births_to_report:
-            sheet.append(common_data + ['NIL Report', 'N/A', 'N/A', captured_by_username])
-        else:
-            for i, baby in enumerate(delivery.babies.all(), 1):
-                sheet.append(common_data + [i, baby.gender, baby.weight, captured_by_username])
+def export_report(request, export, export_format):
+    """
+    Any export in any writer's format, e.g. /reports/export/abnormal_weights.csv.
+    Spreadsheets are built in a temporary file and streamed from there; text
+    formats stream as they are read, and `?gzip=1` compresses them on the fly.
+    """
+    spec, writer = EXPORTS.get(export), WRITERS.get(export_format)
+    if spec is None or writer is None:
+        raise Http404("Unknown export.")
+    if not spec.has_permission(request.scope):
+        messages.error(request, f"You do not have permission to export the {spec.title.lower()}.")
+        return redirect('landing_page')
+
+    queryset, filename = spec.get_queryset(request.scope, request.GET), f'{spec.filename}.{writer.extension}'
+    if not writer.streaming:
+        spool = tempfile.TemporaryFile()
+        try:
+            writer.write(spool, spec, queryset)
+        except BaseException:
+            spool.close()
+            raise
+        spool.seek(0)
+        return FileResponse(spool, as_attachment=True, filename=filename, content_type=writer.content_type)
+
+    chunks, content_type = writer.stream(spec, queryset), f'{writer.content_type}; charset=utf-8'
+    if request.GET.get('gzip') == '1':
+        chunks, content_type, filename = gzip_stream(chunks), 'application/gzip', f'{filename}.gz'
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
 
-    for col in sheet.columns:
-        length = max(len(str(cell.value or '')) for cell in col)
-        sheet.column_dimensions[col[0].column_letter].width = length + 2
-    
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = 'attachment; filename="festive_births_full_report.xlsx"'
-    workbook.save(response)
+@login_required
+def export_district_pack(request, export_format):
+    """The full report as a ZIP of one file per district, streamed while the districts are built."""
+    writer = WRITERS.get(export_format)
+    if writer is None:
+        raise Http404("Unknown export format.")
+    if not can_export_district_pack(request.scope):
+        messages.error(request, "Only provincial users can download the district pack.")
+        return redirect('landing_page')
+    response = StreamingHttpResponse(district_pack_stream(Delivery.objects.all(), writer), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{DISTRICT_PACK_FILENAME}"'
     return response
 
+@login_required
+def export_full_report_parquet(request):
+    """The full report as a typed Parquet file, for analysts' own tools."""
+    spool = tempfile.TemporaryFile()
+    try:
+        write_full_report_parquet(spool, FULL_REPORT.get_queryset(request.scope))
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return FileResponse(spool, as_attachment=True, filename='festive_births_full_report.parquet',
+                        content_type=PARQUET_CONTENT_TYPE)
+
+# --- BACKGROUND EXPORTS (built by `manage.py run_export_worker`) ---
+class ExportJobListView(LoginRequiredMixin, ListView):
+    model = ExportJob
+    template_name = 'births/export_jobs.html'
+    context_object_name = 'jobs'
+    paginate_by = 20
+
+    def get_queryset(self):
+        return ExportJob.objects.filter(requested_by=self.request.user)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['pdf_form'] = DashboardReportFilterForm(scope=self.request.scope)
+        context['can_export_users'] = self.request.user.is_superuser
+        # The page refreshes itself while any listed job is still queued or running.
+        context['refresh'] = any(not job.is_finished for job in context['jobs'])
+        return context
+
+@login_required
+@require_POST
+def request_export(request):
+    kind = request.POST.get('kind')
+    if kind not in dict(ExportJob.KIND_CHOICES) or (kind == ExportJob.USER_LIST and not request.user.is_superuser):
+        messages.error(request, "You cannot request that export.")
+        return redirect('export_jobs')
+    params = {}
+    if kind == ExportJob.DASHBOARD_PDF:
+        params = {'district': request.POST.get('district', ''), 'municipality': request.POST.get('local_municipality', ''),
+                  'facility': request.POST.get('facility', '')}
+    job = enqueue_export(request.user, kind, params)
+    messages.success(request, f"{job.get_kind_display()} queued. It will be ready to download here shortly.")
+    return redirect('export_jobs')
+
+@login_required
+def download_export(request, pk):
+    job = get_object_or_404(ExportJob, pk=pk, requested_by=request.user, status=ExportJob.DONE)
+    if not job.artifact:
+        raise Http404("The export file has expired.")
+    try:
+        file = job.artifact.open('rb')
+    except FileNotFoundError:
+        # e.g. written to the export worker's own disk with EXPORT_STORAGE = 'filesystem'
+        raise Http404("The export file is not available on this server. Please request the export again.")
+    return FileResponse(file, as_attachment=True, filename=os.path.basename(job.artifact.name))
+
 class DashboardReportFilterView(LoginRequiredMixin, TemplateView):
     template_name = 'births/dashboard_report_filter.html'
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         # Pass the current user to the form's __init__ method
-        context['form'] = DashboardReportFilterForm(user=self.request.user)
+        context['form'] = DashboardReportFilterForm(scope=self.request.scope)
         context['form_title'] = 'Generate Dashboard PDF Report'
         return context
 
 class GenerateDashboardPDF(LoginRequiredMixin, View):
     def get(self, request, *args, **kwargs):
-        # Reuse the LandingPageView to get all the calculated dashboard data.
-        landing_page_view = LandingPageView()
-        landing_page_view.request = request
-        context = landing_page_view.get_context_data()
-
-        context['report_user'] = request.user
-
-        report_title = "Provincial Dashboard Report"
-        if context.get('selected_facility'):
-            report_title = f"{context.get('selected_facility')} Report"
-        elif context.get('selected_municipality'):
-            report_title = f"{context.get('selected_municipality')} Report"
-        elif context.get('selected_district'):
-            report_title = f"{context.get('selected_district')} Report"
-        
-        context['report_title'] = report_title
-        
-        html_string = render_to_string('births/dashboard_pdf.html', context)
-        
-        css_path = finders.find('css/pdf_style.css')
-        if not css_path:
-            return HttpResponse("Error: CSS file 'pdf_style.css' not found in static directories.", status=500)
-        
-        pdf_stylesheet = CSS(filename=css_path)
-        
-        weasyprint_html = HTML(string=html_string, base_url=request.build_absolute_uri())
-        pdf_file = weasyprint_html.write_pdf(stylesheets=[pdf_stylesheet, CSS(string='@page { size: A4 portrait; }')])
-        
+        # Same filters, and so the same cached figures, as the public dashboard.
+        try:
+            pdf_file = render_dashboard_pdf(filters_from_request(request), request.user,
+                                            base_url=request.build_absolute_uri(), pool=pdf_pool())
+        except FileNotFoundError as e:
+            return HttpResponse(f"Error: {e}", status=500)
+        except (RenderPoolBusy, TimeoutError, BrokenProcessPool):
+            # Shed load instead of tying up this worker; capture requests keep flowing.
+            # A killed render process has already been replaced, so a retry can succeed.
+            response = HttpResponse("PDF reports are busy right now. Please try again shortly.", status=503)
+            response['Retry-After'] = str(settings.PDF_RENDER_RETRY_AFTER)
+            return response
+
         response = HttpResponse(pdf_file, content_type='application/pdf')
         response['Content-Disposition'] = 'attachment; filename="dashboard_report.pdf"'
         
@@ -480,31 +336,11 @@ class NilReportView(LoginRequiredMixin, ListView):
     paginate_by = 50
 
     def get_queryset(self):
-        queryset = super().get_queryset().filter(no_births_to_report=True).select_related('captured_by')
-
-        district = self.request.GET.get('district')
-        municipality = self.request.GET.get('local_municipality')
-        facility = self.request.GET.get('facility')
-
-        if district:
-            queryset = queryset.filter(district=district)
-        if municipality:
-            queryset = queryset.filter(local_municipality=municipality)
-        if facility:
-            queryset = queryset.filter(facility=facility)
-            
-        user = self.request.user
-        if not user.is_superuser and not user.groups.filter(name='ProvinceUser').exists():
-            if user.groups.filter(name='Admin').exists():
-                queryset = queryset.filter(district=user.profile.district)
-            elif user.groups.filter(name='User').exists():
-                queryset = queryset.filter(facility=user.profile.facility)
-
-        return queryset.order_by('-report_date', 'district', 'facility')
+        return NIL_REPORTS.get_queryset(self.request.scope, self.request.GET)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['form'] = NilReportFilterForm(self.request.GET or None)
+        context['form'] = NilReportFilterForm(self.request.GET or None, scope=self.request.scope)
         context['report_title'] = "Nil Births Report"
         return context
 
@@ -518,199 +354,13 @@ class AbnormalWeightReportView(LoginRequiredMixin, ListView):
     paginate_by = 50 # Add pagination for long lists
 
     def get_queryset(self):
-        user = self.request.user
-        
-        queryset = super().get_queryset().select_related('delivery', 'delivery__captured_by')
-
-        if not user.is_superuser and not user.groups.filter(name='ProvinceUser').exists():
-            if user.groups.filter(name='Admin').exists():
-                queryset = queryset.filter(delivery__district=user.profile.district)
-            elif user.groups.filter(name='User').exists():
-                queryset = queryset.filter(delivery__facility=user.profile.facility)
-
-        queryset = queryset.exclude(weight__gte=2500, weight__lt=4000)
-
-        queryset = queryset.annotate(
-            comment=Case(
-                When(weight__lt=1000, then=Value('Extremely Low')),
-                When(weight__gte=1000, weight__lt=1500, then=Value('Very Low')),
-                When(weight__gte=1500, weight__lt=2500, then=Value('Low')),
-                When(weight__gte=4000, then=Value('High / Macrosomic')),
-                default=Value('N/A'),
-                output_field=CharField(),
-            )
-        ).order_by('-delivery__timestamp')
-
-        return queryset
+        return ABNORMAL_WEIGHTS.get_queryset(self.request.scope)
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['report_title'] = "Abnormal Birth Weight Report"
         return context
 
-# ==========================================================
-# NEW REPORTING VIEW: EXPORT USER LIST
-# ==========================================================
-@login_required
-def export_user_list_excel(request):
-    user = request.user
-
-    if not user.is_superuser:
-        messages.error(request, "You do not have permission to export the user list.")
-        return redirect('landing_page') 
-
-    queryset = User.objects.select_related('profile').order_by('first_name', 'last_name')
-
-    workbook = openpyxl.Workbook()
-    sheet = workbook.active
-    sheet.title = 'User List Report'
-
-    headers = [
-        'Name', 'Surname', 'Email', 'Title', 'Designation',
-        'Persal Number', 'Mobile Number', 'Role(s)',
-        'Allocated District', 'Allocated Local Municipality', 'Allocated Facility',
-        'Active Account', 'Superuser Status'
-    ]
-    
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = openpyxl.styles.PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
-    for col_num, title in enumerate(headers, 1):
-        cell = sheet.cell(row=1, column=col_num, value=title)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal='center')
-
-    for app_user in queryset:
-        user_profile = None
-        try:
-            user_profile = app_user.profile 
-        except Profile.DoesNotExist:
-            pass
-
-        roles_str = ", ".join([group.name for group in app_user.groups.all()])
-
-        row_data = [
-            app_user.first_name,
-            app_user.last_name,
-            app_user.email,
-            user_profile.title if user_profile else '',
-            user_profile.designation if user_profile else '',
-            user_profile.persal_number if user_profile else '',
-            user_profile.mobile_number if user_profile else '',
-            roles_str,
-            user_profile.district if user_profile else '',
-            user_profile.local_municipality if user_profile else '',
-            user_profile.facility if user_profile else '',
-            'Yes' if app_user.is_active else 'No', 
-            'Yes' if app_user.is_superuser else 'No',
-        ]
-        sheet.append(row_data)
-
-    for col in sheet.columns:
-        length = max(len(str(cell.value or '')) for cell in col)
-        sheet.column_dimensions[col[0].column_letter].width = length + 2
-    
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = 'attachment; filename="user_list_report.xlsx"'
-    workbook.save(response)
-    return response
-
-# ==========================================================
-# AJAX HELPER VIEWS
-# ==========================================================
-def load_options(request):
-    parent_type = request.GET.get('type')
-    parent_id = request.GET.get('id')
-    
-    options_list = []
-    if parent_type == 'district' and parent_id:
-        options_list = LOCATION_DATA['municipalities'].get(parent_id, [])
-    elif parent_type == 'municipality' and parent_id:
-        options_list = LOCATION_DATA['facilities'].get(parent_id, [])
-        
-    return JsonResponse({'options': options_list})
-
-def get_facility_type(request):
-    facility_name = request.GET.get('facility_name')
-    if not facility_name:
-        return JsonResponse({'error': 'No facility name provided'}, status=400)
-
-    facility_type = FACILITY_TYPES.get(facility_name)
-    
-    if facility_type is None:
-        return JsonResponse({'error': 'Facility type not found'}, status=404)
-        
-    return JsonResponse({'facility_type': facility_type})
-
-
-
-# ==========================================================
-# NEW REPORTING VIEW: EXPORT USER LIST
-# ==========================================================
-@login_required
-def export_user_list_excel(request):
-    user = request.user
-
-    if not user.is_superuser:
-        messages.error(request, "You do not have permission to export the user list.")
-        return redirect('landing_page') 
-
-    queryset = User.objects.select_related('profile').order_by('first_name', 'last_name')
-
-    workbook = openpyxl.Workbook()
-    sheet = workbook.active
-    sheet.title = 'User List Report'
-
-    headers = [
-        'Name', 'Surname', 'Email', 'Title', 'Designation',
-        'Persal Number', 'Mobile Number', 'Role(s)',
-        'Allocated District', 'Allocated Local Municipality', 'Allocated Facility',
-        'Active Account', 'Superuser Status'
-    ]
-    
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = openpyxl.styles.PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
-    for col_num, title in enumerate(headers, 1):
-        cell = sheet.cell(row=1, column=col_num, value=title)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal='center')
-
-    for app_user in queryset:
-        user_profile = None
-        try:
-            user_profile = app_user.profile 
-        except Profile.DoesNotExist:
-            pass
-
-        roles_str = ", ".join([group.name for group in app_user.groups.all()])
-
-        row_data = [
-            app_user.first_name,
-            app_user.last_name,
-            app_user.email,
-            user_profile.title if user_profile else '',
-            user_profile.designation if user_profile else '',
-            user_profile.persal_number if user_profile else '',
-            user_profile.mobile_number if user_profile else '',
-            roles_str,
-            user_profile.district if user_profile else '',
-            user_profile.local_municipality if user_profile else '',
-            user_profile.facility if user_profile else '',
-            'Yes' if app_user.is_active else 'No', 
-            'Yes' if app_user.is_superuser else 'No',
-        ]
-        sheet.append(row_data)
-
-    for col in sheet.columns:
-        length = max(len(str(cell.value or '')) for cell in col)
-        sheet.column_dimensions[col[0].column_letter].width = length + 2
-    
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = 'attachment; filename="user_list_report.xlsx"'
-    workbook.save(response)
-    return response
-
 # ==========================================================
 # AJAX HELPER VIEWS
 # ==========================================================
@@ -8,8 +8,19 @@ pip install -r requirements.txt
 # Apply database migrations for your apps (creates User, Profile, Delivery tables, etc.)
 python manage.py migrate
 
+# Add any location added to births/data.py since the last deploy to the District/Municipality/Facility tables.
+python manage.py seed_locations
+
+# Backfill the pre-aggregated dashboard rollups (births.FacilityDailyRollup) once.
+# Signals keep them current after that; a full rebuild while the previous release
+# still takes captures would drop its increments, so run it by hand if ever needed.
+python manage.py rebuild_rollups --if-empty
+
+# Fill the stored mother age for deliveries captured before it existed (no-op once done).
+python manage.py backfill_mother_ages
+
 # --- THIS IS THE NEW, CRITICAL COMMAND ---
-# Create the database table needed for Django's database cache backend.
+# Create the database tables of the database caches (the default cache and the login throttle's).
 python manage.py createcachetable
 
 # Create the superuser from environment variables
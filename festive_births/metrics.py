@@ -0,0 +1,201 @@
+# festive_births/metrics.py
+
+from collections import defaultdict
+from contextlib import ExitStack
+import bisect
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+
+# Histogram upper bounds, Prometheus style (+Inf is implied).
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+WORKER_KEY_PREFIX = 'metrics:worker'
+WORKERS_KEY = 'metrics:workers'
+WORKER_SNAPSHOT_TTL = 24 * 3600
+UNRESOLVED_VIEW = '<unresolved>'  # 404s and the like, kept in one series
+
+
+# ==========================================================
+# IN-PROCESS AGGREGATION
+# ==========================================================
+def _new_series():
+    return {
+        'latency_buckets': [0] * (len(LATENCY_BUCKETS) + 1), 'latency_sum': 0.0, 'count': 0,
+        'query_buckets': [0] * (len(QUERY_COUNT_BUCKETS) + 1), 'queries': 0, 'db_seconds': 0.0,
+        'statuses': defaultdict(int),
+    }
+
+
+class MetricsStore:
+    """
+    Cumulative per-view request metrics of this worker process. Snapshots are
+    written to the shared cache at most every METRICS_FLUSH_INTERVAL seconds,
+    so the metrics endpoint can add up all gunicorn workers.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.series = defaultdict(_new_series)  # (view, method): series
+        self.last_flush = 0.0
+
+    def record(self, view, method, status, seconds, queries, db_seconds):
+        with self.lock:
+            series = self.series[(view, method)]
+            series['latency_buckets'][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            series['latency_sum'] += seconds; series['count'] += 1
+            series['query_buckets'][bisect.bisect_left(QUERY_COUNT_BUCKETS, queries)] += 1
+            series['queries'] += queries; series['db_seconds'] += db_seconds
+            series['statuses'][str(status)] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                key: {**series, 'latency_buckets': list(series['latency_buckets']),
+                      'query_buckets': list(series['query_buckets']), 'statuses': dict(series['statuses'])}
+                for key, series in self.series.items()
+            }
+
+    def flush(self, force=False):
+        """Publishes this worker's snapshot to the shared cache if it is due."""
+        now = time.monotonic()
+        if not force and now - self.last_flush < settings.METRICS_FLUSH_INTERVAL: return
+        self.last_flush = now
+        worker_key = f"{WORKER_KEY_PREFIX}:{os.getpid()}"
+        cache.set(worker_key, self.snapshot(), WORKER_SNAPSHOT_TTL)
+        # Re-added with a fresh TTL on every flush: an entry lost to a concurrent
+        # update is back within one interval, and the set lapses with its workers.
+        cache.set(WORKERS_KEY, (cache.get(WORKERS_KEY) or set()) | {worker_key}, WORKER_SNAPSHOT_TTL)
+
+
+store = MetricsStore()
+
+
+def collect():
+    """Sums the latest snapshot of every worker, this one included."""
+    store.flush(force=True)
+    workers = cache.get(WORKERS_KEY) or set()
+    snapshots = cache.get_many(workers)
+    if len(snapshots) < len(workers):
+        # Workers gone (restarted or recycled) for longer than WORKER_SNAPSHOT_TTL.
+        gone = workers - snapshots.keys()
+        cache.set(WORKERS_KEY, (cache.get(WORKERS_KEY) or set()) - gone, WORKER_SNAPSHOT_TTL)
+    total = defaultdict(_new_series)
+    for snapshot in snapshots.values():
+        for key, series in snapshot.items():
+            merged = total[key]
+            for field in ('latency_buckets', 'query_buckets'):
+                merged[field] = [a + b for a, b in zip(merged[field], series[field])]
+            for field in ('latency_sum', 'count', 'queries', 'db_seconds'):
+                merged[field] += series[field]
+            for status, count in series['statuses'].items():
+                merged['statuses'][status] += count
+    return total
+
+
+# ==========================================================
+# MIDDLEWARE
+# ==========================================================
+class QueryTimer:
+    """connection.execute_wrapper() hook counting queries and the time spent in them."""
+    def __init__(self):
+        self.queries, self.seconds = 0, 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.queries += 1
+
+
+class RequestMetricsMiddleware:
+    """
+    Records latency, DB query count and DB time per URL name. Goes first in
+    MIDDLEWARE so the whole stack is timed. Queries run while a streaming
+    response is iterated happen after this returns and are not counted.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(timer))
+            response = self.get_response(request)
+        seconds = time.perf_counter() - start
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match and match.view_name else UNRESOLVED_VIEW
+        store.record(view, request.method, response.status_code, seconds, timer.queries, timer.seconds)
+        store.flush()
+        return response
+
+
+# ==========================================================
+# PROMETHEUS TEXT EXPOSITION
+# ==========================================================
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _histogram(lines, name, bounds, buckets, total, count, **labels):
+    cumulative = 0
+    for bound, bucket in zip([*bounds, '+Inf'], buckets):
+        cumulative += bucket
+        lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {cumulative}")
+    lines.append(f"{name}_sum{_labels(**labels)} {total}")
+    lines.append(f"{name}_count{_labels(**labels)} {count}")
+
+
+def render_metrics(series_by_key):
+    """Formats collected series in the Prometheus text exposition format (version 0.0.4)."""
+    families = {
+        'festive_http_request_duration_seconds': ('histogram', 'Request latency by view.'),
+        'festive_http_requests_total': ('counter', 'Requests by view and response status.'),
+        'festive_db_queries_per_request': ('histogram', 'Database queries per request by view.'),
+        'festive_db_query_duration_seconds_total': ('counter', 'Time spent in database queries by view.'),
+    }
+    lines_by_family = {name: [] for name in families}
+    for (view, method), s in sorted(series_by_key.items()):
+        _histogram(lines_by_family['festive_http_request_duration_seconds'], 'festive_http_request_duration_seconds',
+                   LATENCY_BUCKETS, s['latency_buckets'], s['latency_sum'], s['count'], view=view, method=method)
+        for status, count in sorted(s['statuses'].items()):
+            lines_by_family['festive_http_requests_total'].append(
+                f"festive_http_requests_total{_labels(view=view, method=method, status=status)} {count}")
+        _histogram(lines_by_family['festive_db_queries_per_request'], 'festive_db_queries_per_request',
+                   QUERY_COUNT_BUCKETS, s['query_buckets'], s['queries'], s['count'], view=view, method=method)
+        lines_by_family['festive_db_query_duration_seconds_total'].append(
+            f"festive_db_query_duration_seconds_total{_labels(view=view, method=method)} {s['db_seconds']}")
+
+    output = []
+    for name, (kind, help_text) in families.items():
+        output += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", *lines_by_family[name]]
+    return '\n'.join(output) + '\n'
+
+
+def _authorised(request):
+    token = settings.METRICS_TOKEN
+    header = request.headers.get('Authorization', '')
+    if token and header.startswith('Bearer ') and constant_time_compare(header[len('Bearer '):], token):
+        return True
+    return request.user.is_authenticated and request.user.is_superuser
+
+
+@require_GET
+def metrics_view(request):
+    """Prometheus scrape target; open to superusers or a `Bearer METRICS_TOKEN` header."""
+    if not _authorised(request):
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,30 @@
+# festive_births/sessions.py
+
+import time
+
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware
+
+REFRESHED_KEY = '_session_refreshed'  # when the session was last saved, in epoch seconds
+
+
+class SlidingSessionMiddleware(SessionMiddleware):
+    """
+    SessionMiddleware with a sliding expiry that is extended at most once per
+    SESSION_REFRESH_INTERVAL instead of with a write on every request.
+
+    Sessions are stored for SESSION_COOKIE_AGE = SESSION_IDLE_TIMEOUT +
+    SESSION_REFRESH_INTERVAL seconds and re-saved once less than
+    SESSION_IDLE_TIMEOUT remains, so a user is still signed out no sooner than
+    SESSION_IDLE_TIMEOUT (and no later than SESSION_COOKIE_AGE) after their
+    last request. Sessions changed by the request are saved as usual.
+    """
+    def process_response(self, request, response):
+        session = getattr(request, 'session', None)
+        if session is not None and not session.is_empty():
+            refreshed = session.get(REFRESHED_KEY)  # loads the session if the view did not
+            due = refreshed is None or time.time() - refreshed >= settings.SESSION_REFRESH_INTERVAL
+            # No key left after loading means the cookie was stale; do not start a session for it.
+            if session.modified or (due and session.session_key):
+                session[REFRESHED_KEY] = int(time.time())
+        return super().process_response(request, response)
@@ -32,14 +32,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'festive_births.metrics.RequestMetricsMiddleware',  # first, so it times the whole stack
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'festive_births.sessions.SlidingSessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'accounts.middleware.ForcePasswordChangeMiddleware',
+    'accounts.middleware.RoleScopeMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'accounts.middleware.ForcePasswordChangeMiddleware',  # after messages, as it adds one
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -71,6 +73,65 @@ if DATABASE_URL:
 else:
     DATABASES = {'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / 'db.sqlite3'}}
 
+# Shared by all gunicorn workers; the table is created by `manage.py createcachetable` in build.sh.
+# Past MAX_ENTRIES rows a write first drops expired rows and then a third of the
+# rest by key order, which would take the data version, every dashboard entry
+# and held locks with it. The keys are a dashboard entry and lock per filter
+# combination (report date x location, a few thousand at most), a PDF per
+# filters and user, and one metrics snapshot per gunicorn worker, so Django's
+# default of 300 is far too small; this leaves ample headroom over that.
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 20000))
+CACHES = {'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'festive_cache',
+                      'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES}}}
+
+# Dashboard context cache (births.dashboard.get_dashboard_context), in seconds.
+# Entries are fresh for DASHBOARD_CACHE_TTL and then served stale for up to
+# DASHBOARD_CACHE_STALE_TTL more while a single request recomputes them.
+DASHBOARD_CACHE_TTL = int(os.environ.get('DASHBOARD_CACHE_TTL', 60))
+DASHBOARD_CACHE_STALE_TTL = int(os.environ.get('DASHBOARD_CACHE_STALE_TTL', 600))
+# Rendered dashboard PDFs, keyed by filters, report user and data version, in seconds.
+DASHBOARD_PDF_CACHE_TTL = int(os.environ.get('DASHBOARD_PDF_CACHE_TTL', 3600))
+
+# Dashboard PDF layout runs in a process pool per web worker (births.pdf_render):
+# PDF_RENDER_WORKERS render at once, PDF_RENDER_QUEUE_DEPTH more may wait, and
+# further requests get a 503 with Retry-After. 0 workers renders inline.
+# The Procfile runs gthread workers with more threads (WEB_THREADS) than render
+# slots, so requests waiting on a PDF never hold up the rest of that worker.
+PDF_RENDER_WORKERS = int(os.environ.get('PDF_RENDER_WORKERS', 1))
+PDF_RENDER_QUEUE_DEPTH = int(os.environ.get('PDF_RENDER_QUEUE_DEPTH', 2))
+PDF_RENDER_TIMEOUT = int(os.environ.get('PDF_RENDER_TIMEOUT', 60))  # seconds a request waits for its PDF
+PDF_RENDER_RETRY_AFTER = int(os.environ.get('PDF_RENDER_RETRY_AFTER', 15))
+
+# Request metrics (festive_births.metrics), scraped from /metrics/ by superusers
+# or with an `Authorization: Bearer <METRICS_TOKEN>` header. Each worker
+# publishes its counters to the cache every METRICS_FLUSH_INTERVAL seconds.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_FLUSH_INTERVAL = int(os.environ.get('METRICS_FLUSH_INTERVAL', 15))
+
+# Background exports (births.jobs, `manage.py run_export_worker`). Finished
+# files are kept in EXPORT_STORAGE and deleted after EXPORT_RETENTION_DAYS.
+EXPORT_ROOT = os.environ.get('EXPORT_ROOT', os.path.join(BASE_DIR, 'exports'))
+# Where finished files are kept: 'filesystem' (EXPORT_ROOT, which the worker
+# and web processes must share) or 'database' (births.storage), the default on
+# Render, where the worker and web services each have their own disk.
+EXPORT_STORAGE = os.environ.get('EXPORT_STORAGE', 'database' if IS_PRODUCTION else 'filesystem')
+EXPORT_RETENTION_DAYS = int(os.environ.get('EXPORT_RETENTION_DAYS', 7))
+# Threads building the files of one district pack download; each holds its own
+# database connection while it runs.
+DISTRICT_PACK_WORKERS = int(os.environ.get('DISTRICT_PACK_WORKERS', 4))
+# Processes hashing the temporary passwords of a bulk user import
+# (accounts.provisioning); 0 or 1 hashes inline. `manage.py import_users` uses
+# every CPU this process may run on (os.cpu_count() is the host's, not ours).
+# Uploads through the Import Users page share the web service's CPUs with its
+# other requests, so they get a few processes at most.
+AVAILABLE_CPUS = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+USER_IMPORT_HASH_WORKERS = int(os.environ.get('USER_IMPORT_HASH_WORKERS', AVAILABLE_CPUS))
+USER_IMPORT_UPLOAD_HASH_WORKERS = int(os.environ.get('USER_IMPORT_UPLOAD_HASH_WORKERS', min(2, AVAILABLE_CPUS)))
+# Each user costs about half a second of hashing per process, so uploads stay
+# within the web server's request timeout by being capped at this many rows;
+# larger files go through `manage.py import_users`.
+USER_IMPORT_MAX_UPLOAD_ROWS = int(os.environ.get('USER_IMPORT_MAX_UPLOAD_ROWS', 40))
+
 # ==========================================================
 # AUTHENTICATION & SESSION MANAGEMENT
 # ==========================================================
@@ -80,8 +141,49 @@ LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'delivery_list'
 LOGOUT_REDIRECT_URL = 'landing_page'
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
-SESSION_COOKIE_AGE = 1800  # Seconds (30 minutes * 60 seconds)
-SESSION_SAVE_EVERY_REQUEST = True
+# Users are signed out 30 minutes after their last request. Rather than saving
+# the session on every request, festive_births.sessions.SlidingSessionMiddleware
+# re-saves it once per SESSION_REFRESH_INTERVAL (a fraction of the idle timeout),
+# and sessions live that much longer than the idle timeout to make up for it.
+SESSION_IDLE_TIMEOUT = 1800  # Seconds (30 minutes * 60 seconds)
+SESSION_REFRESH_FRACTION = float(os.environ.get('SESSION_REFRESH_FRACTION', 0.1))
+SESSION_REFRESH_INTERVAL = int(SESSION_IDLE_TIMEOUT * SESSION_REFRESH_FRACTION)
+SESSION_COOKIE_AGE = SESSION_IDLE_TIMEOUT + SESSION_REFRESH_INTERVAL
+SESSION_SAVE_EVERY_REQUEST = False
+# With a shared cache server (e.g. redis://host:6379/1, which needs the `redis`
+# package), sessions are read from the cache and only fall back to the database
+# on a miss. The default cache is the database itself, so without one sessions
+# stay plain database sessions.
+SESSION_CACHE_URL = os.environ.get('SESSION_CACHE_URL')
+if SESSION_CACHE_URL:
+    CACHES['sessions'] = {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': SESSION_CACHE_URL}
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    SESSION_CACHE_ALIAS = 'sessions'
+# With a shared cache server, accounts.backends.PersalAuthBackend also caches
+# each signed-in user with their profile and groups for AUTH_USER_CACHE_TTL
+# seconds, dropping them when they change. Without one there is no 'auth' cache
+# and users are loaded per request: the database cache would save nothing, and
+# per-process caches could not be invalidated across workers.
+AUTH_USER_CACHE_TTL = int(os.environ.get('AUTH_USER_CACHE_TTL', 60))
+if SESSION_CACHE_URL:
+    CACHES['auth'] = {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': SESSION_CACHE_URL}
+# Login attempts are throttled (accounts.throttle) before any password is
+# hashed, with token buckets per Persal number and per client address:
+# (bucket size, seconds to earn back one attempt). Facility computers share an
+# address, hence the larger address bucket. Buckets live on the cache server
+# when there is one, else in (and falling back to) a database cache of their
+# own: culled with the default cache, a spray of Persal numbers would evict
+# the address buckets (whose keys sort first) and lift their lockouts. Every
+# live row is an attempt accepted within a bucket's refill time (5 minutes)
+# and expired rows go first, so LOGIN_THROTTLE_MAX_ENTRIES is never reached
+# short of a flood from that many addresses.
+LOGIN_THROTTLE_RATES = {'persal': (5, 60), 'ip': (40, 3)}
+LOGIN_THROTTLE_MAX_ENTRIES = int(os.environ.get('LOGIN_THROTTLE_MAX_ENTRIES', 1000000))
+CACHES['login_throttle'] = {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'login_throttle_cache',
+                            'OPTIONS': {'MAX_ENTRIES': LOGIN_THROTTLE_MAX_ENTRIES}}
+LOGIN_THROTTLE_CACHE = 'sessions' if SESSION_CACHE_URL else 'login_throttle'
+# Proxies appending to X-Forwarded-For in front of the app (Render's has one).
+LOGIN_THROTTLE_PROXY_COUNT = int(os.environ.get('LOGIN_THROTTLE_PROXY_COUNT', 1 if RENDER_EXTERNAL_HOSTNAME else 0))
 
 
 # ==========================================================
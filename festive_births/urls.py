@@ -1,8 +1,11 @@
 from django.contrib import admin
 from django.urls import path, include
-from django.contrib.auth.views import LoginView
 from django.contrib.auth.forms import AuthenticationForm # <-- IMPORT THIS
 
+from accounts.views import LoginView
+
+from .metrics import metrics_view
+
 # Create a custom form class on the fly to change the label
 class CustomAuthForm(AuthenticationForm):
     def __init__(self, *args, **kwargs):
@@ -12,12 +15,13 @@ class CustomAuthForm(AuthenticationForm):
 urlpatterns = [
     path('admin/', admin.site.urls),
     
-    # Modify the LoginView to use our custom form
+    # Modify the LoginView to use our custom form (accounts.views.LoginView throttles attempts)
     path('login/', LoginView.as_view(
         template_name='registration/login.html',
         authentication_form=CustomAuthForm # <-- ADD THIS LINE
     ), name='login'),
 
+    path('metrics/', metrics_view, name='metrics'),
     path('users/', include('accounts.urls')),
     path('', include('births.urls')),
 ]
\ No newline at end of file